@@ -0,0 +1,295 @@
+# =============================================================================
+# JALU - Analisis nutrisi batch tanpa UI
+# Jalur deteksi + nutrisi yang sama dengan halaman Vision (prepare_image,
+# backend inferensi, NutrientMatrix, render_detections) untuk audit massal
+# folder foto nampan. Gambar dibagi per batch ke proses worker; tiap worker
+# memuat model sekali dan memanggilnya satu kali per batch. Hasil per gambar
+# ditulis ke jurnal JSON per baris setelah tiap batch, sehingga run yang
+# terhenti bisa dilanjutkan: gambar yang sudah berhasil (path, ukuran, mtime
+# dan identity model sama) dilewati. Di akhir, hasil per gambar dan ringkasan per folder ditulis
+# ke CSV atau Parquet (berdasarkan ekstensi output).
+#
+# Konfigurasi lewat environment variable:
+#   JALU_MODEL_PATH       model deteksi (lihat inference_backend.py)
+#   JALU_NUTRITION_CSV    tabel nutrisi (Calories kosong diisi model kalori)
+#
+# Penggunaan CLI:
+#   python analyze_images.py foto_nampan/ --output hasil.parquet --workers 4
+#   python analyze_images.py foto_nampan/ --output hasil.csv --annotated hasil_gambar/
+# =============================================================================
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import pandas as pd
+
+from nutrition import NUTRIENT_COLUMNS, WEIGHTING_MODES, build_nutrient_matrix, default_nutrition_table, summarize
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+DEFAULT_BATCH_SIZE = 8
+ALL_FOLDERS = "(semua)"
+# Kolom file hasil per gambar; record error tidak punya kolom ukuran/deteksi/nutrisi
+OUTPUT_COLUMNS = ["path", "folder", "size", "mtime_ns", "model", "status", "error",
+                  "width", "height", "item_count", "items", *NUTRIENT_COLUMNS]
+
+
+def find_images(root):
+    """Path relatif semua gambar di bawah `root` (rekursif, urutan tetap)."""
+    found = []
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, name), root))
+    return found
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def nutrition_table(path=None):
+    """Tabel nutrisi seperti di app: CSV (JALU_NUTRITION_CSV) atau bawaan, Calories kosong diestimasi."""
+    path = path or os.environ.get("JALU_NUTRITION_CSV")
+    nutrition_data = pd.read_csv(path) if path and os.path.exists(path) else default_nutrition_table()
+    if pd.to_numeric(nutrition_data["Calories"], errors="coerce").isna().any():
+        from calorie_model import fill_missing_calories, load_calorie_model
+        calorie_model = load_calorie_model()
+        if calorie_model is not None:
+            nutrition_data = fill_missing_calories(nutrition_data, calorie_model)
+    return nutrition_data
+
+
+class BatchAnalyzer:
+    """Model + matriks nutrisi satu proses; `analyze` memproses satu batch path dengan satu forward pass."""
+
+    def __init__(self, model, nutrition_data, min_confidence=0.25, weighting=None, annotated_dir=None):
+        self.model = model
+        self.matrix = build_nutrient_matrix(nutrition_data, model.names)
+        self.min_confidence = min_confidence
+        self.weighting = weighting
+        self.annotated_dir = annotated_dir
+
+    def analyze(self, root, paths):
+        from preprocess import prepare_image
+
+        records, images, decoded = [], [], []
+        for rel in paths:
+            full = os.path.join(root, rel)
+            record = {"path": rel, "folder": os.path.dirname(rel) or ".", "size": None, "mtime_ns": None,
+                      "model": self.model.identity, "status": "ok", "error": ""}
+            records.append(record)
+            try:
+                # File bisa hilang/tak terbaca sejak folder di-listing: jadi satu record error saja
+                record["size"], record["mtime_ns"] = file_signature(full)
+                with open(full, "rb") as f:
+                    images.append(prepare_image(f.read(), getattr(self.model, "imgsz", 640)))
+                decoded.append(record)
+            except Exception as e:
+                # File rusak tidak menggagalkan batch; dicatat dan dicoba lagi saat resume
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+
+        if images:
+            try:
+                results = self.model.predict([image.array for image in images])
+            except Exception as e:
+                for record in decoded:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                return records
+            detections = []
+            for image, result in zip(images, results):
+                food = self.matrix.select_food(image.to_original(result))
+                detections.append(food.subset(food.scores >= self.min_confidence))
+            for record, image, found, summary in zip(decoded, images, detections,
+                                                     summarize(self.matrix, detections, self.weighting)):
+                record.update(width=image.original_size[0], height=image.original_size[1],
+                              item_count=len(summary["Items"]), items=", ".join(summary["Items"]),
+                              **{c: summary[c] for c in NUTRIENT_COLUMNS})
+                if self.annotated_dir:
+                    self._save_annotated(record["path"], image, found)
+        return records
+
+    def _save_annotated(self, rel, image, detections):
+        from detection import render_detections
+        target = os.path.join(self.annotated_dir, os.path.splitext(rel)[0] + ".jpg")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        annotated, _ = render_detections(image.display.copy(), image.to_display(detections), self.matrix.labels)
+        annotated.save(target, quality=90)
+
+
+# Satu BatchAnalyzer per proses worker, dibuat oleh initializer pool
+_analyzer = None
+
+
+def _init_worker(model_path, num_threads, nutrition_data, min_confidence, weighting, annotated_dir):
+    global _analyzer
+    from inference_backend import load_backend
+    model = load_backend(model_path, num_threads=num_threads, address="")
+    _analyzer = BatchAnalyzer(model, nutrition_data, min_confidence, weighting, annotated_dir)
+
+
+def _analyze_in_worker(root, paths):
+    return _analyzer.analyze(root, paths)
+
+
+def journal_path(output):
+    return output + ".progress.jsonl"
+
+
+def read_journal(path):
+    """Hasil per path dari jurnal; entri terakhir menang, baris terpotong (run terhenti) diabaikan."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[record["path"]] = record
+    return done
+
+
+def summarize_folders(results):
+    """Total per folder plus satu baris semua folder; gambar gagal hanya dihitung di kolom `failed`."""
+    ok = results["status"] == "ok"
+    frame = results.assign(images=ok.astype(int), failed=(~ok).astype(int))
+    columns = ["images", "failed", "item_count", *NUTRIENT_COLUMNS]
+    grouped = frame.groupby("folder")[columns].sum()
+    grouped.loc[ALL_FOLDERS] = grouped.sum()
+    grouped = grouped.astype({"images": int, "failed": int, "item_count": int})
+    grouped["mean_calories"] = grouped["Calories"] / grouped["images"].where(grouped["images"] > 0)
+    return grouped.rename_axis("folder").reset_index()
+
+
+def write_table(frame, path):
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def summary_path(output):
+    base, ext = os.path.splitext(output)
+    return f"{base}_summary{ext}"
+
+
+def analyze_directory(root, output, model_path=None, workers=1, batch_size=DEFAULT_BATCH_SIZE,
+                      min_confidence=0.25, weighting=None, nutrition_data=None, annotated_dir=None,
+                      num_threads=None, analyzer=None, log=print):
+    """Analisis semua gambar di `root`, lanjutkan dari jurnal jika ada; kembalikan (per gambar, ringkasan).
+
+    `workers=0` atau `analyzer` yang sudah dibuat menjalankan semuanya di proses ini.
+    """
+    if nutrition_data is None:
+        nutrition_data = nutrition_table()
+    if analyzer is not None:
+        identity = analyzer.model.identity
+    else:
+        from inference_backend import model_identity
+        identity = model_identity(model_path)
+    journal = journal_path(output)
+    done = read_journal(journal)
+    images = find_images(root)
+    todo = []
+    for rel in images:
+        previous = done.get(rel)
+        try:
+            signature = file_signature(os.path.join(root, rel))
+        except OSError:
+            signature = None  # dicatat sebagai error oleh analyzer
+        # Dilewati hanya jika berhasil dengan model yang sama dan file tidak berubah; gagal dicoba ulang
+        if (previous is None or previous["status"] != "ok" or previous.get("model") != identity
+                or (previous["size"], previous["mtime_ns"]) != signature):
+            todo.append(rel)
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+    log(f"{len(images)} gambar, {len(images) - len(todo)} sudah selesai, {len(todo)} dianalisis "
+        f"({len(batches)} batch)")
+
+    started = time.perf_counter()
+    processed = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(journal, "a", encoding="utf-8") as journal_file:
+        def commit(records):
+            nonlocal processed
+            for record in records:
+                journal_file.write(json.dumps(record) + "\n")
+                done[record["path"]] = record
+            journal_file.flush()
+            processed += len(records)
+            elapsed = time.perf_counter() - started
+            log(f"  {processed}/{len(todo)} gambar ({processed / max(elapsed, 1e-9):.1f} gambar/dtk)")
+
+        if analyzer is not None or workers <= 0:
+            if analyzer is None:
+                _init_worker(model_path, num_threads, nutrition_data, min_confidence, weighting, annotated_dir)
+                analyzer = _analyzer
+            for batch in batches:
+                commit(analyzer.analyze(root, batch))
+        else:
+            threads = num_threads or max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(model_path, threads, nutrition_data, min_confidence, weighting, annotated_dir),
+            ) as pool:
+                # Paling banyak 2 batch per worker dalam antrean; hasil dijurnal begitu selesai
+                remaining = iter(batches)
+                pending = {pool.submit(_analyze_in_worker, root, batch) for batch in islice(remaining, 2 * workers)}
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        commit(future.result())
+                        batch = next(remaining, None)
+                        if batch is not None:
+                            pending.add(pool.submit(_analyze_in_worker, root, batch))
+
+    # Output akhir hanya untuk gambar yang masih ada di folder, urut path
+    current = set(images)
+    results = pd.DataFrame([done[rel] for rel in sorted(done) if rel in current]).reindex(columns=OUTPUT_COLUMNS)
+    for column in ["item_count", *NUTRIENT_COLUMNS]:
+        results[column] = pd.to_numeric(results[column]).fillna(0)
+    results["item_count"] = results["item_count"].astype(int)
+    summary = summarize_folders(results)
+    write_table(results, output)
+    write_table(summary, summary_path(output))
+    return results, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisis nutrisi batch untuk folder foto nampan")
+    parser.add_argument("root", help="Folder gambar (dibaca rekursif)")
+    parser.add_argument("--output", default="analisis_nutrisi.csv", help="File hasil per gambar (.csv / .parquet)")
+    parser.add_argument("--model", default=None, help="Path model (default JALU_MODEL_PATH)")
+    parser.add_argument("--nutrition-csv", default=None, help="Tabel nutrisi (default JALU_NUTRITION_CSV)")
+    parser.add_argument("--workers", type=int, default=1, help="Proses worker (0 = di proses ini)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=None, help="Thread inferensi per worker")
+    parser.add_argument("--confidence", type=float, default=0.25)
+    parser.add_argument("--weighting", choices=[m for m in WEIGHTING_MODES if m], default=None)
+    parser.add_argument("--annotated", default=None, help="Folder tujuan gambar dengan kotak deteksi")
+    parser.add_argument("--restart", action="store_true", help="Abaikan jurnal run sebelumnya")
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(journal_path(args.output)):
+        os.remove(journal_path(args.output))
+    started = time.perf_counter()
+    results, summary = analyze_directory(
+        args.root, args.output, model_path=args.model, workers=args.workers, batch_size=args.batch_size,
+        min_confidence=args.confidence, weighting=args.weighting, nutrition_data=nutrition_table(args.nutrition_csv),
+        annotated_dir=args.annotated, num_threads=args.threads,
+    )
+    failed = int((results["status"] != "ok").sum())
+    print(f"Selesai dalam {time.perf_counter() - started:.1f} dtk: {len(results) - failed} berhasil, {failed} gagal")
+    print(f"Hasil per gambar: {args.output}, ringkasan: {summary_path(args.output)}")
+    print(summary.to_string(index=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
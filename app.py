@@ -3,15 +3,21 @@
 # Streamlit App with Tailwind CSS Integration
 # =============================================================================
 
+import time
+script_started = time.perf_counter()  # sebelum import lain, agar biaya import ikut terukur
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-from PIL import Image, ImageDraw, ImageFont
-from ultralytics import YOLO
-import io
-import random
-import streamlit.components.v1 as components
+import hmac
+import os
+from detection import DetectionCache, detect_batch, render_detections
+from detection_jobs import JobManager
+from metrics import MetricsRegistry, start_http_server
+from model_loader import BackgroundLoader
+from nutrition import build_nutrient_matrix, default_nutrition_table, summarize, table_fingerprint
+from mbg_generator import generate as generate_mbg, generate_grid as generate_mbg_grid
+from mbg_store import open_store
+from mbg_rollup import build_rollup
 
 # =============================================================================
 # CONFIGURATION
@@ -23,74 +29,201 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Jumlah gambar per satu forward pass YOLO pada mode batch
+BATCH_SIZE = 8
+
+# Batas durasi analisis kamera/perangkat (detik); job webcam tidak punya akhir sendiri
+LIVE_MAX_SECONDS = float(os.environ.get("JALU_LIVE_MAX_SECONDS", 300))
+
+# Kolom baris mentah yang dibutuhkan tiap grup chart (kartu, pie dan heatmap memakai rollup)
+CHART_COLUMNS = {
+    "Chart Utama": ["Provinsi", "Jenjang_Pendidikan", "Jumlah_Siswa_Penerima", "Tingkat_Kepuasan", "Indeks_Keberhasilan"],
+    "Chart Detail": ["Provinsi", "Jenjang_Pendidikan", "Tingkat_Kepuasan", "Indeks_Keberhasilan"],
+}
+
 # --- MOCK DATA GENERATOR (Jika CSV tidak ada) ---
 def get_nutrition_data():
-    data = {
-        "FoodType": ["Banana", "Apple", "Orange", "Broccoli", "Carrot", "Sandwich", "Pizza", "Cake", "Bowl", "Milk"],
-        "Quantity": ["1 medium", "1 medium", "1 medium", "100g", "100g", "1 serving", "1 slice", "1 slice", "1 bowl", "1 bottle"],
-        "Protein": [1.3, 0.5, 1.2, 2.8, 0.9, 12.0, 11.0, 3.0, 5.0, 8.0],
-        "Carbs": [27.0, 25.0, 15.0, 7.0, 10.0, 30.0, 36.0, 50.0, 20.0, 12.0],
-        "Fat": [0.3, 0.3, 0.2, 0.4, 0.2, 10.0, 12.0, 15.0, 2.0, 5.0],
-        "Calories": [105, 95, 62, 34, 41, 250, 285, 350, 150, 120]
-    }
-    return pd.DataFrame(data)
+    # Tabel dari JALU_NUTRITION_CSV jika ada; Calories boleh kosong (diisi model estimasi kalori)
+    path = os.environ.get("JALU_NUTRITION_CSV")
+    if path and os.path.exists(path):
+        return pd.read_csv(path)
+    return default_nutrition_table()
 
 # --- LOAD MODELS & DATA ---
+def build_yolo_model():
+    # Import berat (ultralytics/onnxruntime) terjadi di sini, di thread latar, bukan saat app.py diimport.
+    # Model dimuat dari file lokal (JALU_MODEL_PATH, default yolov8n.pt); backend PyTorch atau ONNX
+    # dipilih lewat JALU_BACKEND. Unduh otomatis hanya jika JALU_ALLOW_DOWNLOAD=1.
+    from inference_backend import load_backend
+    with metrics.span("model.load"):
+        return load_backend()
+
+def build_registry_model(path):
+    from inference_backend import load_backend
+    with metrics.span("model.load"):
+        return load_backend(path, address="")
+
+def warm_yolo_model(model):
+    from inference_backend import warmup
+    with metrics.span("model.warmup"):
+        warmup(model)
+
+@st.cache_resource
+def get_model_registry():
+    # Registry model berversi di JALU_MODEL_REGISTRY; None = model dari file tetap seperti biasa
+    path = os.environ.get("JALU_MODEL_REGISTRY")
+    if not path:
+        return None
+    from model_registry import ModelRegistry
+    return ModelRegistry(path)
+
 @st.cache_resource
-def load_yolo_model():
-    with st.spinner("🔄 Memuat model AI..."):
+def get_model_loader():
+    # Satu loader per proses; dimulai pada run pertama sesi mana pun dan tidak memblokir halaman.
+    # Dengan registry, versi baru dipanaskan di latar lalu ditukar tanpa restart.
+    registry = get_model_registry()
+    if registry is not None:
+        from model_registry import HotModel
+        return HotModel(registry, "detector", build_registry_model, warmup=warm_yolo_model).start()
+    return BackgroundLoader(build_yolo_model, warmup=warm_yolo_model).start()
+
+def session_model(loader):
+    # Registry: sebagian sesi mendapat versi canary (tetap per sesi); loader biasa: satu model
+    if not hasattr(loader, "select"):
+        return loader.value
+    if "model_session_key" not in st.session_state:
+        st.session_state["model_session_key"] = os.urandom(8).hex()
+    return loader.select(st.session_state["model_session_key"])
+
+@st.cache_resource
+def get_metrics():
+    # Histogram latensi per tahap untuk seluruh proses; endpoint /metrics jika JALU_METRICS_PORT di-set
+    registry = MetricsRegistry(log_path=os.environ.get("JALU_METRICS_LOG"))
+    port = os.environ.get("JALU_METRICS_PORT")
+    if port:
         try:
-            # Gunakan "yolov8n" agar ultralytics dapat men-download model otomatis (jika environment mengizinkan).
-            # Jika tidak ada internet, tempatkan file yolov8n.pt di repo/server dan gunakan path file tersebut.
-            model = YOLO("yolov8n")
-            st.success("✅ Model AI berhasil dimuat!")
-            return model
-        except Exception as e:
-            st.error(f"❌ Gagal memuat model: {str(e)}")
-            return None
+            start_http_server(registry, int(port), os.environ.get("JALU_METRICS_HOST", "127.0.0.1"))
+        except OSError as e:
+            print(f"[JALU] endpoint metrik tidak dapat dijalankan di port {port}: {e}")
+    return registry
+
+@st.cache_resource
+def get_startup_clock(_started):
+    # Waktu mulai run pertama proses ini; first paint dicatat di akhir run pertama
+    return {"started": _started, "first_paint": None}
+
+@st.cache_resource
+def get_calorie_loader():
+    # Regressor hasil train_model.py (format ringkas via mmap); dari registry jika JALU_MODEL_REGISTRY di-set
+    from calorie_model import load_calorie_model
+    registry = get_model_registry()
+    if registry is not None:
+        from model_registry import HotModel
+        return HotModel(registry, "calorie", load_calorie_model).start()
+    return BackgroundLoader(load_calorie_model, name="jalu-calorie-loader").start()
+
+def get_calorie_model():
+    # None jika file model tidak ada atau belum selesai dimuat
+    loader = get_calorie_loader()
+    return session_model(loader) if loader.ready else None
 
 @st.cache_data
-def load_mbg_data():
-    provinces = ["DKI Jakarta", "Jawa Barat", "Jawa Tengah", "Jawa Timur", "Banten"]
-    levels = ["SD", "SMP", "SMA"]
-    data = []
-    for prov in provinces:
-        for lvl in levels:
-            data.append({
-                "Provinsi": prov,
-                "Jenjang_Pendidikan": lvl,
-                "Jumlah_Siswa_Penerima": random.randint(50000, 200000),
-                "Tingkat_Kepuasan": random.uniform(70, 95),
-                "Penurunan_Stunting": random.uniform(5, 15),
-                "Indeks_Keberhasilan": random.uniform(75, 98),
-                "Anggaran_Terserap": random.uniform(80, 100),
-                "Kabupaten_Kota": f"Kota {prov}",
-                "Jumlah_Sekolah": random.randint(100, 500),
-                "Rata_Rata_Berat_Badan": random.uniform(25, 35),
-                "Persentase_Gizi_Baik": random.uniform(60, 90),
-                "Jumlah_Kantin_Sehat": random.randint(50, 200),
-                "Efisiensi_Distribusi": random.uniform(75, 95),
-                "Tingkat_Partisipasi_Orang_Tua": random.uniform(70, 95),
-                "Jumlah_Guru_Terbina": random.randint(200, 800),
-                "Persentase_Kehadiran_Siswa": random.uniform(85, 98),
-                "Biaya_Per_Siswa": random.uniform(15000, 25000),
-                "Jumlah_Paket_Makanan": random.randint(1000, 5000),
-                "Tingkat_Kualitas_Makanan": random.uniform(75, 95),
-                "Persentase_Siswa_Aktif": random.uniform(80, 95),
-                "Jumlah_Monitoring_Bulanan": random.randint(10, 30),
-                "Indeks_Kesehatan_Sekolah": random.uniform(70, 95),
-                "Persentase_Program_Lanjutan": random.uniform(60, 90),
-                "Jumlah_Kemitraan": random.randint(5, 20)
-            })
-    return pd.DataFrame(data)
-
-# Inisialisasi Data dengan progress
-with st.spinner("🚀 Memuat aplikasi JALU..."):
-    yolo_model = load_yolo_model()
+def load_nutrition_table(calorie_model_version=None, _calorie_model=None):
+    # Calories yang kosong diisi satu prediksi batch; hasil di-cache per versi model
     nutrition_data = get_nutrition_data()
-    mbg_data = load_mbg_data()
-    food_mapping = {k.lower(): k for k in nutrition_data["FoodType"].values}
-    st.success("🎉 Aplikasi siap digunakan!")
+    calorie_model = _calorie_model if calorie_model_version else None
+    if calorie_model is not None:
+        from calorie_model import fill_missing_calories
+        nutrition_data = fill_missing_calories(nutrition_data, calorie_model)
+    return nutrition_data, table_fingerprint(nutrition_data)
+
+@st.cache_resource(max_entries=4)
+def get_nutrition_index(model_identity, table_version, _class_names, _nutrition_data):
+    # Dibangun ulang otomatis jika model (identity) atau isi tabel (fingerprint) berubah
+    return build_nutrient_matrix(_nutrition_data, _class_names)
+
+@st.cache_resource
+def get_mbg_store():
+    # Dataset Parquet terpartisi di JALU_MBG_DATA; fallback ke data mock
+    with metrics.span("dashboard.open_store"):
+        return open_store(fallback=load_mbg_data)
+
+@st.cache_resource(max_entries=2)
+def get_mbg_rollup(data_version):
+    # Satu scan per versi dataset; rerun dashboard hanya membaca sel rollup
+    with metrics.span("dashboard.rollup"):
+        return build_rollup(get_mbg_store())
+
+@st.cache_resource(max_entries=64)
+def get_figure(chart, filter_signature, data_version, _build):
+    # Figure disimpan per (jenis chart, filter, versi data); data baris hanya dibaca saat cache miss
+    return _build()
+
+def chart_figure(chart, filter_signature, data_version, build):
+    # get_figure + catatan hit/miss cache figure; waktu build hanya tercatat saat miss
+    built = []
+
+    def timed_build():
+        built.append(True)
+        with metrics.span(f"chart.{chart}"):
+            return build()
+
+    figure = get_figure(chart, filter_signature, data_version, timed_build)
+    metrics.record_cache("figure", hit=not built)
+    return figure
+
+@st.cache_resource
+def get_detection_cache():
+    # Tier disk aktif jika JALU_CACHE_DIR di-set
+    cache = DetectionCache(
+        max_entries=int(os.environ.get("JALU_CACHE_ENTRIES", "256")),
+        disk_dir=os.environ.get("JALU_CACHE_DIR"),
+    )
+    get_metrics().add_source("detection_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_job_manager():
+    # Thread pool deteksi bersama semua sesi; status job dibaca ulang tiap rerun
+    manager = JobManager(max_workers=int(os.environ.get("JALU_DETECTION_WORKERS", "2")))
+    get_metrics().add_source("detection_jobs", manager.stats)
+    return manager
+
+@st.cache_resource
+def get_history_store():
+    # Riwayat analisis di SQLite (JALU_HISTORY_DB); ditulis per batch oleh thread latar
+    from detection_history import DEFAULT_PATH, HistoryStore
+    store = HistoryStore(os.environ.get("JALU_HISTORY_DB", DEFAULT_PATH))
+    get_metrics().add_source("history_writer", store.stats)
+    return store
+
+def record_history(job_id, summaries, source):
+    # Sekali per job: rerun (mis. geser ambang confidence) tidak mencatat ulang
+    recorded = st.session_state.setdefault("history_recorded", set())
+    if job_id in recorded:
+        return
+    recorded.add(job_id)
+    store = get_history_store()
+    for summary in summaries:
+        store.record(st.session_state.get("history_school", ""), summary, source=source)
+
+@st.cache_data
+def load_mbg_data():
+    # Data mock dengan seed tetap: grid lengkap provinsi x jenjang; JALU_MBG_ROWS (uji beban) = N baris acak
+    seed = int(os.environ.get("JALU_MBG_SEED", "42"))
+    rows = os.environ.get("JALU_MBG_ROWS")
+    if rows:
+        return generate_mbg(int(float(rows)), seed=seed)
+    return generate_mbg_grid(seed)
+
+# Inisialisasi: hanya memulai pemuatan model di latar belakang. Tabel nutrisi, store MBG
+# dan indeks nutrisi dibuat oleh halaman yang membutuhkannya.
+startup_clock = get_startup_clock(script_started)
+metrics = get_metrics()
+model_loader = get_model_loader()
+yolo_model = None
+nutrition_index = None
+active_job = None
 
 # =============================================================================
 # TAILWIND CSS INTEGRATION
@@ -140,42 +273,245 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- FUNCTIONS ---
-def draw_detections(image, results):
-    draw = ImageDraw.Draw(image)
+def run_detection_job(job, model, index, cache, image_bytes, keys):
+    """Isi job deteksi: praproses, deteksi per batch dan saring kelas makanan, di thread worker."""
+    from preprocess import prepare_image
+    model_size = getattr(model, "imgsz", 640)
+    images = []
+    for data in image_bytes:
+        with metrics.span("vision.decode"):
+            images.append(prepare_image(data, model_size))
+        job.check_cancelled()
+    detections = detect_batch(model, images, keys, cache, batch_size=BATCH_SIZE, job=job, metrics=metrics)
+    return images, [index.select_food(d) for d in detections]
+
+def current_detection_job(image_bytes):
+    """Job deteksi milik sesi untuk unggahan ini; unggahan baru membatalkan job lama sesi ini."""
+    manager = get_job_manager()
+    cache = get_detection_cache()
+    keys = [DetectionCache.make_key(data, yolo_model.identity) for data in image_bytes]
+    job = manager.get(st.session_state.get("detection_job_id"))
+    if job is not None and job.key == tuple(keys):
+        return job
+    if job is not None:
+        manager.cancel(job.id)
+    model, index = yolo_model, nutrition_index
+    job = manager.submit(
+        lambda job: run_detection_job(job, model, index, cache, image_bytes, keys),
+        key=tuple(keys),
+        total=len(keys),
+    )
+    st.session_state["detection_job_id"] = job.id
+    return job
+
+def run_video_job(job, model, index, source, video_bytes, min_confidence, max_seconds=None):
+    """Isi job video: stream frame lewat StreamAnalyzer; nampan yang selesai masuk `job.partial`."""
+    import tempfile
+    from video_stream import StreamAnalyzer, open_capture
+
+    path = None
+    if video_bytes is not None:
+        # OpenCV butuh path file; video unggahan ditulis ke file sementara selama job
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(source)[1] or ".mp4", delete=False) as f:
+            f.write(video_bytes)
+            path = f.name
     try:
-        font = ImageFont.load_default() # Hindari error arial.ttf
-    except:
-        font = None
-    
-    detections = []
-    for box in results[0].boxes:
-        coords = box.xyxy[0].tolist()
-        conf = float(box.conf[0])
-        cls_id = int(box.cls[0])
-        label = yolo_model.names[cls_id] if yolo_model is not None else "object"
-        
-        draw.rectangle(coords, outline="red", width=3)
-        draw.text((coords[0], coords[1]-10), f"{label} {conf:.2f}", fill="red")
-        detections.append(label)
-    return image, detections
-
-def calculate_nutrients(detected_labels):
-    summary = {"Protein": 0, "Carbs": 0, "Fat": 0, "Calories": 0, "Items": []}
-    for item in detected_labels:
-        item_lower = item.lower()
-        if item_lower in food_mapping:
-            food_name = food_mapping[item_lower]
-            row = nutrition_data[nutrition_data["FoodType"] == food_name].iloc[0]
-            summary["Protein"] += row["Protein"]
-            summary["Carbs"] += row["Carbs"]
-            summary["Fat"] += row["Fat"]
-            summary["Calories"] += row["Calories"]
-            summary["Items"].append(food_name)
-    return summary
+        if not (video_bytes is None and source.isdigit()):
+            # Jumlah frame untuk progres; perangkat/webcam tidak punya panjang
+            import cv2
+            capture = open_capture(path or source)
+            job.total = max(int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0), 0)
+            capture.release()
+        analyzer = StreamAnalyzer(model, index, min_confidence=min_confidence, max_seconds=max_seconds)
+        job.stats = analyzer.stats
+        for tray in analyzer.run(path or source, on_frame=lambda i: job.advance(i + 1 - job.completed)):
+            job.partial.append(tray)
+    finally:
+        if path is not None:
+            os.unlink(path)
+    return job.partial
+
+def render_video_mode():
+    """Mode video: unggah video atau tunjuk file/perangkat lokal; dianalisis sebagai job latar."""
+    st.markdown("""
+    <div class="bg-white p-6 rounded-xl shadow-lg mb-6">
+        <h3 class="text-xl font-semibold text-gray-800 mb-4">🎞️ Analisis Video Jalur Penyajian</h3>
+        <p class="text-gray-600">Setiap item dilacak antar frame dan dihitung sekali; total nutrisi dihitung per nampan yang lewat</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    uploaded_video = st.file_uploader("Pilih file video (MP4, AVI, MOV, MKV)", type=["mp4", "avi", "mov", "mkv"])
+    # Sumber lokal dibuka server dengan cv2.VideoCapture (file, perangkat, URL): hanya untuk admin
+    local_source = ""
+    if is_admin():
+        local_source = st.text_input(
+            "Atau sumber lokal di server (admin)",
+            placeholder="/data/rekaman.mp4 atau 0 untuk webcam",
+            help=f"Path file video di server atau nomor perangkat kamera (dibatasi {LIVE_MAX_SECONDS:g} detik)"
+        )
+    if uploaded_video is not None:
+        source, video_bytes = uploaded_video.name, uploaded_video.getvalue()
+    elif local_source.strip():
+        source, video_bytes = local_source.strip(), None
+    else:
+        return None
+
+    if model_loader.state == "failed":
+        st.error(f"❌ Gagal memuat model: {model_loader.error}")
+        return None
+    if yolo_model is None:
+        st.info("⏳ Video dapat dianalisis begitu model AI siap.")
+        return None
+
+    min_confidence = st.slider("🎯 Ambang confidence", 0.25, 0.95, 0.4, 0.05, key="video_confidence")
+    source_key = DetectionCache.make_key(video_bytes if video_bytes is not None else source.encode("utf-8"), yolo_model.identity)
+    key = (source_key, min_confidence)
+
+    manager = get_job_manager()
+    job = manager.get(st.session_state.get("video_job_id"))
+    if job is None or job.key != key:
+        if st.button("▶️ Analisis video"):
+            if job is not None:
+                manager.cancel(job.id)
+            model, index = yolo_model, nutrition_index
+            max_seconds = LIVE_MAX_SECONDS if video_bytes is None and source.isdigit() else None
+            job = manager.submit(
+                lambda job: run_video_job(job, model, index, source, video_bytes, min_confidence, max_seconds),
+                key=key,
+            )
+            st.session_state["video_job_id"] = job.id
+        else:
+            return None
+
+    stats = job.stats
+    if not job.finished:
+        text = f"🎞️ Frame {job.completed}" + (f"/{job.total}" if job.total else "")
+        st.progress(job.progress if job.total else 0.0, text=text)
+        if st.button("⛔ Hentikan analisis"):
+            manager.cancel(job.id)
+            st.rerun()
+    elif job.status == "failed":
+        st.error(f"❌ Analisis video gagal: {job.error}")
+    elif job.status == "cancelled":
+        st.warning("⛔ Analisis video dihentikan; nampan yang sudah selesai tetap ditampilkan.")
+
+    if stats and stats["frames_processed"]:
+        st.caption(
+            f"⚡ {stats['frames_processed']} dari {stats['frames_read']} frame diproses dalam {stats['seconds']:.1f} detik "
+            f"({stats['fps']:.1f} frame/detik di CPU, stride {stats['stride']})"
+        )
+    trays = list(job.partial)
+    if job.finished and trays:
+        record_history(job.id, trays, source="video")
+    if trays:
+        st.markdown("### 🍱 Total Nutrisi per Nampan", unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame([
+            {
+                "Nampan": t["Nampan"],
+                "Mulai (dtk)": round(t["Mulai"], 1),
+                "Selesai (dtk)": round(t["Selesai"], 1),
+                "Item": ", ".join(sorted(set(t["Items"]))),
+                "Jumlah_Item": len(t["Items"]),
+                "Kalori": t["Calories"],
+                "Protein": t["Protein"],
+                "Karbohidrat": t["Carbs"],
+                "Lemak": t["Fat"],
+            }
+            for t in trays
+        ]), use_container_width=True)
+    elif job.finished:
+        st.warning("⚠️ Tidak ada nampan dengan item makanan terdeteksi")
+    return job
+
+def draw_detections(image, detections):
+    # Semua kotak dan label digambar ke satu mask lalu ditempel sekali (lihat detection.render_detections)
+    return render_detections(image, detections, nutrition_index.labels)
+
+def calculate_nutrients(detections_list, weighting=None):
+    """Ringkasan nutrisi per gambar; satu operasi matriks untuk seluruh batch."""
+    with metrics.span("vision.nutrients"):
+        return summarize(nutrition_index, detections_list, weighting)
+
+def render_analysis(processed_img, labels, nutrisi):
+    col_img, col_res = st.columns([2, 1])
+
+    with col_img:
+        st.markdown("""
+        <div class="bg-white p-4 rounded-xl shadow-lg">
+            <h4 class="text-lg font-semibold text-gray-800 mb-2">🖼️ Gambar Hasil Deteksi</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        st.image(processed_img, caption="Hasil Deteksi AI")
+
+    with col_res:
+        # Detection Summary
+        if len(labels) > 0:
+            st.success(f"✅ Ditemukan {len(labels)} objek makanan")
+        else:
+            st.warning("⚠️ Tidak ada objek makanan terdeteksi")
+
+        # Nutrition Results
+        st.markdown("""
+        <div class="bg-white p-4 rounded-xl shadow-lg mb-4">
+            <h4 class="text-lg font-semibold text-gray-800 mb-3">🥗 Estimasi Nutrisi</h4>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Nutrition Metrics in a grid
+        nutr_cols = st.columns(2)
+        with nutr_cols[0]:
+            st.metric("🔥 Kalori", f"{nutrisi['Calories']:.0f} kcal")
+            st.metric("🍗 Protein", f"{nutrisi['Protein']:.1f} g")
+        with nutr_cols[1]:
+            st.metric("🍞 Karbohidrat", f"{nutrisi['Carbs']:.1f} g")
+            st.metric("🥑 Lemak", f"{nutrisi['Fat']:.1f} g")
+
+        # Detected Items
+        if nutrisi["Items"]:
+            st.markdown("""
+            <div class="bg-green-50 p-4 rounded-xl border-l-4 border-green-500 mt-4">
+                <h5 class="font-semibold text-green-800 mb-2">✅ Item Terdeteksi:</h5>
+                <p class="text-green-700">{}</p>
+            </div>
+            """.format(", ".join(set(nutrisi["Items"]))), unsafe_allow_html=True)
+        else:
+            st.markdown("""
+            <div class="bg-blue-50 p-4 rounded-xl border-l-4 border-blue-500 mt-4">
+                <h5 class="font-semibold text-blue-800 mb-2">💡 Tips:</h5>
+                <p class="text-blue-700">Gunakan objek seperti: Banana, Apple, Sandwich, Pizza untuk tes nutrisi.</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+def is_admin():
+    # Token dimasukkan di panel admin sidebar (widget key admin_token); selalu False jika JALU_ADMIN_TOKEN kosong
+    token = os.environ.get("JALU_ADMIN_TOKEN")
+    entered = st.session_state.get("admin_token") or ""
+    return bool(token) and hmac.compare_digest(entered.encode("utf-8"), token.encode("utf-8"))
+
+def render_admin_panel():
+    # Hanya tampil jika JALU_ADMIN_TOKEN di-set dan token yang dimasukkan cocok
+    if not os.environ.get("JALU_ADMIN_TOKEN"):
+        return
+    with st.sidebar.expander("🔒 Admin: latensi per tahap"):
+        entered = st.text_input("Token admin", type="password", key="admin_token")
+        if not is_admin():
+            if entered:
+                st.caption("Token tidak cocok.")
+            return
+        stages = pd.DataFrame(metrics.stage_summary())
+        if stages.empty:
+            st.caption("Belum ada span tercatat.")
+        else:
+            st.dataframe(stages.set_index("stage").round(1), use_container_width=True)
+        caches = {name: summary["hit_rate"] for name, summary in metrics.cache_summary().items()}
+        caches["detection"] = get_detection_cache().stats()["hit_rate"]
+        st.caption("Hit rate cache: " + " · ".join(f"{name} {rate:.0%}" for name, rate in caches.items()))
+        if os.environ.get("JALU_METRICS_PORT"):
+            st.caption(f"Prometheus: http://{os.environ.get('JALU_METRICS_HOST', '127.0.0.1')}:{os.environ['JALU_METRICS_PORT']}/metrics")
 
 # --- SIDEBAR NAVIGATION ---
 st.sidebar.title("JALU Platform")
-page = st.sidebar.radio("Navigasi", ["Beranda Website", "Dashboard Analisis", "Deteksi AI Vision"])
+page = st.sidebar.radio("Navigasi", ["Beranda Website", "Dashboard Analisis", "Deteksi AI Vision", "Riwayat Deteksi"])
 
 # =============================================================================
 # PAGE 1: BERANDA WEBSITE
@@ -235,6 +571,10 @@ if page == "Beranda Website":
 # PAGE 2: DASHBOARD ANALISIS
 # =============================================================================
 elif page == "Dashboard Analisis":
+    # plotly hanya diimport saat halaman dashboard dibuka
+    import dashboard_charts as charts
+    mbg_store = get_mbg_store()
+
     st.markdown("""
     <div class="text-center py-8">
         <h1 class="text-4xl font-bold text-gray-800 mb-2">📊 Dashboard Analitik MBG</h1>
@@ -254,35 +594,23 @@ elif page == "Dashboard Analisis":
         with col1:
             selected_prov = st.multiselect(
                 "🏛️ Pilih Provinsi",
-                mbg_data["Provinsi"].unique(),
-                default=mbg_data["Provinsi"].unique(),
+                mbg_store.dimension_values("Provinsi"),
+                default=mbg_store.dimension_values("Provinsi"),
                 help="Pilih provinsi yang ingin dianalisis"
             )
         with col2:
             selected_lvl = st.multiselect(
                 "🎓 Jenjang Sekolah",
-                mbg_data["Jenjang_Pendidikan"].unique(),
-                default=mbg_data["Jenjang_Pendidikan"].unique(),
+                mbg_store.dimension_values("Jenjang_Pendidikan"),
+                default=mbg_store.dimension_values("Jenjang_Pendidikan"),
                 help="Pilih jenjang pendidikan yang ingin dianalisis"
             )
 
-    filtered = mbg_data[(mbg_data["Provinsi"].isin(selected_prov)) & (mbg_data["Jenjang_Pendidikan"].isin(selected_lvl))]
+    filters = {"Provinsi": selected_prov, "Jenjang_Pendidikan": selected_lvl}
 
     # Summary Cards
     st.markdown("### 📈 Ringkasan Data", unsafe_allow_html=True)
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        total_students = filtered["Jumlah_Siswa_Penerima"].sum()
-        st.metric("👥 Total Siswa", f"{total_students:,.0f}")
-    with col2:
-        avg_satisfaction = filtered["Tingkat_Kepuasan"].mean()
-        st.metric("😊 Kepuasan Rata-rata", f"{avg_satisfaction:.1f}%")
-    with col3:
-        avg_success = filtered["Indeks_Keberhasilan"].mean()
-        st.metric("🎯 Keberhasilan Rata-rata", f"{avg_success:.1f}%")
-    with col4:
-        avg_budget = filtered["Anggaran_Terserap"].mean()
-        st.metric("💰 Anggaran Terserap", f"{avg_budget:.1f}%")
+    summary_container = st.container()
 
     # Charts Section with lazy loading
     st.markdown("### 📊 Visualisasi Data", unsafe_allow_html=True)
@@ -295,6 +623,38 @@ elif page == "Dashboard Analisis":
         help="Pilih untuk mengoptimalkan performa loading"
     )
 
+    # Baca hanya kolom untuk kartu ringkasan dan chart yang tampil; filter dipangkas per partisi
+    needed_columns = []
+    for group, columns in CHART_COLUMNS.items():
+        if selected_charts in ("Semua Chart", group):
+            needed_columns += [c for c in columns if c not in needed_columns]
+    chart_rows = {}
+
+    def chart_data():
+        if "rows" not in chart_rows:
+            with metrics.span("dashboard.load"):
+                chart_rows["rows"] = mbg_store.load(columns=needed_columns, filters=filters)
+        return chart_rows["rows"]
+
+    filter_signature = tuple((dim, tuple(sorted(values))) for dim, values in filters.items())
+    rollup = get_mbg_rollup(mbg_store.version)
+    with metrics.span("dashboard.filter"):
+        totals = rollup.totals(filters)
+
+    col1, col2, col3, col4 = summary_container.columns(4)
+    with col1:
+        total_students = totals["sum:Jumlah_Siswa_Penerima"]
+        st.metric("👥 Total Siswa", f"{total_students:,.0f}")
+    with col2:
+        avg_satisfaction = totals["mean:Tingkat_Kepuasan"]
+        st.metric("😊 Kepuasan Rata-rata", f"{avg_satisfaction:.1f}%")
+    with col3:
+        avg_success = totals["mean:Indeks_Keberhasilan"]
+        st.metric("🎯 Keberhasilan Rata-rata", f"{avg_success:.1f}%")
+    with col4:
+        avg_budget = totals["mean:Anggaran_Terserap"]
+        st.metric("💰 Anggaran Terserap", f"{avg_budget:.1f}%")
+
     if selected_charts == "Semua Chart" or selected_charts == "Chart Utama":
         # Row 1: Bar Chart and Scatter Plot
         c1, c2 = st.columns(2)
@@ -305,15 +665,7 @@ elif page == "Dashboard Analisis":
             </div>
             """, unsafe_allow_html=True)
             with st.spinner("Memuat chart distribusi..."):
-                fig1 = px.bar(
-                    filtered,
-                    x="Provinsi",
-                    y="Jumlah_Siswa_Penerima",
-                    color="Jenjang_Pendidikan",
-                    title="",
-                    template="plotly_white"
-                )
-                fig1.update_layout(showlegend=True, height=400)
+                fig1 = chart_figure("bar", filter_signature, mbg_store.version, lambda: charts.bar_figure(chart_data()))
                 st.plotly_chart(fig1, use_container_width=True)
 
         with c2:
@@ -323,16 +675,7 @@ elif page == "Dashboard Analisis":
             </div>
             """, unsafe_allow_html=True)
             with st.spinner("Memuat chart scatter..."):
-                fig2 = px.scatter(
-                    filtered,
-                    x="Tingkat_Kepuasan",
-                    y="Indeks_Keberhasilan",
-                    size="Jumlah_Siswa_Penerima",
-                    color="Provinsi",
-                    title="",
-                    template="plotly_white"
-                )
-                fig2.update_layout(height=400)
+                fig2 = chart_figure("scatter", filter_signature, mbg_store.version, lambda: charts.scatter_figure(chart_data()))
                 st.plotly_chart(fig2, use_container_width=True)
 
     if selected_charts == "Semua Chart" or selected_charts == "Chart Detail":
@@ -346,16 +689,10 @@ elif page == "Dashboard Analisis":
             """, unsafe_allow_html=True)
             with st.spinner("Memuat chart pie..."):
                 # Aggregate data by province for pie chart
-                prov_budget = filtered.groupby("Provinsi")["Anggaran_Terserap"].mean().reset_index()
-                fig3 = px.pie(
-                    prov_budget,
-                    values="Anggaran_Terserap",
-                    names="Provinsi",
-                    title="",
-                    template="plotly_white",
-                    color_discrete_sequence=px.colors.qualitative.Set3
+                fig3 = chart_figure(
+                    "pie", filter_signature, mbg_store.version,
+                    lambda: charts.pie_figure(rollup.group_mean(filters, "Provinsi", "Anggaran_Terserap"))
                 )
-                fig3.update_layout(height=400)
                 st.plotly_chart(fig3, use_container_width=True)
 
         with c4:
@@ -365,15 +702,10 @@ elif page == "Dashboard Analisis":
             </div>
             """, unsafe_allow_html=True)
             with st.spinner("Memuat chart box..."):
-                fig4 = px.box(
-                    filtered,
-                    x="Jenjang_Pendidikan",
-                    y="Tingkat_Kepuasan",
-                    color="Jenjang_Pendidikan",
-                    title="",
-                    template="plotly_white"
+                fig4 = chart_figure(
+                    "box", filter_signature, mbg_store.version,
+                    lambda: charts.box_figure(charts.box_quartiles(chart_data()))
                 )
-                fig4.update_layout(height=400, showlegend=False)
                 st.plotly_chart(fig4, use_container_width=True)
 
         # Row 3: Line Chart and Heatmap
@@ -385,16 +717,7 @@ elif page == "Dashboard Analisis":
             </div>
             """, unsafe_allow_html=True)
             with st.spinner("Memuat chart line..."):
-                fig5 = px.line(
-                    filtered.sort_values("Indeks_Keberhasilan"),
-                    x="Provinsi",
-                    y="Indeks_Keberhasilan",
-                    color="Jenjang_Pendidikan",
-                    markers=True,
-                    title="",
-                    template="plotly_white"
-                )
-                fig5.update_layout(height=400)
+                fig5 = chart_figure("line", filter_signature, mbg_store.version, lambda: charts.line_figure(chart_data()))
                 st.plotly_chart(fig5, use_container_width=True)
 
         with c6:
@@ -405,17 +728,10 @@ elif page == "Dashboard Analisis":
             """, unsafe_allow_html=True)
             with st.spinner("Memuat heatmap korelasi..."):
                 # Create correlation matrix for key metrics
-                corr_data = filtered[["Tingkat_Kepuasan", "Penurunan_Stunting", "Indeks_Keberhasilan", "Anggaran_Terserap"]]
-                corr_matrix = corr_data.corr()
-                fig6 = px.imshow(
-                    corr_matrix,
-                    text_auto=True,
-                    aspect="auto",
-                    title="",
-                    template="plotly_white",
-                    color_continuous_scale="RdBu_r"
+                fig6 = chart_figure(
+                    "heatmap", filter_signature, mbg_store.version,
+                    lambda: charts.heatmap_figure(rollup.correlation(filters))
                 )
-                fig6.update_layout(height=400)
                 st.plotly_chart(fig6, use_container_width=True)
 
     # Data Table with pagination for better performance
@@ -427,27 +743,48 @@ elif page == "Dashboard Analisis":
     """, unsafe_allow_html=True)
 
     # Add pagination controls
-    rows_per_page = st.selectbox(
-        "📄 Baris per halaman:",
-        options=[10, 25, 50, 100],
-        index=1,  # Default 25
-        help="Pilih jumlah baris untuk performa optimal"
-    )
+    page_col1, page_col2, page_col3 = st.columns(3)
+    with page_col1:
+        rows_per_page = st.selectbox(
+            "📄 Baris per halaman:",
+            options=[10, 25, 50, 100],
+            index=1,  # Default 25
+            help="Pilih jumlah baris untuk performa optimal"
+        )
+    with page_col2:
+        sort_by = st.selectbox(
+            "↕️ Urutkan berdasarkan:",
+            options=["(Tanpa urutan)"] + mbg_store.numeric_columns,
+            help="Pengurutan dilakukan di lapisan data, hanya halaman aktif yang dimuat"
+        )
+    with page_col3:
+        sort_ascending = st.radio("Arah urutan:", ["Naik", "Turun"], horizontal=True) == "Naik"
+    if sort_by == "(Tanpa urutan)":
+        sort_by = None
 
-    total_rows = len(filtered)
+    # Jumlah baris dan maksimum kolom berasal dari rollup; hanya jendela halaman yang diambil dari data
+    total_rows = int(totals["count"])
     total_pages = (total_rows // rows_per_page) + (1 if total_rows % rows_per_page > 0 else 0)
 
     if total_pages > 1:
         page_num = st.slider("Halaman:", 1, total_pages, 1)
         start_idx = (page_num - 1) * rows_per_page
         end_idx = start_idx + rows_per_page
-        display_data = filtered.iloc[start_idx:end_idx]
         st.caption(f"Menampilkan {start_idx + 1}-{min(end_idx, total_rows)} dari {total_rows} baris")
     else:
-        display_data = filtered
+        start_idx = 0
+    with metrics.span("dashboard.page"):
+        display_data = mbg_store.fetch_page(
+            filters, offset=start_idx, limit=rows_per_page, sort_by=sort_by, ascending=sort_ascending
+        )
+    column_max = rollup.column_max(filters)
+
+    def highlight_filtered_max(column):
+        target = column_max.get(column.name)
+        return ["background-color: yellow" if target is not None and value == target else "" for value in column]
 
     st.dataframe(
-        display_data.style.highlight_max(axis=0),
+        display_data.style.apply(highlight_filtered_max, axis=0),
         use_container_width=True,
         height=min(400, len(display_data) * 35 + 50)  # Dynamic height based on rows
     )
@@ -463,95 +800,187 @@ elif page == "Deteksi AI Vision":
     </div>
     """, unsafe_allow_html=True)
 
-    # Upload Section
+    # Model dimuat di thread latar; halaman ini rerun sendiri sampai status loader selesai
+    if model_loader.ready:
+        yolo_model = session_model(model_loader)
+        calorie_model = get_calorie_model()
+        nutrition_data, nutrition_version = load_nutrition_table(calorie_model.version if calorie_model else None, calorie_model)
+        nutrition_index = get_nutrition_index(yolo_model.identity, nutrition_version, yolo_model.names, nutrition_data)
+        st.caption(f"✅ Model AI siap ({yolo_model.kind}, dimuat dalam {model_loader.elapsed():.1f} detik)")
+        if hasattr(model_loader, "active_versions"):
+            versions = ", ".join(f"{channel} {version}" for channel, version in model_loader.active_versions().items())
+            st.caption(f"🗂️ Registry model: {versions} · {model_loader.swaps} kali ditukar")
+        if calorie_model is not None:
+            calorie_stats = calorie_model.stats()
+            st.caption(f"🔥 Model kalori dimuat dalam {calorie_stats['load_ms']:.1f} ms; "
+                       f"{calorie_stats['predictions']} estimasi, {calorie_stats['us_per_item']:.0f} µs/item")
+    elif not model_loader.done:
+        st.info(f"⏳ Model AI sedang dimuat di latar belakang ({model_loader.elapsed():.0f} detik)... Anda sudah bisa memilih gambar atau video.")
+
+    st.text_input("🏫 Nama sekolah", key="history_school", help="Dicatat bersama hasil analisis di Riwayat Deteksi")
+    vision_mode = st.radio("Mode analisis", ["📷 Foto", "🎞️ Video / Webcam"], horizontal=True)
+
+    if vision_mode == "📷 Foto":
+        # Upload Section
+        st.markdown("""
+        <div class="bg-white p-6 rounded-xl shadow-lg mb-6">
+            <h3 class="text-xl font-semibold text-gray-800 mb-4">📤 Upload Gambar Makanan</h3>
+            <p class="text-gray-600">Pilih gambar makanan yang ingin dianalisis nutrisi nya</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        uploaded_files = st.file_uploader(
+            "Pilih file gambar (JPG, PNG, JPEG)",
+            type=["jpg", "png", "jpeg"],
+            accept_multiple_files=True,
+            help="Upload satu atau beberapa gambar makanan untuk deteksi nutrisi"
+        )
+
+        if uploaded_files:
+            # Processing Section
+            st.markdown("### 🔍 Proses Analisis", unsafe_allow_html=True)
+
+            # Pastikan model tersedia
+            if model_loader.state == "failed":
+                st.error(f"❌ Gagal memuat model: {model_loader.error}")
+                st.error("Model AI tidak tersedia. Pastikan file model ada di server (JALU_MODEL_PATH) atau set JALU_ALLOW_DOWNLOAD=1 untuk mengunduh model YOLO.")
+            elif yolo_model is None:
+                st.info("⏳ Gambar akan dianalisis otomatis begitu model AI siap.")
+            else:
+                weighting_labels = {"Jumlah item": None, "Confidence deteksi": "confidence", "Luas kotak (porsi)": "area"}
+                weighting = weighting_labels[st.radio(
+                    "⚖️ Estimasi porsi",
+                    list(weighting_labels),
+                    horizontal=True,
+                    help="Bobot tiap item: dihitung satu porsi, dikali confidence, atau sebanding luas kotak deteksi"
+                )]
+                min_confidence = st.slider(
+                    "🎯 Ambang confidence",
+                    0.25, 0.95, 0.25, 0.05,
+                    help="Kotak dengan confidence di bawah ambang tidak digambar dan tidak dihitung nutrisinya"
+                )
+
+                # Deteksi berjalan sebagai job latar; rerun berikutnya hanya membaca status/hasilnya
+                active_job = current_detection_job([f.getvalue() for f in uploaded_files])
+                if not active_job.finished:
+                    st.progress(
+                        active_job.progress,
+                        text=f"🤖 AI sedang menganalisis {active_job.completed}/{active_job.total} gambar..."
+                    )
+                    if st.button("⛔ Batalkan analisis"):
+                        get_job_manager().cancel(active_job.id)
+                        st.rerun()
+                elif active_job.status == "cancelled":
+                    st.warning("⛔ Analisis dibatalkan.")
+                    if st.button("🔁 Analisis ulang"):
+                        st.session_state.pop("detection_job_id", None)
+                        st.rerun()
+                elif active_job.status == "failed":
+                    st.error(f"❌ Analisis gagal: {active_job.error}")
+
+            if active_job is not None and active_job.status == "done":
+                with st.spinner("🖼️ Menyiapkan hasil..."):
+                    images, all_detections = active_job.result
+                    # Hasil job tidak diubah; ambang confidence disaring ulang tiap rerun (satu mask per gambar)
+                    all_detections = [d.subset(d.scores >= min_confidence) for d in all_detections]
+                    elapsed = active_job.elapsed
+                    summaries = calculate_nutrients(all_detections, weighting)
+                    record_history(active_job.id, summaries, source="foto")
+                    analyses = []
+                    for image, detections, nutrisi in zip(images, all_detections, summaries):
+                        # Digambar di thumbnail tampilan, bukan salinan resolusi penuh
+                        with metrics.span("vision.draw"):
+                            processed_img, labels = draw_detections(image.display.copy(), image.to_display(detections))
+                        analyses.append((processed_img, labels, nutrisi))
+
+                cache_stats = get_detection_cache().stats()
+                st.caption(
+                    f"🗃️ Cache deteksi: {cache_stats['hits']} hit "
+                    f"({cache_stats['disk_hits']} dari disk) / {cache_stats['misses']} miss, "
+                    f"hit rate {cache_stats['hit_rate']:.0%}"
+                )
+
+                # Results Section
+                st.markdown("### 📊 Hasil Analisis", unsafe_allow_html=True)
+
+                if len(analyses) == 1:
+                    render_analysis(*analyses[0])
+                else:
+                    st.caption(f"⚡ {len(images)} gambar dianalisis dalam {elapsed:.2f} detik ({len(images) / max(elapsed, 1e-6):.1f} gambar/detik)")
+                    summary = pd.DataFrame([
+                        {
+                            "File": f.name,
+                            "Jumlah_Item": len(n["Items"]),
+                            "Kalori": n["Calories"],
+                            "Protein": n["Protein"],
+                            "Karbohidrat": n["Carbs"],
+                            "Lemak": n["Fat"],
+                        }
+                        for f, (_, _, n) in zip(uploaded_files, analyses)
+                    ])
+                    st.dataframe(summary, use_container_width=True)
+                    for f, analysis in zip(uploaded_files, analyses):
+                        with st.expander(f"🖼️ {f.name}"):
+                            render_analysis(*analysis)
+        elif model_loader.state == "failed":
+            st.error(f"❌ Gagal memuat model: {model_loader.error}")
+        else:
+            # Placeholder when no image uploaded
+            st.markdown("""
+            <div class="text-center py-12 bg-gray-50 rounded-xl">
+                <div class="text-6xl mb-4">📷</div>
+                <h3 class="text-xl font-semibold text-gray-700 mb-2">Belum ada gambar diupload</h3>
+                <p class="text-gray-500">Silakan upload gambar makanan untuk mulai analisis nutrisi</p>
+            </div>
+            """, unsafe_allow_html=True)
+    else:
+        active_job = render_video_mode()
+
+# =============================================================================
+# PAGE 4: RIWAYAT DETEKSI
+# =============================================================================
+elif page == "Riwayat Deteksi":
+    import dashboard_charts as charts
+    history_store = get_history_store()
+
     st.markdown("""
-    <div class="bg-white p-6 rounded-xl shadow-lg mb-6">
-        <h3 class="text-xl font-semibold text-gray-800 mb-4">📤 Upload Gambar Makanan</h3>
-        <p class="text-gray-600">Pilih gambar makanan yang ingin dianalisis nutrisi nya</p>
+    <div class="text-center py-8">
+        <h1 class="text-4xl font-bold text-gray-800 mb-2">🗂️ Riwayat Deteksi</h1>
+        <p class="text-lg text-gray-600">Rekap nutrisi hasil analisis AI per sekolah, harian dan mingguan</p>
     </div>
     """, unsafe_allow_html=True)
 
-    uploaded_file = st.file_uploader(
-        "Pilih file gambar (JPG, PNG, JPEG)",
-        type=["jpg", "png", "jpeg"],
-        help="Upload gambar makanan untuk deteksi nutrisi"
-    )
-
-    if uploaded_file:
-        image = Image.open(uploaded_file).convert("RGB")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        granularity = {"Harian": "day", "Mingguan": "week"}[st.radio("📅 Periode", ["Harian", "Mingguan"], horizontal=True)]
+    with col2:
+        selected_schools = st.multiselect("🏫 Sekolah", history_store.schools(), help="Kosong = semua sekolah")
+    with col3:
+        today = pd.Timestamp.today().date()
+        date_range = st.date_input("🗓️ Rentang tanggal", (today - pd.Timedelta(days=30), today))
 
-        # Processing Section
-        st.markdown("### 🔍 Proses Analisis", unsafe_allow_html=True)
+    start, end = (date_range + (None, None))[:2] if isinstance(date_range, tuple) else (date_range, None)
+    # Dibaca dari tabel rollup (bukan riwayat mentah), jadi cepat berapa pun banyaknya analisis
+    history = history_store.rollup(granularity, selected_schools, start, end)
 
-        # Pastikan model tersedia
-        if yolo_model is None:
-            st.error("Model AI tidak tersedia. Pastikan file model ada atau environment dapat mengunduh model YOLO (internet).")
-        else:
-            with st.spinner("🤖 AI sedang menganalisis gambar..."):
-                results = yolo_model(image)
-                processed_img, labels = draw_detections(image.copy(), results)
-                nutrisi = calculate_nutrients(labels)
-
-            # Results Section
-            st.markdown("### 📊 Hasil Analisis", unsafe_allow_html=True)
-
-            col_img, col_res = st.columns([2, 1])
-
-            with col_img:
-                st.markdown("""
-                <div class="bg-white p-4 rounded-xl shadow-lg">
-                    <h4 class="text-lg font-semibold text-gray-800 mb-2">🖼️ Gambar Hasil Deteksi</h4>
-                </div>
-                """, unsafe_allow_html=True)
-                st.image(processed_img, caption="Hasil Deteksi AI")
-
-            with col_res:
-                # Detection Summary
-                if len(labels) > 0:
-                    st.success(f"✅ Ditemukan {len(labels)} objek makanan")
-                else:
-                    st.warning("⚠️ Tidak ada objek makanan terdeteksi")
-
-                # Nutrition Results
-                st.markdown("""
-                <div class="bg-white p-4 rounded-xl shadow-lg mb-4">
-                    <h4 class="text-lg font-semibold text-gray-800 mb-3">🥗 Estimasi Nutrisi</h4>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Nutrition Metrics in a grid
-                nutr_cols = st.columns(2)
-                with nutr_cols[0]:
-                    st.metric("🔥 Kalori", f"{nutrisi['Calories']:.0f} kcal")
-                    st.metric("🍗 Protein", f"{nutrisi['Protein']:.1f} g")
-                with nutr_cols[1]:
-                    st.metric("🍞 Karbohidrat", f"{nutrisi['Carbs']:.1f} g")
-                    st.metric("🥑 Lemak", f"{nutrisi['Fat']:.1f} g")
-
-                # Detected Items
-                if nutrisi["Items"]:
-                    st.markdown("""
-                    <div class="bg-green-50 p-4 rounded-xl border-l-4 border-green-500 mt-4">
-                        <h5 class="font-semibold text-green-800 mb-2">✅ Item Terdeteksi:</h5>
-                        <p class="text-green-700">{}</p>
-                    </div>
-                    """.format(", ".join(set(nutrisi["Items"]))), unsafe_allow_html=True)
-                else:
-                    st.markdown("""
-                    <div class="bg-blue-50 p-4 rounded-xl border-l-4 border-blue-500 mt-4">
-                        <h5 class="font-semibold text-blue-800 mb-2">💡 Tips:</h5>
-                        <p class="text-blue-700">Gunakan objek seperti: Banana, Apple, Sandwich, Pizza untuk tes nutrisi.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+    if history.empty:
+        st.info("📭 Belum ada analisis tercatat untuk filter ini. Hasil dari halaman Deteksi AI Vision akan muncul di sini.")
     else:
-        # Placeholder when no image uploaded
-        st.markdown("""
-        <div class="text-center py-12 bg-gray-50 rounded-xl">
-            <div class="text-6xl mb-4">📷</div>
-            <h3 class="text-xl font-semibold text-gray-700 mb-2">Belum ada gambar diupload</h3>
-            <p class="text-gray-500">Silakan upload gambar makanan untuk mulai analisis nutrisi</p>
-        </div>
-        """, unsafe_allow_html=True)
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("🧾 Analisis", f"{history['analyses'].sum():,}")
+        m2.metric("🍱 Item", f"{history['items'].sum():,}")
+        m3.metric("🔥 Kalori", f"{history['Calories'].sum():,.0f} kcal")
+        m4.metric("🍗 Protein", f"{history['Protein'].sum():,.1f} g")
+        st.plotly_chart(charts.history_figure(history), use_container_width=True)
+        st.dataframe(history.rename(columns={
+            "period": "Periode", "school": "Sekolah", "analyses": "Analisis", "items": "Item",
+            "Calories": "Kalori", "Carbs": "Karbohidrat", "Fat": "Lemak",
+        }), use_container_width=True)
+
+    with st.expander("🕘 Analisis terbaru"):
+        st.dataframe(history_store.recent(20), use_container_width=True)
+    history_stats = history_store.stats()
+    st.caption(f"💾 {history_stats['written']} analisis tercatat sejak server mulai, {history_stats['pending']} menunggu ditulis")
 
 # =============================================================================
 # FOOTER
@@ -572,3 +1001,24 @@ st.markdown("""
     </div>
 </div>
 """, unsafe_allow_html=True)
+
+# Cold start: waktu dari run pertama proses sampai seluruh halaman pertama terkirim
+if startup_clock["first_paint"] is None:
+    startup_clock["first_paint"] = time.perf_counter() - startup_clock["started"]
+    print(f"[JALU] first paint {startup_clock['first_paint']:.2f}s (model: {model_loader.state})")
+st.sidebar.caption(
+    f"⏱️ Cold start {startup_clock['first_paint']:.2f} dtk hingga tampilan pertama · "
+    f"render ini {time.perf_counter() - script_started:.2f} dtk · model: {model_loader.state}"
+    + (f" ({model_loader.load_seconds:.1f} dtk)" if model_loader.load_seconds is not None else "")
+)
+
+metrics.observe(f"rerun.{page}", time.perf_counter() - script_started)
+render_admin_panel()
+
+# Halaman Vision menunggu model atau job deteksi: cek lagi sebentar lagi tanpa memblokir render di atas
+if page == "Deteksi AI Vision" and not model_loader.done:
+    model_loader.wait(timeout=1.0)
+    st.rerun()
+if active_job is not None and not active_job.finished:
+    active_job.wait(timeout=0.5)
+    st.rerun()
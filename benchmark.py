@@ -0,0 +1,265 @@
+# =============================================================================
+# JALU - Benchmark jalur panas
+# Mengukur waktu dekode gambar, inferensi model lokal, render kotak deteksi,
+# perhitungan nutrisi, serta filter/agregasi/figure Dashboard pada data
+# sintetis (15 baris s.d. 10 juta baris). Berjalan offline di CPU. Hasil
+# disimpan sebagai JSON dan dibandingkan dengan run sebelumnya (atau baseline
+# yang dipatok) memakai ambang regresi; exit code 1 jika ada regresi.
+#
+# Penggunaan CLI:
+#   python benchmark.py                                   # semua grup, ukuran default
+#   python benchmark.py --only dashboard --sizes 15,1000,10000000
+#   python benchmark.py --baseline benchmark_baseline.json --threshold 0.2
+# =============================================================================
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_SIZES = [15, 1_000, 100_000, 1_000_000]
+GROUPS = ("decode", "inference", "draw", "nutrients", "dashboard")
+
+# Selisih absolut minimum sebelum perubahan dianggap regresi (menyaring noise timer di skala mikrodetik)
+MIN_DELTA_MS = 0.05
+
+# Kolom MBG yang dipakai Dashboard
+MBG_COLUMNS = [
+    "Provinsi", "Jenjang_Pendidikan", "Kabupaten_Kota", "Jumlah_Siswa_Penerima", "Tingkat_Kepuasan",
+    "Penurunan_Stunting", "Indeks_Keberhasilan", "Anggaran_Terserap",
+]
+
+
+def measure(fn, min_runs=3, max_runs=50, budget=0.5, max_seconds=20.0):
+    """Jalankan `fn` berulang sampai `budget` detik terpakai (min/max jumlah run); waktu dalam ms."""
+    times = []
+    while len(times) < max_runs and (len(times) < min_runs or sum(times) < budget):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+        if sum(times) > max_seconds:
+            break
+    times_ms = [t * 1000 for t in times]
+    return {"median_ms": statistics.median(times_ms), "min_ms": min(times_ms), "runs": len(times_ms)}
+
+
+def synthetic_jpeg(megapixels, seed=0):
+    """JPEG 4:3 bergradien + noise, ukuran file mendekati foto kamera."""
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    width = int(round((megapixels * 1e6 * 4 / 3) ** 0.5))
+    height = width * 3 // 4
+    gradient = np.linspace(0, 200, width, dtype=np.float32)[None, :, None] + np.zeros((height, 1, 3), np.float32)
+    pixels = (gradient + rng.normal(0, 12, (height, width, 3))).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def synthetic_detections(count, image_size, num_classes, seed=0):
+    from detection import Detections
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+    xy = rng.uniform(0, 0.8, (count, 2)) * (width, height)
+    wh = rng.uniform(0.05, 0.2, (count, 2)) * (width, height)
+    return Detections(
+        boxes=np.hstack([xy, xy + wh]).astype(np.float32),
+        scores=rng.uniform(0.25, 1.0, count).astype(np.float32),
+        classes=rng.integers(0, num_classes, count).astype(np.int32),
+        image_size=tuple(image_size),
+    )
+
+
+def _class_names():
+    from nutrition import default_nutrition_table
+    foods = default_nutrition_table()["FoodType"].tolist()
+    return dict(enumerate(["person", "chair", "dining table"] + [food.lower() for food in foods]))
+
+
+def bench_decode(sizes):
+    from preprocess import prepare_image
+    for megapixels in (0.3, 3, 12):
+        data = synthetic_jpeg(megapixels)
+        yield "decode.prepare_image", megapixels, lambda: prepare_image(data)
+
+
+def bench_inference(sizes, model_path=None):
+    from inference_backend import load_backend, warmup
+    model = warmup(load_backend(model_path, address=""))
+    from preprocess import prepare_image
+    array = prepare_image(synthetic_jpeg(3)).array
+    for batch in (1, 8):
+        yield f"inference.{model.kind}", batch, lambda: model.predict([array] * batch)
+
+
+def bench_draw(sizes):
+    from PIL import Image
+    from detection import render_detections
+    from nutrition import build_nutrient_matrix, default_nutrition_table
+    matrix = build_nutrient_matrix(default_nutrition_table(), _class_names())
+    display = Image.new("RGB", (1024, 768), "white")
+    for count in (1, 10, 100):
+        detections = synthetic_detections(count, display.size, matrix.num_classes)
+        yield "draw.render_detections", count, lambda: render_detections(display.copy(), detections, matrix.labels)
+
+
+def bench_nutrients(sizes):
+    from nutrition import build_nutrient_matrix, default_nutrition_table, summarize
+    matrix = build_nutrient_matrix(default_nutrition_table(), _class_names())
+    for images in (1, 100, 10_000):
+        batch = [synthetic_detections(10, (640, 480), matrix.num_classes, seed=i) for i in range(images)]
+        yield "nutrients.summarize", images, lambda: summarize(matrix, batch, "area")
+
+
+def bench_dashboard(sizes):
+    import dashboard_charts as charts
+    from mbg_rollup import build_rollup
+    from mbg_generator import LEVELS, PROVINCES, generate
+    from mbg_store import FrameStore
+
+    columns = ["Provinsi", "Jenjang_Pendidikan", "Jumlah_Siswa_Penerima", "Tingkat_Kepuasan", "Indeks_Keberhasilan"]
+    filters = {"Provinsi": PROVINCES[::2], "Jenjang_Pendidikan": LEVELS[:2]}
+    for rows in sizes:
+        frame = generate(rows, seed=0, columns=MBG_COLUMNS)
+        store = FrameStore(frame)
+
+        def select():
+            # Tanpa cache seleksi: yang diukur bitmap AND, bukan lookup cache
+            store._selection_cache.clear()
+            store._dimension_cache.clear()
+            return store.select_rows(filters)
+
+        data = store.load(columns=columns, filters=filters)
+        rollup = build_rollup(store)
+        yield "dashboard.index", rows, lambda: FrameStore(frame)
+        yield "dashboard.filter", rows, select
+        yield "dashboard.load", rows, lambda: store.load(columns=columns, filters=filters)
+        yield "dashboard.rollup", rows, lambda: build_rollup(store)
+        yield "dashboard.aggregate", rows, lambda: (
+            rollup.totals(filters), rollup.group_mean(filters, "Provinsi", "Anggaran_Terserap"), rollup.correlation(filters)
+        )
+        yield "dashboard.figures", rows, lambda: (
+            charts.bar_figure(data), charts.scatter_figure(data), charts.line_figure(data),
+            charts.box_figure(charts.box_quartiles(data)),
+        )
+        del frame, store, data
+
+
+BENCHMARKS = {
+    "decode": bench_decode,
+    "inference": bench_inference,
+    "draw": bench_draw,
+    "nutrients": bench_nutrients,
+    "dashboard": bench_dashboard,
+}
+
+
+def run(groups=GROUPS, sizes=DEFAULT_SIZES, model_path=None, budget=0.5, log=print):
+    """Jalankan grup benchmark; grup yang tidak bisa jalan (mis. model tidak ada) dicatat sebagai skipped."""
+    results, skipped = [], {}
+    for group in groups:
+        factory = BENCHMARKS[group]
+        cases = factory(sizes, model_path) if group == "inference" else factory(sizes)
+        try:
+            for name, size, fn in cases:
+                result = {"name": name, "size": size, **measure(fn, budget=budget)}
+                results.append(result)
+                log(f"{name:28s} {size:>12,} {result['median_ms']:12.3f} ms  ({result['runs']} run)")
+        except (ImportError, FileNotFoundError, OSError) as e:
+            skipped[group] = str(e)
+            log(f"{group:28s} dilewati: {e}")
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(current, baseline, threshold=0.25, min_delta_ms=MIN_DELTA_MS):
+    """Bandingkan median per (nama, ukuran); regresi jika lebih lambat > threshold dan > min_delta_ms."""
+    previous = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] > 0 else float("inf")
+        delta = result["median_ms"] - before["median_ms"]
+        if ratio > 1 + threshold and delta > min_delta_ms:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and -delta > min_delta_ms:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({
+            "name": result["name"], "size": result["size"],
+            "baseline_ms": before["median_ms"], "current_ms": result["median_ms"],
+            "change": ratio - 1, "status": status,
+        })
+    return rows
+
+
+def _parse_sizes(text):
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas JALU (offline, CPU)")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Grup dipisah koma: {', '.join(GROUPS)}")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Jumlah baris data Dashboard, mis. 15,1000,1e5,1e6,1e7")
+    parser.add_argument("--model", default=None, help="Path model lokal (default JALU_MODEL_PATH)")
+    parser.add_argument("--budget", type=float, default=0.5, help="Detik pengukuran per kasus")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File hasil; isi lamanya dipakai sebagai pembanding")
+    parser.add_argument("--baseline", default=None, help="Baseline tetap untuk pembanding (default: run sebelumnya di --output)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Ambang regresi relatif (0.25 = 25%% lebih lambat)")
+    args = parser.parse_args(argv)
+
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Grup tidak dikenal: {', '.join(unknown)}")
+
+    baseline_path = args.baseline or args.output
+    baseline = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    current = run(groups, _parse_sizes(args.sizes), args.model, args.budget)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Hasil disimpan ke {args.output}")
+
+    if baseline is None:
+        print("Belum ada pembanding; run ini menjadi baseline.")
+        return 0
+    rows = compare(current, baseline, args.threshold)
+    print(f"\nPerbandingan dengan {baseline_path} ({baseline.get('created', '?')}):")
+    for row in rows:
+        print(f"{row['name']:28s} {row['size']:>12,} {row['baseline_ms']:12.3f} -> {row['current_ms']:10.3f} ms "
+              f"{row['change']:+7.1%}  {row['status']}")
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regresi di atas ambang {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# =============================================================================
+# JALU - Model estimasi kalori
+# Regressor hasil train_model.py disimpan juga dalam format ringkas: semua node
+# pohon RandomForest dalam satu array .npy (+ metadata .json) yang dimuat
+# dengan mmap, sehingga beberapa proses worker berbagi satu salinan di page
+# cache, dan diprediksi tervektorisasi dengan NumPy. Pickle sklearn tetap
+# didukung (joblib mmap_mode="r"), tetapi sklearn menyalin node tiap pohon ke
+# memori proses saat unpickle. Kalori yang kosong di tabel nutrisi diisi
+# dengan satu prediksi batch untuk semua baris sekaligus.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_CALORIE_MODEL   path model (default: food_nutrition_model.pkl; format
+#                        ringkas food_nutrition_model.npy dipakai jika ada)
+# =============================================================================
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MODEL_PATH = "food_nutrition_model.pkl"
+DEFAULT_FEATURES_PATH = "food_feature_columns.pkl"
+DEFAULT_ENCODINGS_PATH = "food_category_encodings.pkl"
+
+# Data latih memakai kuantitas per 100 g; kuantitas non-numerik ("1 slice") dianggap porsi 100 g
+DEFAULT_QUANTITY = 100.0
+
+
+def encode_features(frame, features, encodings):
+    """Matriks fitur float32 yang sama untuk pelatihan (train_model.py) dan prediksi.
+
+    Kategori menjadi kode integer (tidak dikenal: -1), Quantity kosong/non-numerik menjadi
+    DEFAULT_QUANTITY dan numerik lain 0.0. Tidak ada NaN yang sampai ke forest, sehingga
+    CompactForest (tanpa arah missing value sklearn) memprediksi sama dengan model aslinya.
+    """
+    X = pd.DataFrame(index=frame.index)
+    for column in features:
+        if column in encodings:
+            X[column] = pd.Categorical(frame[column], categories=encodings[column]).codes
+        elif column == "Quantity":
+            X[column] = pd.to_numeric(frame[column], errors="coerce").fillna(DEFAULT_QUANTITY)
+        else:
+            X[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0.0)
+    return X.astype(np.float32)
+
+
+NODE_DTYPE = np.dtype([
+    ("left", "<i4"), ("right", "<i4"), ("feature", "<i4"), ("threshold", "<f8"), ("value", "<f8"),
+])
+
+
+class CompactForest:
+    """RandomForestRegressor dalam bentuk array node datar; prediksi = rata-rata daun semua pohon."""
+
+    def __init__(self, nodes, roots):
+        self.nodes = nodes
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.left = nodes["left"]
+        self.right = nodes["right"]
+        self.feature = nodes["feature"]
+        self.threshold = nodes["threshold"]
+        self.value = nodes["value"]
+
+    def predict(self, X):
+        # Sama seperti sklearn: fitur float32 dibandingkan dengan threshold float64
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[None, :]
+        index = np.repeat(self.roots[:, None], len(X), axis=1)  # (pohon, baris)
+        while True:
+            left = self.left[index]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[index]] <= self.threshold[index]
+            index = np.where(internal, np.where(go_left, left, self.right[index]), index)
+        return self.value[index].mean(axis=0)
+
+
+def export_compact(model, path, features, encodings=None):
+    """Tulis forest sklearn ke `path` (.npy node) dan `path` berakhiran .json (akar, fitur, encoding)."""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    nodes = np.empty(int(counts.sum()), dtype=NODE_DTYPE)
+    for tree, offset in zip(trees, offsets):
+        part = nodes[offset:offset + tree.node_count]
+        part["left"] = np.where(tree.children_left >= 0, tree.children_left + offset, -1)
+        part["right"] = np.where(tree.children_right >= 0, tree.children_right + offset, -1)
+        part["feature"] = np.maximum(tree.feature, 0)
+        part["threshold"] = tree.threshold
+        part["value"] = tree.value[:, 0, 0]
+    np.save(path, nodes)
+    with open(_metadata_path(path), "w", encoding="utf-8") as f:
+        json.dump({"roots": offsets.tolist(), "features": list(features), "encodings": encodings or {}}, f)
+    return path
+
+
+def _metadata_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+class CalorieModel:
+    """Pembungkus regressor: encoding fitur, prediksi batch, dan statistik latensi."""
+
+    def __init__(self, model, features, encodings=None, version=None, load_seconds=0.0):
+        self.model = model
+        self.features = list(features)
+        self.encodings = encodings or {}
+        self.version = version
+        self.load_seconds = load_seconds
+        self.predictions = 0
+        self.predict_calls = 0
+        self.predict_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def encode(self, frame):
+        return encode_features(frame, self.features, self.encodings)
+
+    def predict(self, frame):
+        """Satu panggilan model untuk seluruh baris `frame`."""
+        if len(frame) == 0:
+            return np.zeros(0, dtype=np.float64)
+        X = self.encode(frame)
+        started = time.perf_counter()
+        values = self.model.predict(X)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.predictions += len(frame)
+            self.predict_calls += 1
+            self.predict_seconds += elapsed
+        return np.asarray(values, dtype=np.float64)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "load_ms": self.load_seconds * 1000,
+                "predictions": self.predictions,
+                "calls": self.predict_calls,
+                "ms_per_call": self.predict_seconds * 1000 / self.predict_calls if self.predict_calls else 0.0,
+                "us_per_item": self.predict_seconds * 1e6 / self.predictions if self.predictions else 0.0,
+            }
+
+
+def load_calorie_model(path=None, features_path=None, encodings_path=None, mmap=True):
+    """Muat model hasil train_model.py (format ringkas .npy jika ada); None jika file model tidak ada."""
+    path = path or os.environ.get("JALU_CALORIE_MODEL", DEFAULT_MODEL_PATH)
+    compact_path = os.path.splitext(path)[0] + ".npy"
+    if os.path.exists(compact_path) and os.path.exists(_metadata_path(compact_path)):
+        path = compact_path
+    elif not os.path.exists(path):
+        return None
+
+    started = time.perf_counter()
+    if path.endswith(".npy"):
+        nodes = np.load(path, mmap_mode="r" if mmap else None)
+        with open(_metadata_path(path), encoding="utf-8") as f:
+            metadata = json.load(f)
+        model = CompactForest(nodes, metadata["roots"])
+        features, encodings = metadata["features"], metadata["encodings"]
+    else:
+        import joblib
+        directory = os.path.dirname(path)
+        features_path = features_path or os.path.join(directory, DEFAULT_FEATURES_PATH)
+        encodings_path = encodings_path or os.path.join(directory, DEFAULT_ENCODINGS_PATH)
+        # mmap hanya berlaku untuk file tanpa kompresi (format default train_model.py)
+        model = joblib.load(path, mmap_mode="r" if mmap else None)
+        features = joblib.load(features_path) if os.path.exists(features_path) else list(model.feature_names_in_)
+        encodings = joblib.load(encodings_path) if os.path.exists(encodings_path) else {}
+    load_seconds = time.perf_counter() - started
+
+    stat = os.stat(path)
+    version = f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return CalorieModel(model, features, encodings, version=version, load_seconds=load_seconds)
+
+
+def fill_missing_calories(nutrition_data, calorie_model):
+    """Isi Calories yang kosong dengan satu prediksi batch; baris yang sudah berisi tidak diubah."""
+    calories = pd.to_numeric(nutrition_data["Calories"], errors="coerce")
+    missing = calories.isna()
+    if not missing.any():
+        return nutrition_data
+    filled = nutrition_data.copy()
+    filled["Calories"] = calories
+    filled.loc[missing, "Calories"] = calorie_model.predict(filled.loc[missing])
+    return filled
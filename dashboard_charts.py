@@ -0,0 +1,196 @@
+# =============================================================================
+# JALU - Pembuat chart Dashboard Analisis
+# Chart dibangun dari data yang sudah diringkas di server: bar dari jumlah per
+# sel, scatter di-binning dan line di-downsample (LTTB) di atas anggaran titik,
+# box plot dari kuartil yang dihitung lebih dulu.
+# =============================================================================
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Anggaran titik per chart sebelum scatter di-binning / line di-downsample
+MAX_POINTS = int(os.environ.get("JALU_MAX_POINTS", "5000"))
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indeks titik yang mempertahankan bentuk deret."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bounds = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], max(bounds[i + 1], bounds[i] + 1)
+        next_start, next_end = end, (bounds[i + 2] if i + 2 < len(bounds) else n)
+        if next_end > next_start:
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def bar_figure(data):
+    # Batang bertumpuk per baris setara dengan satu batang per sel Provinsi x Jenjang
+    cells = data.groupby(["Provinsi", "Jenjang_Pendidikan"], observed=True, sort=False)["Jumlah_Siswa_Penerima"].sum().reset_index()
+    fig = px.bar(
+        cells,
+        x="Provinsi",
+        y="Jumlah_Siswa_Penerima",
+        color="Jenjang_Pendidikan",
+        title="",
+        template="plotly_white"
+    )
+    fig.update_layout(showlegend=True, height=400)
+    return fig
+
+
+def scatter_figure(data, max_points=MAX_POINTS):
+    x, y, size, color = "Tingkat_Kepuasan", "Indeks_Keberhasilan", "Jumlah_Siswa_Penerima", "Provinsi"
+    hover = None
+    if len(data) > max_points:
+        # Binning grid per warna: satu titik per sel berisi rata-rata posisi dan total siswa
+        bins = max(int(np.sqrt(max_points / max(data[color].nunique(), 1))), 1)
+        binned = {}
+        for column in (x, y):
+            values = data[column].to_numpy(dtype=np.float64)
+            low, high = values.min(), values.max()
+            span = high - low if high > low else 1.0
+            binned[f"_bin_{column}"] = np.minimum(((values - low) / span * bins).astype(np.int64), bins - 1)
+        data = (
+            data.assign(**binned)
+            .groupby([color, f"_bin_{x}", f"_bin_{y}"], observed=True, sort=False)
+            .agg(**{x: (x, "mean"), y: (y, "mean"), size: (size, "sum"), "Jumlah_Baris": (size, "size")})
+            .reset_index()
+        )
+        hover = ["Jumlah_Baris"]
+    fig = px.scatter(
+        data,
+        x=x,
+        y=y,
+        size=size,
+        color=color,
+        hover_data=hover,
+        title="",
+        template="plotly_white"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def pie_figure(prov_budget):
+    fig = px.pie(
+        prov_budget,
+        values="Anggaran_Terserap",
+        names="Provinsi",
+        title="",
+        template="plotly_white",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def box_quartiles(data, by="Jenjang_Pendidikan", value="Tingkat_Kepuasan"):
+    """Kuartil dan pagar Tukey per kategori; hanya statistik ini yang dikirim ke browser."""
+    if data.empty:
+        # Pilihan multiselect kosong: tidak ada kuartil, box plot tanpa trace
+        return pd.DataFrame(columns=["q1", "median", "q3", "min", "max", "lowerfence", "upperfence"])
+    grouped = data.groupby(by, observed=True, sort=False)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    stats["min"] = grouped.min()
+    stats["max"] = grouped.max()
+    iqr = stats["q3"] - stats["q1"]
+    stats["lowerfence"] = np.maximum(stats["min"], stats["q1"] - 1.5 * iqr)
+    stats["upperfence"] = np.minimum(stats["max"], stats["q3"] + 1.5 * iqr)
+    return stats
+
+
+def box_figure(quartiles, by="Jenjang_Pendidikan", value="Tingkat_Kepuasan"):
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, (category, row) in enumerate(quartiles.iterrows()):
+        fig.add_trace(go.Box(
+            name=str(category),
+            x=[category],
+            q1=[row["q1"]],
+            median=[row["median"]],
+            q3=[row["q3"]],
+            lowerfence=[row["lowerfence"]],
+            upperfence=[row["upperfence"]],
+            marker_color=colors[i % len(colors)],
+        ))
+    fig.update_layout(
+        template="plotly_white",
+        height=400,
+        showlegend=False,
+        xaxis_title=by,
+        yaxis_title=value
+    )
+    return fig
+
+
+def line_figure(data, max_points=MAX_POINTS):
+    data = data.sort_values("Indeks_Keberhasilan")
+    groups = data.groupby("Jenjang_Pendidikan", observed=True, sort=False)
+    per_group = max(max_points // max(groups.ngroups, 1), 3)
+    if len(data) > max_points:
+        # LTTB per garis atas (urutan, nilai) sehingga bentuk tren tetap terjaga
+        parts = []
+        for _, group in groups:
+            keep = lttb(np.arange(len(group)), group["Indeks_Keberhasilan"].to_numpy(), per_group)
+            parts.append(group.iloc[keep])
+        data = pd.concat(parts).sort_values("Indeks_Keberhasilan")
+    fig = px.line(
+        data,
+        x="Provinsi",
+        y="Indeks_Keberhasilan",
+        color="Jenjang_Pendidikan",
+        markers=True,
+        title="",
+        template="plotly_white"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def history_figure(history):
+    # Satu batang per periode, ditumpuk per sekolah (data dari rollup riwayat deteksi)
+    fig = px.bar(
+        history,
+        x="period",
+        y="Calories",
+        color="school",
+        labels={"period": "Periode", "Calories": "Kalori (kcal)", "school": "Sekolah"},
+        title="",
+        template="plotly_white"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def heatmap_figure(corr_matrix):
+    fig = px.imshow(
+        corr_matrix,
+        text_auto=True,
+        aspect="auto",
+        title="",
+        template="plotly_white",
+        color_continuous_scale="RdBu_r"
+    )
+    fig.update_layout(height=400)
+    return fig
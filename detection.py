@@ -0,0 +1,253 @@
+# =============================================================================
+# JALU - Hasil deteksi & cache deteksi
+# Representasi hasil deteksi yang tidak bergantung pada backend model, plus
+# cache berbasis hash isi gambar agar rerun Streamlit tidak menjalankan ulang YOLO,
+# dan render kotak tervektorisasi (satu mask, satu composite per gambar).
+# `detect_batch` menggabungkan keduanya: hanya gambar yang belum ada di cache
+# yang masuk model, per batch.
+# =============================================================================
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Detections:
+    """Kotak (xyxy), skor, dan id kelas untuk satu gambar."""
+    boxes: np.ndarray
+    scores: np.ndarray
+    classes: np.ndarray
+    image_size: tuple  # (lebar, tinggi)
+
+    def __len__(self):
+        return len(self.classes)
+
+    @classmethod
+    def empty(cls, image_size):
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.float32),
+            scores=np.zeros(0, dtype=np.float32),
+            classes=np.zeros(0, dtype=np.int32),
+            image_size=tuple(image_size),
+        )
+
+    def subset(self, mask):
+        """Detections berisi kotak dengan `mask` True (boolean array sepanjang jumlah kotak)."""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return self
+        return Detections(
+            boxes=self.boxes[mask],
+            scores=self.scores[mask],
+            classes=self.classes[mask],
+            image_size=self.image_size,
+        )
+
+    def rescaled(self, image_size):
+        """Kotak yang sama dalam koordinat gambar berukuran `image_size` (lebar, tinggi)."""
+        image_size = tuple(int(v) for v in image_size)
+        if image_size == tuple(self.image_size):
+            return self
+        factor = np.array(
+            [image_size[0] / self.image_size[0], image_size[1] / self.image_size[1]] * 2,
+            dtype=np.float32,
+        )
+        return Detections(
+            boxes=self.boxes * factor,
+            scores=self.scores,
+            classes=self.classes,
+            image_size=image_size,
+        )
+
+    @classmethod
+    def from_result(cls, result):
+        """Konversi satu `ultralytics.engine.results.Results` ke Detections."""
+        data = result.boxes.data.cpu().numpy()
+        height, width = result.orig_shape
+        return cls(
+            boxes=data[:, :4].astype(np.float32),
+            scores=data[:, 4].astype(np.float32),
+            classes=data[:, 5].astype(np.int32),
+            image_size=(int(width), int(height)),
+        )
+
+
+def outline_mask(boxes, size, width=3):
+    """Mask (tinggi, lebar) garis tepi semua kotak sekaligus: prefix-sum 2D dari persegi luar dikurangi dalam."""
+    img_w, img_h = size
+    diff = np.zeros((img_h + 1, img_w + 1), dtype=np.int32)
+    if len(boxes):
+        b = np.round(np.asarray(boxes, dtype=np.float64)).astype(np.int64)
+        x1 = np.clip(b[:, 0], 0, img_w)
+        y1 = np.clip(b[:, 1], 0, img_h)
+        x2 = np.clip(b[:, 2] + 1, 0, img_w)
+        y2 = np.clip(b[:, 3] + 1, 0, img_h)
+        ix1, iy1 = np.minimum(x1 + width, x2), np.minimum(y1 + width, y2)
+        ix2, iy2 = np.maximum(x2 - width, ix1), np.maximum(y2 - width, iy1)
+        for (left, top, right, bottom), sign in (((x1, y1, x2, y2), 1), ((ix1, iy1, ix2, iy2), -1)):
+            np.add.at(diff, (top, left), sign)
+            np.add.at(diff, (top, right), -sign)
+            np.add.at(diff, (bottom, left), -sign)
+            np.add.at(diff, (bottom, right), sign)
+    return diff.cumsum(axis=0).cumsum(axis=1)[:img_h, :img_w] > 0
+
+
+@lru_cache(maxsize=1024)
+def _text_mask(text):
+    """Mask teks (mode L) yang dirender sekali lalu dipakai ulang; label = nama kelas + skor."""
+    from PIL import Image, ImageDraw, ImageFont
+    font = ImageFont.load_default()
+    width = max(int(np.ceil(font.getlength(text))), 1)
+    height = max(font.getbbox(text)[3], 1)
+    piece = Image.new("L", (width, height))
+    ImageDraw.Draw(piece).text((0, 0), text, fill=255, font=font)
+    return piece
+
+
+def render_detections(image, detections, labels, min_score=0.0, color="red", width=3):
+    """Gambar semua kotak dan label ke satu mask, lalu tempel ke `image` dalam satu kali composite."""
+    from PIL import Image
+
+    detections = detections.subset(detections.scores >= min_score)
+    names = [labels[c] for c in detections.classes.tolist()]
+    mask = Image.fromarray(outline_mask(detections.boxes, image.size, width).view(np.uint8) * 255, mode="L")
+    corners = np.round(detections.boxes[:, :2]).astype(np.int64).tolist()
+    for (x, y), name, score in zip(corners, names, detections.scores.tolist()):
+        # Potongan teks di-cache per nama dan per skor, sehingga tidak ada render font per kotak
+        name_piece = _text_mask(f"{name} ")
+        score_piece = _text_mask(f"{score:.2f}")
+        mask.paste(255, (x, y - 10), name_piece)
+        mask.paste(255, (x + name_piece.width, y - 10), score_piece)
+    image.paste(color, (0, 0, *image.size), mask)
+    return image, names
+
+
+class DetectionCache:
+    """Cache LRU di memori dengan tier disk opsional, dikunci oleh hash gambar + identitas model."""
+
+    def __init__(self, max_entries=256, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, model_id):
+        digest = hashlib.sha256()
+        digest.update(str(model_id).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            detections = self._entries.get(key)
+            if detections is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return detections
+
+        detections = self._read_disk(key)
+        with self._lock:
+            if detections is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, detections)
+        return detections
+
+    def put(self, key, detections):
+        with self._lock:
+            self._remember(key, detections)
+        self._write_disk(key, detections)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remember(self, key, detections):
+        self._entries[key] = detections
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npz")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return Detections(
+                    boxes=data["boxes"],
+                    scores=data["scores"],
+                    classes=data["classes"],
+                    image_size=tuple(int(v) for v in data["image_size"]),
+                )
+        except (OSError, KeyError, ValueError):
+            # File rusak/terpotong: anggap miss, akan ditulis ulang
+            return None
+
+    def _write_disk(self, key, detections):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                boxes=detections.boxes,
+                scores=detections.scores,
+                classes=detections.classes,
+                image_size=np.asarray(detections.image_size, dtype=np.int64),
+            )
+        os.replace(tmp_path, path)
+
+
+def detect_batch(model, images, keys, cache, batch_size=8, job=None, metrics=None):
+    """Deteksi beberapa gambar hasil praproses; hanya gambar yang belum ada di cache yang masuk model.
+
+    Hasil berurutan sama dengan `images`, dalam koordinat gambar asli. `job` (opsional) menerima
+    progres dan menjadi titik pembatalan antar batch; `metrics` mencatat span "vision.inference".
+    """
+    detections = [cache.get(key) for key in keys]
+    pending = [i for i, det in enumerate(detections) if det is None]
+    if job is not None:
+        job.advance(len(keys) - len(pending))
+    # Satu forward pass per batch untuk gambar yang belum pernah dideteksi
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        with metrics.span("vision.inference") if metrics is not None else nullcontext():
+            results = model.predict([images[i].array for i in chunk])
+        for i, result in zip(chunk, results):
+            # Cache menyimpan kotak dalam koordinat gambar asli
+            detections[i] = images[i].to_original(result)
+            cache.put(keys[i], detections[i])
+        if job is not None:
+            job.advance(len(chunk))  # titik pembatalan antar batch
+    return detections
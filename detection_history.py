@@ -0,0 +1,248 @@
+# =============================================================================
+# JALU - Riwayat deteksi
+# Setiap analisis (waktu, sekolah, item terdeteksi, total nutrisi) disimpan di
+# SQLite mode WAL. Penulisan masuk antrean dan ditulis thread latar per batch
+# dalam satu transaksi, sehingga jalur request tidak pernah menunggu disk.
+# Rollup harian dan mingguan per sekolah diperbarui di transaksi yang sama,
+# jadi halaman riwayat membaca rollup tanpa memindai riwayat mentah.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_HISTORY_DB   path file SQLite (default: jalu_history.db)
+#
+# Penggunaan CLI:
+#   python detection_history.py rollup --granularity week
+#   python detection_history.py recent --limit 20
+# =============================================================================
+
+import argparse
+import datetime as dt
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+
+import pandas as pd
+
+from nutrition import NUTRIENT_COLUMNS
+
+DEFAULT_PATH = "jalu_history.db"
+DAY, WEEK = "day", "week"
+UNKNOWN_SCHOOL = "(tanpa nama)"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    school TEXT NOT NULL,
+    source TEXT NOT NULL,
+    items TEXT NOT NULL,
+    item_count INTEGER NOT NULL,
+    {", ".join(f"{c} REAL NOT NULL" for c in NUTRIENT_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_school_day ON analyses (school, day);
+CREATE INDEX IF NOT EXISTS idx_analyses_day ON analyses (day);
+CREATE TABLE IF NOT EXISTS rollup (
+    granularity TEXT NOT NULL,
+    period TEXT NOT NULL,
+    school TEXT NOT NULL,
+    analyses INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    {", ".join(f"{c} REAL NOT NULL" for c in NUTRIENT_COLUMNS)},
+    PRIMARY KEY (granularity, period, school)
+) WITHOUT ROWID;
+"""
+
+_STOP = object()
+
+
+def period_of(day, granularity):
+    """Kunci periode: tanggal itu sendiri (harian) atau Senin pada minggunya (mingguan)."""
+    if granularity == DAY:
+        return day.isoformat()
+    return (day - dt.timedelta(days=day.weekday())).isoformat()
+
+
+class HistoryStore:
+    """Riwayat analisis di SQLite; `record` tidak memblokir, penulisan dilakukan per batch di latar."""
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=256, flush_interval=0.5, max_pending=10_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._writer, name="jalu-history-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, school, summary, timestamp=None, source="foto"):
+        """Antrekan satu analisis (`summary` = dict Items + kolom nutrien); False jika antrean penuh."""
+        entry = (
+            time.time() if timestamp is None else timestamp,
+            (school or "").strip() or UNKNOWN_SCHOOL,
+            source,
+            list(summary.get("Items", [])),
+            [float(summary.get(c, 0.0)) for c in NUTRIENT_COLUMNS],
+        )
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            # Lebih baik kehilangan satu baris riwayat daripada menahan request
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """Tunggu sampai semua entri yang sudah diantrekan tertulis."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _writer(self):
+        with closing(self._connect()) as conn:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                entries = batch[:-1] if stop else batch
+                try:
+                    if entries:
+                        self._write(conn, entries)
+                except sqlite3.Error as e:
+                    self.error = e
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+
+    def _write(self, conn, entries):
+        rows = []
+        totals = defaultdict(lambda: [0, 0] + [0.0] * len(NUTRIENT_COLUMNS))
+        for created_at, school, source, items, nutrients in entries:
+            day = dt.date.fromtimestamp(created_at)
+            rows.append((created_at, day.isoformat(), school, source, json.dumps(items), len(items), *nutrients))
+            for granularity in (DAY, WEEK):
+                total = totals[granularity, period_of(day, granularity), school]
+                total[0] += 1
+                total[1] += len(items)
+                for i, value in enumerate(nutrients):
+                    total[2 + i] += value
+
+        columns = ", ".join(NUTRIENT_COLUMNS)
+        placeholders = ", ".join("?" * len(NUTRIENT_COLUMNS))
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in NUTRIENT_COLUMNS)
+        with conn:
+            conn.executemany(
+                f"INSERT INTO analyses (created_at, day, school, source, items, item_count, {columns}) "
+                f"VALUES (?, ?, ?, ?, ?, ?, {placeholders})",
+                rows,
+            )
+            # Rollup inkremental: satu upsert per (periode, sekolah) yang tersentuh batch ini
+            conn.executemany(
+                f"INSERT INTO rollup (granularity, period, school, analyses, items, {columns}) "
+                f"VALUES (?, ?, ?, ?, ?, {placeholders}) "
+                f"ON CONFLICT (granularity, period, school) DO UPDATE SET "
+                f"analyses = analyses + excluded.analyses, items = items + excluded.items, {updates}",
+                [(*key, *total) for key, total in totals.items()],
+            )
+        self.written += len(rows)
+        self.batches += 1
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def rollup(self, granularity=DAY, schools=None, start=None, end=None):
+        """Total per (periode, sekolah) dari tabel rollup; `start`/`end` berupa date atau string ISO."""
+        sql = f"SELECT period, school, analyses, items, {', '.join(NUTRIENT_COLUMNS)} FROM rollup WHERE granularity = ?"
+        params = [granularity]
+        if start is not None:
+            sql += " AND period >= ?"
+            params.append(period_of(pd.Timestamp(start).date(), granularity))
+        if end is not None:
+            sql += " AND period <= ?"
+            params.append(str(pd.Timestamp(end).date()))
+        if schools:
+            sql += f" AND school IN ({', '.join('?' * len(schools))})"
+            params.extend(schools)
+        return self._query(sql + " ORDER BY period, school", params)
+
+    def schools(self):
+        return self._query("SELECT DISTINCT school FROM rollup WHERE granularity = ? ORDER BY school", (WEEK,))["school"].tolist()
+
+    def recent(self, limit=20, school=None):
+        """Analisis mentah terbaru (memakai indeks sekolah jika `school` diisi)."""
+        sql = f"SELECT created_at, school, source, items, {', '.join(NUTRIENT_COLUMNS)} FROM analyses"
+        params = []
+        if school:
+            sql += " WHERE school = ?"
+            params.append(school)
+        frame = self._query(sql + " ORDER BY id DESC LIMIT ?", params + [limit])
+        frame["created_at"] = pd.to_datetime(frame["created_at"], unit="s")
+        frame["items"] = frame["items"].map(lambda items: ", ".join(json.loads(items)))
+        return frame
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Riwayat deteksi JALU")
+    parser.add_argument("--db", default=os.environ.get("JALU_HISTORY_DB", DEFAULT_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rollup = sub.add_parser("rollup", help="Total nutrisi per periode dan sekolah")
+    p_rollup.add_argument("--granularity", choices=[DAY, WEEK], default=DAY)
+    p_rollup.add_argument("--school", action="append", default=None)
+    p_rollup.add_argument("--start", default=None)
+    p_rollup.add_argument("--end", default=None)
+
+    p_recent = sub.add_parser("recent", help="Analisis terbaru")
+    p_recent.add_argument("--limit", type=int, default=20)
+    p_recent.add_argument("--school", default=None)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    if args.command == "rollup":
+        frame = store.rollup(args.granularity, args.school, args.start, args.end)
+    else:
+        frame = store.recent(args.limit, args.school)
+    store.close()
+    print(frame.to_string(index=False) if len(frame) else "Belum ada riwayat.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
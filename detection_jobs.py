@@ -0,0 +1,135 @@
+# =============================================================================
+# JALU - Job deteksi di latar belakang
+# Deteksi untuk unggahan besar dijalankan sebagai job di thread pool, bukan di
+# thread script Streamlit. Sesi menyimpan id job di session_state; setiap rerun
+# cukup membaca status/progres job, sehingga interaksi widget tidak membuang
+# pekerjaan yang sedang berjalan. Job yang masih antre atau berjalan bisa
+# dibatalkan.
+# =============================================================================
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class DetectionJob:
+    """Status, progres dan hasil satu job; dibaca dari thread script, ditulis dari worker."""
+
+    def __init__(self, job_id, key, total):
+        self.id = job_id
+        self.key = key
+        self.total = total
+        self.completed = 0
+        self.status = QUEUED
+        self.result = None
+        self.partial = []  # hasil yang sudah jadi selagi job berjalan (mis. nampan video)
+        self.stats = {}    # statistik yang diisi task (mis. fps video)
+        self.error = None
+        self.created_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def progress(self):
+        # total 0 = panjang tidak diketahui (mis. webcam)
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def advance(self, count):
+        """Dipanggil task setelah tiap potongan selesai; melempar JobCancelled jika job dibatalkan."""
+        self.completed += count
+        if self.total:
+            self.completed = min(self.completed, self.total)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            # Belum sempat jalan: langsung selesai tanpa memakai worker
+            self._finish(CANCELLED)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _finish(self, status, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.perf_counter()
+        self.status = status
+        self._done.set()
+
+
+class JobManager:
+    """Thread pool bersama semua sesi; job lama yang sudah selesai dibuang (LRU) di atas `max_jobs`."""
+
+    def __init__(self, max_workers=2, max_jobs=128):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jalu-detect")
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, task, key=None, total=0):
+        """Jalankan `task(job)` di latar; task melaporkan progres lewat `job.advance(n)`."""
+        with self._lock:
+            job = DetectionJob(f"job-{next(self._ids)}", key, total)
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, task)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    def _run(self, job, task):
+        try:
+            job.check_cancelled()
+            job.started_at = time.perf_counter()
+            job.status = RUNNING
+            job._finish(DONE, result=task(job))
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            job._finish(FAILED, error=e)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(self._jobs) - self.max_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {state: sum(job.status == state for job in jobs) for state in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
@@ -0,0 +1,334 @@
+# =============================================================================
+# JALU - Backend inferensi deteksi makanan
+# Lapisan backend yang bisa diganti: PyTorch (ultralytics) atau ONNX Runtime
+# (termasuk model INT8 hasil kuantisasi) untuk server tanpa GPU.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_BACKEND        auto | pytorch | onnx (default: auto, berdasarkan ekstensi)
+#   JALU_MODEL_PATH     path file model lokal (default: yolov8n.pt)
+#   JALU_NUM_THREADS    jumlah thread CPU untuk inferensi
+#   JALU_ALLOW_DOWNLOAD "1" untuk mengizinkan ultralytics mengunduh bobot
+#   JALU_INFERENCE_ADDRESS  alamat server inferensi bersama (lihat inference_server.py)
+#
+# Penggunaan CLI:
+#   python inference_backend.py export yolov8n.pt --imgsz 640
+#   python inference_backend.py quantize yolov8n.onnx yolov8n-int8.onnx
+#   python inference_backend.py parity yolov8n.pt yolov8n-int8.onnx --images contoh/
+# =============================================================================
+
+import argparse
+import ast
+import hashlib
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from detection import Detections
+
+DEFAULT_MODEL_PATH = "yolov8n.pt"
+DEFAULT_IMGSZ = 640
+
+
+def file_digest(path, length=12):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def to_rgb_array(image):
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("RGB"))
+    return np.asarray(image)
+
+
+def letterbox(array, size):
+    """Resize dengan rasio tetap lalu padding ke size x size (sama seperti ultralytics)."""
+    height, width = array.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    if (new_w, new_h) != (width, height):
+        array = np.asarray(Image.fromarray(array).resize((new_w, new_h), Image.BILINEAR))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    left, top = int(round(pad_x - 0.1)), int(round(pad_y - 0.1))
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = array
+    return canvas, scale, (left, top)
+
+
+def box_iou(a, b):
+    """IoU berpasangan antara kotak a (N,4) dan b (M,4) format xyxy."""
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def non_max_suppression(boxes, scores, classes, iou_threshold, max_det=300):
+    # Geser kotak per kelas agar NMS tidak saling menekan antar kelas
+    offset = boxes + (classes[:, None] * 7680.0)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = box_iou(offset[i:i + 1], offset[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class UltralyticsBackend:
+    """Backend PyTorch bawaan ultralytics."""
+    kind = "pytorch"
+
+    def __init__(self, weights, imgsz=DEFAULT_IMGSZ, conf=0.25, iou=0.7, num_threads=None):
+        from ultralytics import YOLO
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = YOLO(weights)
+        self.names = self.model.names
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.identity = model_identity(weights, self.kind)
+
+    def predict(self, images):
+        # Array dianggap RGB seperti PIL; ultralytics memperlakukan array numpy sebagai BGR
+        images = [
+            image if isinstance(image, Image.Image) else np.ascontiguousarray(np.asarray(image)[..., ::-1])
+            for image in images
+        ]
+        results = self.model(images, imgsz=self.imgsz, conf=self.conf, iou=self.iou, verbose=False)
+        return [Detections.from_result(r) for r in results]
+
+
+class OnnxBackend:
+    """Backend ONNX Runtime (CPU) untuk model hasil export ultralytics, FP32 maupun INT8."""
+    kind = "onnx"
+
+    def __init__(self, path, imgsz=None, conf=0.25, iou=0.7, num_threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("Backend ONNX membutuhkan paket onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = ast.literal_eval(metadata["names"])
+        else:
+            num_classes = self.session.get_outputs()[0].shape[1] - 4
+            self.names = {i: str(i) for i in range(num_classes)}
+
+        batch_dim, _, height_dim, _ = self.session.get_inputs()[0].shape
+        self.dynamic_batch = not isinstance(batch_dim, int)
+        if imgsz is None:
+            imgsz = height_dim if isinstance(height_dim, int) else DEFAULT_IMGSZ
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.identity = model_identity(path, self.kind)
+
+    def predict(self, images):
+        arrays = [to_rgb_array(image) for image in images]
+        boxed = [letterbox(array, self.imgsz) for array in arrays]
+        batch = np.stack([canvas for canvas, _, _ in boxed]).transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                for i in range(len(batch))
+            ])
+
+        detections = []
+        for array, (_, scale, (left, top)), output in zip(arrays, boxed, outputs):
+            detections.append(self._postprocess(output, array.shape, scale, left, top))
+        return detections
+
+    def _postprocess(self, output, shape, scale, left, top):
+        height, width = shape[:2]
+        preds = output.T  # (anchor, 4 + kelas)
+        class_scores = preds[:, 4:]
+        classes = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(classes)), classes]
+        mask = scores > self.conf
+        if not mask.any():
+            return Detections.empty((width, height))
+
+        xywh, scores, classes = preds[mask, :4], scores[mask], classes[mask]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+        keep = non_max_suppression(boxes, scores, classes, self.iou)
+        boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+        # Kembalikan koordinat dari ruang letterbox ke gambar asli
+        boxes -= np.array([left, top, left, top], dtype=boxes.dtype)
+        boxes /= scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        return Detections(
+            boxes=boxes.astype(np.float32),
+            scores=scores.astype(np.float32),
+            classes=classes.astype(np.int32),
+            image_size=(width, height),
+        )
+
+
+def resolve_model(path=None, backend=None):
+    """(path, backend) dari argumen atau JALU_MODEL_PATH / JALU_BACKEND; "auto" dipilih dari ekstensi."""
+    path = path or os.environ.get("JALU_MODEL_PATH", DEFAULT_MODEL_PATH)
+    backend = backend or os.environ.get("JALU_BACKEND", "auto")
+    if backend == "auto":
+        backend = "onnx" if path.endswith(".onnx") else "pytorch"
+    return path, backend
+
+
+def model_identity(path=None, backend=None):
+    """`identity` backend lokal untuk model ini (jenis, nama file, hash isi) tanpa memuat model."""
+    path, backend = resolve_model(path, backend)
+    version = file_digest(path) if os.path.exists(path) else "hub"
+    return f"{backend}:{os.path.basename(path)}:{version}"
+
+
+def load_backend(path=None, backend=None, num_threads=None, allow_download=None, address=None):
+    """Bangun backend dari argumen atau environment variable, tanpa akses jaringan secara default."""
+    if address is None:
+        address = os.environ.get("JALU_INFERENCE_ADDRESS", "")
+    if address:
+        # Model dipegang server inferensi bersama; proses ini tidak memuat bobot sendiri
+        from inference_server import RemoteBackend
+        return RemoteBackend(address)
+
+    path, backend = resolve_model(path, backend)
+    if num_threads is None and os.environ.get("JALU_NUM_THREADS"):
+        num_threads = int(os.environ["JALU_NUM_THREADS"])
+    if allow_download is None:
+        allow_download = os.environ.get("JALU_ALLOW_DOWNLOAD") == "1"
+
+    if not os.path.exists(path) and not (backend == "pytorch" and allow_download):
+        raise FileNotFoundError(
+            f"File model '{path}' tidak ditemukan. Letakkan file model di server "
+            "atau set JALU_ALLOW_DOWNLOAD=1 untuk mengunduh bobot YOLO."
+        )
+
+    if backend == "onnx":
+        return OnnxBackend(path, num_threads=num_threads)
+    if backend == "pytorch":
+        return UltralyticsBackend(path, num_threads=num_threads)
+    raise ValueError(f"Backend tidak dikenal: {backend}")
+
+
+def warmup(backend, size=DEFAULT_IMGSZ):
+    """Satu inferensi pada gambar kosong agar alokasi/kompilasi awal tidak dibayar request pertama."""
+    backend.predict([np.zeros((size, size, 3), dtype=np.uint8)])
+    return backend
+
+
+def export_onnx(weights, imgsz=DEFAULT_IMGSZ, dynamic=True):
+    from ultralytics import YOLO
+    return YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=False)
+
+
+def quantize_onnx(source, target):
+    """Kuantisasi dinamis INT8 (bobot) untuk inferensi CPU."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+    return target
+
+
+def parity_check(reference, candidate, images, iou_threshold=0.5, score_tolerance=0.05):
+    """Bandingkan deteksi dua backend: tiap kotak referensi harus punya pasangan kelas sama."""
+    report = {"images": 0, "reference_boxes": 0, "matched": 0, "extra": 0, "max_score_diff": 0.0}
+    for ref, cand in zip(reference.predict(images), candidate.predict(images)):
+        report["images"] += 1
+        report["reference_boxes"] += len(ref)
+        used = np.zeros(len(cand), dtype=bool)
+        if len(ref) and len(cand):
+            ious = box_iou(ref.boxes, cand.boxes)
+            ious[:, :] *= ref.classes[:, None] == cand.classes[None, :]
+            for i in np.argsort(-ref.scores):
+                ious_i = np.where(used, 0.0, ious[i])
+                j = int(ious_i.argmax())
+                if ious_i[j] >= iou_threshold:
+                    used[j] = True
+                    report["matched"] += 1
+                    diff = abs(float(ref.scores[i]) - float(cand.scores[j]))
+                    report["max_score_diff"] = max(report["max_score_diff"], diff)
+        report["extra"] += int((~used).sum())
+
+    report["passed"] = (
+        report["matched"] == report["reference_boxes"]
+        and report["extra"] == 0
+        and report["max_score_diff"] <= score_tolerance
+    )
+    return report
+
+
+def _load_images(directory):
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Utilitas backend inferensi JALU")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Export bobot PyTorch ke ONNX")
+    p_export.add_argument("weights")
+    p_export.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+
+    p_quant = sub.add_parser("quantize", help="Kuantisasi model ONNX ke INT8")
+    p_quant.add_argument("source")
+    p_quant.add_argument("target")
+
+    p_parity = sub.add_parser("parity", help="Cek kesamaan deteksi dua model")
+    p_parity.add_argument("reference")
+    p_parity.add_argument("candidate")
+    p_parity.add_argument("--images", required=True, help="Folder berisi gambar uji")
+    p_parity.add_argument("--iou", type=float, default=0.5)
+    p_parity.add_argument("--score-tolerance", type=float, default=0.05)
+    p_parity.add_argument("--threads", type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        print(export_onnx(args.weights, imgsz=args.imgsz))
+    elif args.command == "quantize":
+        print(quantize_onnx(args.source, args.target))
+    elif args.command == "parity":
+        reference = load_backend(args.reference, num_threads=args.threads, address="")
+        candidate = load_backend(args.candidate, num_threads=args.threads, address="")
+        report = parity_check(
+            reference, candidate, _load_images(args.images),
+            iou_threshold=args.iou, score_tolerance=args.score_tolerance,
+        )
+        for key, value in report.items():
+            print(f"{key}: {value}")
+        return 0 if report["passed"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+# =============================================================================
+# JALU - Server inferensi bersama
+# Satu proses memegang model deteksi dan melayani semua sesi Streamlit (dan
+# semua replika app di node yang sama) lewat Unix socket / TCP lokal. Request
+# dari banyak koneksi digabung menjadi micro-batch dalam jendela waktu pendek;
+# klien menerima hasil lewat Future.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_INFERENCE_ADDRESS  path Unix socket atau host:port; jika di-set app memakai
+#                           RemoteBackend alih-alih memuat model sendiri
+#   JALU_INFERENCE_AUTHKEY  kunci autentikasi koneksi; jika kosong server membuat rahasia
+#                           acak di JALU_INFERENCE_KEYFILE (mode 0600) yang dibaca klien.
+#                           Wajib di-set untuk alamat TCP non-loopback
+#   JALU_INFERENCE_KEYFILE  file kunci (default: ~/.jalu/inference.key)
+#
+# Penggunaan CLI:
+#   python inference_server.py --address /tmp/jalu-inference.sock --model yolov8n.onnx
+# =============================================================================
+
+import argparse
+import ipaddress
+import itertools
+import os
+import queue
+import secrets
+import socket
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+DEFAULT_ADDRESS = "/tmp/jalu-inference.sock"
+DEFAULT_KEY_FILE = os.path.join(os.path.expanduser("~"), ".jalu", "inference.key")
+
+
+def parse_address(address):
+    """`host:port` -> tuple TCP; selain itu dianggap path Unix socket."""
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+
+def is_loopback(address):
+    """True untuk Unix socket dan TCP ke localhost / alamat loopback."""
+    address = parse_address(address) if isinstance(address, str) else address
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def key_file():
+    return os.environ.get("JALU_INFERENCE_KEYFILE", DEFAULT_KEY_FILE)
+
+
+def default_authkey(create=False):
+    """Kunci dari JALU_INFERENCE_AUTHKEY, atau rahasia acak di file kunci (dibuat server bila `create`)."""
+    key = os.environ.get("JALU_INFERENCE_AUTHKEY")
+    if key:
+        return key.encode("utf-8")
+    path = key_file()
+    if create:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            # O_EXCL + mode 0600: rahasia hanya terbaca pemilik proses, tidak menimpa file yang ada
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+    try:
+        with open(path, encoding="utf-8") as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        key = ""
+    if not key:
+        raise RuntimeError(
+            f"Kunci server inferensi tidak ditemukan: set JALU_INFERENCE_AUTHKEY atau jalankan "
+            f"inference_server.py lebih dulu agar {path} dibuat."
+        )
+    return key.encode("utf-8")
+
+
+class _Request:
+    def __init__(self, connection, send_lock, request_id, images):
+        self.connection = connection
+        self.send_lock = send_lock
+        self.request_id = request_id
+        self.images = images
+
+    def reply(self, message):
+        try:
+            with self.send_lock:
+                self.connection.send(message)
+        except OSError:
+            pass  # klien sudah putus; hasilnya dibuang
+
+
+class InferenceServer:
+    """Listener + satu thread batcher yang memanggil `backend.predict` per micro-batch."""
+
+    def __init__(self, backend, address=DEFAULT_ADDRESS, authkey=None, max_batch=8, max_wait=0.01):
+        self.backend = backend
+        self.address = parse_address(address)
+        if authkey is None:
+            # Listener memakai pickle: kunci yang bisa ditebak = eksekusi kode jarak jauh
+            if not is_loopback(self.address) and not os.environ.get("JALU_INFERENCE_AUTHKEY"):
+                raise ValueError(
+                    f"Menolak listen di {address} tanpa kunci eksplisit; set JALU_INFERENCE_AUTHKEY."
+                )
+            authkey = default_authkey(create=True)
+        self.authkey = authkey
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"requests": 0, "images": 0, "batches": 0}
+        self._queue = queue.Queue()
+        self._running = False
+        self._listener = None
+        self._connections = set()
+
+    def start(self):
+        """Mulai melayani di thread latar; kembalikan self."""
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            # Socket sisa proses sebelumnya
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self._running = True
+        threading.Thread(target=self._batch_loop, name="jalu-batcher", daemon=True).start()
+        threading.Thread(target=self._accept_loop, name="jalu-accept", daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self._running:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self._running = False
+        self._queue.put(None)
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        # Putuskan klien aktif agar mereka tahu harus menyambung ulang; shutdown (bukan close)
+        # membangunkan thread _handle yang sedang menunggu di recv
+        for connection in list(self._connections):
+            try:
+                with socket.socket(fileno=os.dup(connection.fileno())) as sock:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                if not self._running:
+                    return
+                continue  # autentikasi gagal / klien putus saat handshake
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        send_lock = threading.Lock()
+        self._connections.add(connection)
+        try:
+            while self._running:
+                message = connection.recv()
+                if message[0] == "info":
+                    with send_lock:
+                        connection.send(("info", {
+                            "kind": self.backend.kind,
+                            "identity": self.backend.identity,
+                            "names": self.backend.names,
+                            "imgsz": getattr(self.backend, "imgsz", None),
+                        }))
+                elif message[0] == "predict":
+                    _, request_id, images = message
+                    self._queue.put(_Request(connection, send_lock, request_id, images))
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._connections.discard(connection)
+            connection.close()
+
+    def _batch_loop(self):
+        while self._running:
+            first = self._queue.get()
+            if first is None:
+                return
+            pending, count = [first], len(first.images)
+            deadline = time.monotonic() + self.max_wait
+            # Kumpulkan request lain sampai batch penuh atau jendela waktu habis
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                pending.append(item)
+                count += len(item.images)
+            self._run_batch(pending)
+
+    def _run_batch(self, pending):
+        images = [image for request in pending for image in request.images]
+        try:
+            results = []
+            for start in range(0, len(images), self.max_batch):
+                results.extend(self.backend.predict(images[start:start + self.max_batch]))
+                self.stats["batches"] += 1
+        except Exception as e:
+            for request in pending:
+                request.reply(("error", request.request_id, f"{type(e).__name__}: {e}"))
+            return
+        self.stats["requests"] += len(pending)
+        self.stats["images"] += len(images)
+        offset = 0
+        for request in pending:
+            request.reply(("result", request.request_id, results[offset:offset + len(request.images)]))
+            offset += len(request.images)
+
+
+class RemoteBackend:
+    """Klien InferenceServer dengan antarmuka sama seperti backend lokal (`predict`, `names`, `identity`).
+
+    Koneksi yang putus (server restart) dibuka ulang saat `submit` berikutnya, sehingga instance yang
+    di-cache app tetap bisa dipakai.
+    """
+    kind = "remote"
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, timeout=60.0):
+        self.address = address
+        self.timeout = timeout
+        self._authkey = authkey
+        self._connection = None
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._futures = {}  # request_id -> (Future, koneksi tempat request dikirim)
+        self._futures_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ensure_connected()
+
+    def _ensure_connected(self):
+        with self._connect_lock:
+            if self._connection is not None:
+                return self._connection
+            authkey = self._authkey if self._authkey is not None else default_authkey()
+            connection = Client(parse_address(self.address), authkey=authkey)
+            connection.send(("info",))
+            _, info = connection.recv()
+            self.names = info["names"]
+            self.server_kind = info["kind"]
+            self.imgsz = info.get("imgsz") or 640
+            # Identity model di server: kunci cache deteksi sama dengan backend lokal yang setara
+            self.identity = info["identity"]
+            self._connection = connection
+            threading.Thread(target=self._receive_loop, args=(connection,), name="jalu-remote-recv", daemon=True).start()
+            return connection
+
+    def _drop(self, connection):
+        with self._connect_lock:
+            if self._connection is connection:
+                self._connection = None
+        connection.close()
+
+    def _send(self, request_id, future, arrays):
+        connection = self._ensure_connected()
+        with self._futures_lock:
+            self._futures[request_id] = (future, connection)
+        try:
+            with self._send_lock:
+                connection.send(("predict", request_id, arrays))
+        except OSError:
+            with self._futures_lock:
+                self._futures.pop(request_id, None)
+            self._drop(connection)
+            raise
+
+    def submit(self, images):
+        """Kirim gambar ke server tanpa menunggu; hasilnya Future berisi list Detections."""
+        from inference_backend import to_rgb_array
+        arrays = [np.ascontiguousarray(to_rgb_array(image), dtype=np.uint8) for image in images]
+        future = Future()
+        future.request_id = next(self._ids)
+        try:
+            try:
+                self._send(future.request_id, future, arrays)
+            except OSError:
+                # Koneksi lama mati (mis. server restart): sambung ulang sekali
+                self._send(future.request_id, future, arrays)
+        except (OSError, EOFError) as e:
+            future.set_exception(ConnectionError(f"Server inferensi tidak dapat dihubungi: {e}"))
+        return future
+
+    def predict(self, images):
+        future = self.submit(images)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Balasan yang datang terlambat dibuang oleh _receive_loop
+            with self._futures_lock:
+                self._futures.pop(future.request_id, None)
+            raise
+
+    def _receive_loop(self, connection):
+        try:
+            while True:
+                kind, request_id, payload = connection.recv()
+                with self._futures_lock:
+                    future, _ = self._futures.pop(request_id, (None, None))
+                if future is None:
+                    continue
+                if kind == "result":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(f"Inferensi gagal di server: {payload}"))
+        except (EOFError, OSError):
+            self._drop(connection)
+            with self._futures_lock:
+                lost = [rid for rid, (_, sent_on) in self._futures.items() if sent_on is connection]
+                pending = [self._futures.pop(rid)[0] for rid in lost]
+            for future in pending:
+                future.set_exception(ConnectionError("Koneksi ke server inferensi terputus"))
+
+    def close(self):
+        with self._connect_lock:
+            connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server inferensi bersama JALU")
+    parser.add_argument("--address", default=os.environ.get("JALU_INFERENCE_ADDRESS", DEFAULT_ADDRESS),
+                        help="Path Unix socket atau host:port")
+    parser.add_argument("--model", default=None, help="Path model (default JALU_MODEL_PATH)")
+    parser.add_argument("--backend", default=None, help="auto | pytorch | onnx (default JALU_BACKEND)")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    from inference_backend import load_backend, warmup
+    # address="" memaksa backend lokal walau JALU_INFERENCE_ADDRESS ter-set
+    backend = warmup(load_backend(args.model, backend=args.backend, num_threads=args.threads, address=""))
+    try:
+        server = InferenceServer(backend, args.address, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0)
+    except ValueError as e:
+        print(f"Gagal: {e}", file=sys.stderr)
+        return 1
+    print(f"Server inferensi {backend.identity} siap di {args.address} (batch {args.max_batch}, jendela {args.max_wait_ms:g} ms)")
+    if not os.environ.get("JALU_INFERENCE_AUTHKEY"):
+        print(f"Kunci autentikasi: {key_file()}")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+# =============================================================================
+# JALU - Uji beban sesi bersamaan
+# Menjalankan N sesi simulasi sekaligus terhadap app.py di satu proses memakai
+# AppTest Streamlit (tanpa browser, tanpa jaringan). Tiap sesi mengikuti satu
+# skenario: Beranda, Dashboard (ganti filter, urutan, halaman tabel) atau
+# Vision (unggah foto dari korpus lokal lalu rerun sampai hasil tampil).
+# Untuk tiap tingkat konkurensi dilaporkan throughput rerun, latensi rerun
+# p50/p99, jumlah error dan RSS puncak proses; tingkat tertinggi yang masih
+# memenuhi SLO p99 menjadi angka kapasitas satu node.
+#
+# AppTest 1.31 tidak punya elemen file_uploader, jadi st.file_uploader diganti
+# stub yang mengembalikan gambar korpus milik sesi (session_state). Model
+# dimuat dari file lokal seperti biasa (JALU_MODEL_PATH).
+#
+# Versi Streamlit: API publik AppTest.from_file(...).run() tidak bisa dipakai
+# dari beberapa thread sekaligus (lihat ConcurrentAppTest), jadi harness ini
+# bergantung pada internal privat AppTest._run / LocalScriptRunner /
+# Runtime._instance milik Streamlit 1.31 (sesuai requirements.txt). Versi lain
+# memicu peringatan saat run; periksa ulang override ini sebelum upgrade.
+#
+# Penggunaan CLI:
+#   python load_test.py --concurrency 1,2,4,8 --duration 30
+#   python load_test.py --mix dashboard --think 0 --images foto_nampan/ --slo 1.5
+# =============================================================================
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# Versi Streamlit yang internal privatnya dipakai ConcurrentAppTest / shared_runtime
+STREAMLIT_VERSION = "1.31"
+DEFAULT_OUTPUT = "load_test_results.json"
+SCENARIOS = ("home", "dashboard", "vision")
+PAGES = {"home": "Beranda Website", "dashboard": "Dashboard Analisis", "vision": "Deteksi AI Vision"}
+UPLOAD_KEY = "load_test_upload"
+
+
+class ConcurrentAppTest(AppTest):
+    """AppTest yang memakai satu runtime tiruan bersama (lihat `shared_runtime`).
+
+    `AppTest._run` bawaan memasang lalu menghapus `Runtime._instance` global di setiap run, sehingga dua
+    sesi yang rerun bersamaan saling mematikan runtime. Versi ini hanya menjalankan skrip; runtime
+    dipasang sekali untuk seluruh uji beban. Seperti server sungguhan, bytecode skrip diambil dari
+    satu ScriptCache bersama (kompilasi AST paralel di CPython 3.11 bisa gagal dengan SystemError)
+    dan tiap sesi punya session id sendiri untuk media file manager.
+
+    Meniru `AppTest._run` Streamlit 1.31 (atribut privat `_script_path`, `_tree`,
+    `LocalScriptRunner._script_cache/_session_id`); lihat STREAMLIT_VERSION.
+    """
+
+    def __init__(self, script_path, *, default_timeout, session_id="load-test"):
+        super().__init__(script_path, default_timeout=default_timeout)
+        self.session_id = session_id
+
+    def _run(self, widget_state=None, timeout=None):
+        from urllib import parse
+        from streamlit.runtime import Runtime
+        from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+        runner = LocalScriptRunner(self._script_path, self.session_state)
+        runner._script_cache = Runtime.instance().script_cache
+        runner._session_id = self.session_id
+        self._tree = runner.run(widget_state, self.query_params, timeout or self.default_timeout)
+        self._tree._runner = self
+        self.query_params = parse.parse_qs(runner.event_data[-1]["client_state"].query_string)
+        return self
+
+
+@contextmanager
+def shared_runtime():
+    """Pasang satu Runtime tiruan untuk semua sesi selama blok berjalan (cache_resource tetap dibagi)."""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.script_cache = ScriptCache()
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    previous, Runtime._instance = Runtime._instance, runtime
+    # Dengan runtime terpasang, akses session_state dari thread sesi (di luar skrip) memicu peringatan
+    # "missing ScriptRunContext" yang tidak relevan untuk AppTest
+    context_logger = logging.getLogger("streamlit.runtime.scriptrunner.script_run_context")
+    previous_level = context_logger.level
+    context_logger.setLevel(logging.ERROR)
+    try:
+        yield runtime
+    finally:
+        Runtime._instance = previous
+        context_logger.setLevel(previous_level)
+
+
+class _Upload(io.BytesIO):
+    """Pengganti UploadedFile: bytes + nama file."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+@contextmanager
+def stub_file_uploader():
+    """Ganti st.file_uploader: kembalikan unggahan yang disiapkan sesi di session_state[UPLOAD_KEY]."""
+    import streamlit as st
+    original = st.file_uploader
+
+    def file_uploader(label, type=None, accept_multiple_files=False, **kwargs):
+        files = st.session_state.get(UPLOAD_KEY) or []
+        # Hanya uploader foto (multi-file) yang diisi; uploader video tetap kosong
+        return [_Upload(name, data) for name, data in files] if accept_multiple_files else None
+
+    st.file_uploader = file_uploader
+    try:
+        yield
+    finally:
+        st.file_uploader = original
+
+
+def load_corpus(directory=None, count=8):
+    """(nama, bytes) dari folder gambar lokal, atau JPEG sintetis jika folder tidak diberikan."""
+    if directory:
+        from analyze_images import find_images
+        corpus = []
+        for rel in find_images(directory):
+            with open(os.path.join(directory, rel), "rb") as f:
+                corpus.append((rel, f.read()))
+        if not corpus:
+            raise FileNotFoundError(f"Tidak ada gambar di {directory}")
+        return corpus
+    from benchmark import synthetic_jpeg
+    return [(f"sintetis_{i}.jpg", synthetic_jpeg(2.0, seed=i)) for i in range(count)]
+
+
+def current_rss():
+    """RSS proses saat ini (byte); puncak seumur proses jika /proc tidak tersedia, None di Windows."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class Session:
+    """Satu pengguna simulasi: tiap `step` memilih skenario dari `mix` (pindah halaman jika perlu),
+    menjalankan satu aksi, dan mencatat latensi tiap rerun per skenario."""
+
+    def __init__(self, mix, corpus, seed, timeout=300.0, images_per_upload=2):
+        self.mix = mix
+        self.corpus = corpus
+        self.rng = random.Random(seed)
+        self.images_per_upload = images_per_upload
+        self.app = ConcurrentAppTest(APP_PATH, default_timeout=timeout, session_id=f"load-test-{seed}")
+        self.deadline = None  # batas waktu tingkat konkurensi; polling Vision berhenti di sini
+        self.page = None
+        self.samples = []  # (skenario, detik)
+        self.errors = []
+        self.analyses = 0
+        self._upload_index = seed
+
+    def rerun(self, action=None):
+        started = time.perf_counter()
+        try:
+            (action() if action is not None else self.app).run()
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+            return False
+        self.samples.append((self.page, time.perf_counter() - started))
+        if self.app.exception:
+            self.errors.append(str(self.app.exception[0].value))
+            return False
+        return True
+
+    def step(self, scenario=None):
+        scenario = scenario or self.rng.choice(self.mix)
+        if self.page is None:
+            self.page = "home"  # run pertama membuka halaman default navigasi
+            self.rerun()
+        if scenario != self.page:
+            self.page = scenario
+            self.rerun(lambda: self.app.sidebar.radio[0].set_value(PAGES[scenario]))
+            if scenario != "vision":
+                return  # pindah halaman sudah satu aksi; Vision langsung mengunggah
+        getattr(self, f"_step_{scenario}")()
+
+    def _step_home(self):
+        self.rerun()
+
+    def _step_dashboard(self):
+        app, rng = self.app, self.rng
+        choice = rng.choice(["province", "level", "sort", "page"])
+        if choice in ("province", "level"):
+            widget = app.multiselect[0 if choice == "province" else 1]
+            options = list(widget.options)
+            picked = rng.sample(options, rng.randint(1, len(options)))
+            self.rerun(lambda: widget.set_value(picked))
+        elif choice == "sort":
+            widget = next(s for s in app.selectbox if s.label.startswith("↕️"))
+            self.rerun(lambda: widget.set_value(rng.choice(list(widget.options))))
+        elif len(app.slider):
+            # Slider halaman tabel hanya ada jika hasil filter lebih dari satu halaman
+            slider = app.slider[0]
+            self.rerun(lambda: slider.set_value(rng.randint(int(slider.min), int(slider.max))))
+        else:
+            self.rerun()
+
+    def _step_vision(self):
+        # Unggahan baru (rotasi korpus), lalu rerun sampai hasil atau error tampil
+        count = min(self.images_per_upload, len(self.corpus))
+        start = self._upload_index % len(self.corpus)
+        self._upload_index += count
+        upload = [self.corpus[(start + i) % len(self.corpus)] for i in range(count)]
+        self.app.session_state[UPLOAD_KEY] = upload
+        timeout_at = time.monotonic() + self.app.default_timeout
+        while time.monotonic() < timeout_at:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                return  # waktu pengukuran habis di tengah analisis; bukan error
+            if not self.rerun():
+                return
+            if self._analysis_shown():
+                self.analyses += 1
+                return
+            if self.app.error:
+                self.errors.append(str(self.app.error[0].value))
+                return
+        self.errors.append("Analisis tidak selesai sebelum timeout")
+
+    def _analysis_shown(self):
+        return any(str(c.value).startswith("🗃️ Cache deteksi") for c in self.app.caption)
+
+
+def run_level(concurrency, duration, corpus, mix=SCENARIOS, think=0.5, seed=0, timeout=300.0, log=print):
+    """Jalankan `concurrency` sesi selama `duration` detik; ringkasan latensi, throughput dan RSS."""
+    sessions = [Session(mix, corpus, seed + i, timeout) for i in range(concurrency)]
+    peak_rss = [current_rss()]
+    stop = threading.Event()
+
+    def sample_memory():
+        while not stop.wait(0.05):
+            rss = current_rss()
+            if rss is not None:
+                peak_rss[0] = max(peak_rss[0] or 0, rss)
+
+    def drive(session, deadline):
+        session.deadline = deadline
+        try:
+            while time.monotonic() < deadline and not session.errors:
+                session.step()
+                if think:
+                    time.sleep(session.rng.uniform(0.5, 1.5) * think)
+        except Exception as e:
+            session.errors.append(f"{type(e).__name__}: {e}")
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=drive, args=(s, deadline), name=f"jalu-load-{i}") for i, s in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    # Sesi selesai = tab ditutup: lepas gambar hasil (media file) milik sesi seperti saat disconnect
+    from streamlit.runtime import Runtime
+    media = Runtime.instance().media_file_mgr
+    for session in sessions:
+        media.clear_session_refs(session.app.session_id)
+    media.remove_orphaned_files()
+
+    def latency(samples):
+        if not samples:
+            return {"reruns": 0, "p50_ms": None, "p99_ms": None}
+        values = np.array(samples) * 1000
+        return {"reruns": len(values), "p50_ms": float(np.percentile(values, 50)), "p99_ms": float(np.percentile(values, 99))}
+
+    all_samples = [seconds for s in sessions for _, seconds in s.samples]
+    result = {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        **latency(all_samples),
+        "throughput_rps": len(all_samples) / elapsed,
+        "analyses": sum(s.analyses for s in sessions),
+        "errors": sum(len(s.errors) for s in sessions),
+        "error_samples": sorted({e for s in sessions for e in s.errors})[:5],
+        "peak_rss_mb": peak_rss[0] / 2**20 if peak_rss[0] is not None else None,
+        "scenarios": {
+            scenario: latency([seconds for s in sessions for page, seconds in s.samples if page == scenario])
+            for scenario in sorted(set(mix))
+        },
+    }
+    log(f"{concurrency:>4} sesi  {result['reruns']:>6} rerun  {result['throughput_rps']:7.2f} rerun/dtk  "
+        f"p50 {_ms(result['p50_ms'])}  p99 {_ms(result['p99_ms'])}  "
+        f"error {result['errors']:>3}  RSS puncak {_mb(result['peak_rss_mb'])}")
+    return result
+
+
+def _ms(value):
+    return f"{value:8.0f} ms" if value is not None else "       - ms"
+
+
+def _mb(value):
+    return f"{value:7.0f} MB" if value is not None else "      - MB"
+
+
+def capacity(levels, slo_ms):
+    """Konkurensi tertinggi tanpa error dengan p99 <= `slo_ms`; 0 jika tidak ada."""
+    passing = [r["concurrency"] for r in levels if r["errors"] == 0 and r["p99_ms"] is not None and r["p99_ms"] <= slo_ms]
+    return max(passing, default=0)
+
+
+def run(concurrency_levels, duration=30.0, mix=SCENARIOS, images=None, think=0.5, slo_ms=2000.0,
+        seed=0, timeout=300.0, log=print):
+    """Pemanasan (cold start + model) lalu satu run per tingkat konkurensi, semua di proses ini."""
+    import streamlit
+    if not streamlit.__version__.startswith(STREAMLIT_VERSION + "."):
+        log(f"Peringatan: harness ditulis untuk internal Streamlit {STREAMLIT_VERSION}, "
+            f"terpasang {streamlit.__version__}; hasil bisa tidak valid")
+    corpus = load_corpus(images) if "vision" in mix else []
+    with shared_runtime(), stub_file_uploader():
+        # Satu sesi pemanasan per skenario: cache, rollup dan model dimuat sebelum pengukuran
+        warm_started = time.perf_counter()
+        for scenario in mix:
+            warm = Session(mix, corpus, seed, timeout)
+            warm.step(scenario)
+            if warm.errors:
+                log(f"Pemanasan {scenario} gagal: {warm.errors[0]}")
+        cold_start = time.perf_counter() - warm_started
+        log(f"Pemanasan {cold_start:.1f} dtk; mengukur {', '.join(mix)} selama {duration:g} dtk per tingkat")
+        levels = [run_level(n, duration, corpus, mix, think, seed, timeout, log) for n in concurrency_levels]
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": os.environ.get("JALU_MODEL_PATH", ""),
+        },
+        "settings": {"duration": duration, "mix": list(mix), "think": think, "slo_ms": slo_ms,
+                     "images": len(corpus)},
+        "warmup_seconds": cold_start,
+        "levels": levels,
+        "capacity": capacity(levels, slo_ms),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban sesi bersamaan untuk app.py (offline)")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Tingkat jumlah sesi, dipisah koma")
+    parser.add_argument("--duration", type=float, default=30.0, help="Detik pengukuran per tingkat")
+    parser.add_argument("--mix", default=",".join(SCENARIOS), help=f"Skenario sesi (bergiliran): {', '.join(SCENARIOS)}")
+    parser.add_argument("--images", default=None, help="Folder korpus gambar (default: JPEG sintetis)")
+    parser.add_argument("--think", type=float, default=0.5, help="Rata-rata jeda antar aksi per sesi (detik)")
+    parser.add_argument("--slo", type=float, default=2.0, help="Batas p99 latensi rerun untuk angka kapasitas (detik)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    mix = tuple(s.strip() for s in args.mix.split(",") if s.strip())
+    unknown = [s for s in mix if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Skenario tidak dikenal: {', '.join(unknown)}")
+    levels = [int(n) for n in args.concurrency.split(",") if n.strip()]
+
+    report = run(levels, args.duration, mix, args.images, args.think, args.slo * 1000, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {args.output}")
+    print(f"Kapasitas: {report['capacity']} sesi bersamaan (p99 <= {args.slo:g} dtk, tanpa error)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+# =============================================================================
+# JALU - Generator data MBG sintetis
+# Data mock MBG (24 kolom, skema sama dengan data dashboard) dibuat
+# tervektorisasi dengan NumPy dan seed tetap. Baris dibangkitkan per blok
+# 65.536 baris, masing-masing dengan stream acak sendiri dari
+# SeedSequence(seed, blok): isi tiap baris hanya bergantung pada seed dan
+# posisinya, tidak pada ukuran chunk, jumlah worker, atau proses mana yang
+# membangkitkannya. Provinsi (38) berbobot populasi, kabupaten/kota mengikuti
+# jumlah riil per provinsi (514), dan jumlah sekolah per baris mengikuti jenjang.
+# Dataset besar ditulis sebagai stream chunk ke Parquet terpartisi hive yang
+# dibaca mbg_store.ParquetStore.
+#
+# Konfigurasi lewat environment variable (data mock di app.py):
+#   JALU_MBG_ROWS   jumlah baris acak data mock bila JALU_MBG_DATA kosong, untuk uji beban
+#                   (default: grid lengkap, satu baris per provinsi x jenjang)
+#   JALU_MBG_SEED   seed data mock (default: 42)
+#
+# Penggunaan CLI:
+#   python mbg_generator.py data/mbg --rows 10000000 --seed 42 --workers 4
+# =============================================================================
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 1 << 16
+DEFAULT_CHUNK_ROWS = 16 * BLOCK_ROWS  # ~1 juta baris per chunk
+DEFAULT_SEED = 42
+# Kunci stream grid lengkap, terpisah dari semua blok baris biasa
+GRID_BLOCK = 2**32 - 1
+
+# (provinsi, jumlah kabupaten/kota, jumlah kota, bobot ~ populasi dalam juta)
+PROVINCE_SPECS = [
+    ("Aceh", 23, 5, 5.5), ("Sumatera Utara", 33, 8, 15.4), ("Sumatera Barat", 19, 7, 5.8),
+    ("Riau", 12, 2, 6.6), ("Jambi", 11, 2, 3.7), ("Sumatera Selatan", 17, 4, 8.7),
+    ("Bengkulu", 10, 1, 2.1), ("Lampung", 15, 2, 9.3), ("Kepulauan Bangka Belitung", 7, 1, 1.5),
+    ("Kepulauan Riau", 7, 2, 2.2), ("DKI Jakarta", 6, 5, 10.7), ("Jawa Barat", 27, 9, 49.9),
+    ("Jawa Tengah", 35, 6, 37.5), ("DI Yogyakarta", 5, 1, 3.7), ("Jawa Timur", 38, 9, 41.5),
+    ("Banten", 8, 4, 12.3), ("Bali", 9, 1, 4.4), ("Nusa Tenggara Barat", 10, 2, 5.6),
+    ("Nusa Tenggara Timur", 22, 1, 5.6), ("Kalimantan Barat", 14, 2, 5.6), ("Kalimantan Tengah", 14, 1, 2.7),
+    ("Kalimantan Selatan", 13, 2, 4.2), ("Kalimantan Timur", 10, 3, 4.0), ("Kalimantan Utara", 5, 1, 0.7),
+    ("Sulawesi Utara", 15, 4, 2.7), ("Sulawesi Tengah", 13, 1, 3.1), ("Sulawesi Selatan", 24, 3, 9.4),
+    ("Sulawesi Tenggara", 17, 2, 2.8), ("Gorontalo", 6, 1, 1.2), ("Sulawesi Barat", 6, 0, 1.5),
+    ("Maluku", 11, 2, 1.9), ("Maluku Utara", 10, 2, 1.3), ("Papua", 9, 1, 1.1),
+    ("Papua Barat", 7, 0, 0.6), ("Papua Selatan", 4, 0, 0.5), ("Papua Tengah", 8, 0, 1.4),
+    ("Papua Pegunungan", 8, 0, 1.4), ("Papua Barat Daya", 6, 1, 0.6),
+]
+PROVINCES = [name for name, _, _, _ in PROVINCE_SPECS]
+# Porsi baris per jenjang, kira-kira sebanding jumlah sekolah
+LEVELS = ["SD", "SMP", "SMA"]
+LEVEL_WEIGHTS = [0.6, 0.25, 0.15]
+# Rentang Jumlah_Sekolah per baris menurut jenjang (SD sama dengan data mock lama)
+SCHOOLS_PER_LEVEL = {"SD": (100, 500), "SMP": (30, 150), "SMA": (10, 60)}
+
+DISTRICTS = []
+DISTRICT_OFFSETS = []
+for _name, _count, _cities, _weight in PROVINCE_SPECS:
+    DISTRICT_OFFSETS.append(len(DISTRICTS))
+    DISTRICTS += [f"Kota {_name} {i + 1:02d}" if i < _cities else f"Kab. {_name} {i + 1:02d}" for i in range(_count)]
+DISTRICT_OFFSETS = np.array(DISTRICT_OFFSETS, dtype=np.int32)
+DISTRICT_COUNTS = np.array([count for _, count, _, _ in PROVINCE_SPECS], dtype=np.int32)
+PROVINCE_WEIGHTS = np.array([weight for _, _, _, weight in PROVINCE_SPECS]) / sum(w for _, _, _, w in PROVINCE_SPECS)
+
+# Kolom numerik: (nama, "int" | "float", batas bawah, batas atas), urutan sama dengan skema data mock
+NUMERIC_SPECS = [
+    ("Jumlah_Siswa_Penerima", "int", 50_000, 200_000),
+    ("Tingkat_Kepuasan", "float", 70, 95),
+    ("Penurunan_Stunting", "float", 5, 15),
+    ("Indeks_Keberhasilan", "float", 75, 98),
+    ("Anggaran_Terserap", "float", 80, 100),
+    ("Jumlah_Sekolah", "int", None, None),  # per jenjang, lihat SCHOOLS_PER_LEVEL
+    ("Rata_Rata_Berat_Badan", "float", 25, 35),
+    ("Persentase_Gizi_Baik", "float", 60, 90),
+    ("Jumlah_Kantin_Sehat", "int", 50, 200),
+    ("Efisiensi_Distribusi", "float", 75, 95),
+    ("Tingkat_Partisipasi_Orang_Tua", "float", 70, 95),
+    ("Jumlah_Guru_Terbina", "int", 200, 800),
+    ("Persentase_Kehadiran_Siswa", "float", 85, 98),
+    ("Biaya_Per_Siswa", "float", 15_000, 25_000),
+    ("Jumlah_Paket_Makanan", "int", 1_000, 5_000),
+    ("Tingkat_Kualitas_Makanan", "float", 75, 95),
+    ("Persentase_Siswa_Aktif", "float", 80, 95),
+    ("Jumlah_Monitoring_Bulanan", "int", 10, 30),
+    ("Indeks_Kesehatan_Sekolah", "float", 70, 95),
+    ("Persentase_Program_Lanjutan", "float", 60, 90),
+    ("Jumlah_Kemitraan", "int", 5, 20),
+]
+COLUMNS = (
+    ["Provinsi", "Jenjang_Pendidikan"]
+    + [name for name, _, _, _ in NUMERIC_SPECS[:5]]
+    + ["Kabupaten_Kota"]
+    + [name for name, _, _, _ in NUMERIC_SPECS[5:]]
+)
+
+
+def _generate_block(seed, block, rows, province=None, level=None):
+    """Kode dimensi + array numerik untuk satu blok; stream acak khusus (seed, blok).
+
+    `province`/`level` (kode) menggantikan penarikan acak provinsi dan jenjang.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+    if province is None:
+        province = rng.choice(len(PROVINCES), rows, p=PROVINCE_WEIGHTS).astype(np.int16)
+        level = rng.choice(len(LEVELS), rows, p=LEVEL_WEIGHTS).astype(np.int8)
+    district = (DISTRICT_OFFSETS[province] + (rng.random(rows) * DISTRICT_COUNTS[province]).astype(np.int32)).astype(np.int16)
+    columns = {"Provinsi": province, "Jenjang_Pendidikan": level, "Kabupaten_Kota": district}
+    for name, kind, low, high in NUMERIC_SPECS:
+        if name == "Jumlah_Sekolah":
+            bounds = np.array([SCHOOLS_PER_LEVEL[lvl] for lvl in LEVELS])[level]
+            columns[name] = rng.integers(bounds[:, 0], bounds[:, 1] + 1)
+        elif kind == "int":
+            columns[name] = rng.integers(low, high + 1, rows)
+        else:
+            columns[name] = rng.uniform(low, high, rows)
+    return columns
+
+
+def _generate_codes(rows, seed, first_block=0, columns=COLUMNS):
+    # Semua kolom tetap dibangkitkan per blok (stream acak tidak bergeser); hanya `columns` yang digabung.
+    # rows == 0 tetap memakai satu blok kosong agar dtype kolom sama dengan hasil berisi
+    blocks = [
+        {name: values for name, values in _generate_block(seed, first_block + i, min(BLOCK_ROWS, rows - i * BLOCK_ROWS)).items() if name in columns}
+        for i in range(max(1, -(-rows // BLOCK_ROWS)))
+    ]
+    if len(blocks) == 1:
+        return blocks[0]
+    return {name: np.concatenate([b[name] for b in blocks]) for name in columns}
+
+
+_DIMENSION_VALUES = {
+    "Provinsi": np.array(PROVINCES, dtype=object),
+    "Jenjang_Pendidikan": np.array(LEVELS, dtype=object),
+    "Kabupaten_Kota": np.array(DISTRICTS, dtype=object),
+}
+_INT_COLUMNS = {name for name, kind, _, _ in NUMERIC_SPECS if kind == "int"}
+
+
+def generate(rows, seed=DEFAULT_SEED, first_block=0, columns=COLUMNS):
+    """DataFrame `rows` baris (dimensi berupa string); hasil sama untuk seed yang sama.
+
+    `columns` membatasi kolom yang dimaterialisasi tanpa mengubah nilai kolom lain.
+    """
+    return _to_frame(_generate_codes(rows, seed, first_block, columns), columns)
+
+
+def generate_grid(seed=DEFAULT_SEED, columns=COLUMNS):
+    """Satu baris per (provinsi, jenjang), 38 x 3 baris: setiap kombinasi filter dashboard terisi."""
+    province = np.repeat(np.arange(len(PROVINCES), dtype=np.int16), len(LEVELS))
+    level = np.tile(np.arange(len(LEVELS), dtype=np.int8), len(PROVINCES))
+    return _to_frame(_generate_block(seed, GRID_BLOCK, len(province), province, level), columns)
+
+
+def _to_frame(codes, columns):
+    return pd.DataFrame({
+        name: _DIMENSION_VALUES[name][codes[name]] if name in _DIMENSION_VALUES else codes[name]
+        for name in columns
+    })
+
+
+def _partitioned_chunk(rows, seed, chunk_rows, chunk):
+    """Kode satu chunk diurutkan stabil per partisi (Provinsi, Jenjang) + jumlah baris per partisi."""
+    start = chunk * chunk_rows
+    codes = _generate_codes(min(chunk_rows, rows - start), seed, first_block=start // BLOCK_ROWS)
+    key = codes["Provinsi"].astype(np.int32) * len(LEVELS) + codes["Jenjang_Pendidikan"]
+    order = np.argsort(key, kind="stable")
+    counts = np.bincount(key, minlength=len(PROVINCES) * len(LEVELS))
+    return {name: values[order] for name, values in codes.items()}, counts
+
+
+def _iter_chunks(rows, seed, chunk_rows, workers):
+    # Chunk selalu dimulai di batas blok, sehingga isi tidak bergantung ukuran chunk
+    chunk_rows = max(BLOCK_ROWS, chunk_rows // BLOCK_ROWS * BLOCK_ROWS)
+    chunks = range(-(-rows // chunk_rows))
+    if workers <= 1:
+        for chunk in chunks:
+            yield _partitioned_chunk(rows, seed, chunk_rows, chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Jendela terbatas: paling banyak 2 chunk per worker menunggu ditulis, urutan chunk dipertahankan
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_partitioned_chunk, rows, seed, chunk_rows, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_parquet(root, rows, seed=DEFAULT_SEED, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """Tulis dataset hive Provinsi/Jenjang_Pendidikan (layout mbg_store) sebagai stream chunk.
+
+    Satu file per partisi dibiarkan terbuka dan tiap chunk ditambahkan sebagai row group, jadi
+    memori dibatasi satu chunk berapa pun `rows`; urutan baris dalam file = urutan global.
+    """
+    import shutil
+    from urllib.parse import quote
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = [name for name in COLUMNS if name not in ("Provinsi", "Jenjang_Pendidikan")]
+    schema = pa.schema([
+        (name, pa.string() if name in _DIMENSION_VALUES else pa.int64() if name in _INT_COLUMNS else pa.float64())
+        for name in names
+    ])
+    districts = pa.array(DISTRICTS, type=pa.string())
+    writers = {}
+    try:
+        for codes, counts in _iter_chunks(rows, seed, chunk_rows, workers):
+            batch = pa.RecordBatch.from_arrays([
+                pa.DictionaryArray.from_arrays(codes[name], districts).dictionary_decode()
+                if name == "Kabupaten_Kota" else pa.array(codes[name])
+                for name in names
+            ], schema=schema)
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            for key in np.flatnonzero(counts):
+                writer = writers.get(key)
+                if writer is None:
+                    province, level = PROVINCES[key // len(LEVELS)], LEVELS[key % len(LEVELS)]
+                    directory = os.path.join(root, f"Provinsi={quote(province, safe='')}", f"Jenjang_Pendidikan={level}")
+                    # Sama dengan existing_data_behavior="delete_matching" pada mbg_store.write_partitioned
+                    shutil.rmtree(directory, ignore_errors=True)
+                    os.makedirs(directory)
+                    writer = writers[key] = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), schema)
+                writer.write_batch(batch.slice(offsets[key], counts[key]))
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return root
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bangkitkan dataset MBG sintetis (Parquet terpartisi)")
+    parser.add_argument("root", help="Direktori tujuan dataset (dipakai lewat JALU_MBG_DATA)")
+    parser.add_argument("--rows", type=float, default=1_000_000, help="Jumlah baris, mis. 1e7")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="Proses pembangkit paralel")
+    args = parser.parse_args(argv)
+
+    rows = int(args.rows)
+    started = time.perf_counter()
+    write_parquet(args.root, rows, args.seed, args.chunk_rows, args.workers)
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(args.root) for f in files)
+    print(f"{rows:,} baris ditulis ke {args.root} dalam {elapsed:.1f} dtk "
+          f"({rows / max(elapsed, 1e-9):,.0f} baris/dtk, {size / 1e6:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# =============================================================================
+# JALU - Rollup agregat untuk Dashboard Analisis
+# Agregat aditif (count, sum, sum of squares, cross-product) plus maksimum per
+# sel Provinsi x Jenjang_Pendidikan. Kartu ringkasan, pie chart, matriks korelasi
+# dan highlight maksimum tabel dihitung dari sel rollup, sehingga biayanya tidak
+# bergantung jumlah baris mentah.
+# =============================================================================
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+ROLLUP_DIMENSIONS = ["Provinsi", "Jenjang_Pendidikan"]
+ROLLUP_METRICS = [
+    "Jumlah_Siswa_Penerima", "Tingkat_Kepuasan", "Penurunan_Stunting",
+    "Indeks_Keberhasilan", "Anggaran_Terserap"
+]
+CORRELATION_METRICS = ["Tingkat_Kepuasan", "Penurunan_Stunting", "Indeks_Keberhasilan", "Anggaran_Terserap"]
+
+
+def _partial_aggregates(batch):
+    values = batch[ROLLUP_METRICS].astype(np.float64)
+    parts = {"count": pd.Series(1.0, index=batch.index)}
+    for metric in ROLLUP_METRICS:
+        parts[f"sum:{metric}"] = values[metric]
+        parts[f"sq:{metric}"] = values[metric] ** 2
+    for a, b in combinations(CORRELATION_METRICS, 2):
+        parts[f"xp:{a}:{b}"] = values[a] * values[b]
+    frame = pd.DataFrame(parts)
+    for dim in ROLLUP_DIMENSIONS:
+        frame[dim] = batch[dim].astype(str).to_numpy()
+    return frame.groupby(ROLLUP_DIMENSIONS, observed=True).sum()
+
+
+def _partial_maxima(batch, columns):
+    frame = batch[columns].copy()
+    for dim in ROLLUP_DIMENSIONS:
+        frame[dim] = batch[dim].astype(str).to_numpy()
+    return frame.groupby(ROLLUP_DIMENSIONS, observed=True).max()
+
+
+def build_rollup(store):
+    """Satu kali scan per batch atas dataset; hasilnya berukuran jumlah sel, bukan jumlah baris."""
+    max_columns = list(store.numeric_columns)
+    columns = ROLLUP_DIMENSIONS + ROLLUP_METRICS + [c for c in max_columns if c not in ROLLUP_METRICS]
+    cells, maxima = None, None
+    for batch in store.iter_batches(columns):
+        if batch.empty:
+            continue
+        partial = _partial_aggregates(batch)
+        cells = partial if cells is None else cells.add(partial, fill_value=0.0)
+        partial_max = _partial_maxima(batch, max_columns)
+        maxima = partial_max if maxima is None else maxima.combine(partial_max, np.fmax)
+    return Rollup(cells, maxima)
+
+
+class Rollup:
+    def __init__(self, cells, maxima=None):
+        self.cells = cells
+        self.maxima = maxima
+
+    def column_max(self, filters):
+        """Nilai maksimum tiap kolom numerik pada baris yang lolos filter."""
+        if self.maxima is None:
+            return pd.Series(dtype=np.float64)
+        mask = np.ones(len(self.maxima), dtype=bool)
+        for dim, values in (filters or {}).items():
+            mask &= self.maxima.index.get_level_values(dim).isin(list(values))
+        return self.maxima[mask].max()
+
+    def select(self, filters):
+        cells = self.cells
+        if cells is None:
+            return None
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, values in (filters or {}).items():
+            mask &= cells.index.get_level_values(dim).isin(list(values))
+        return cells[mask]
+
+    def totals(self, filters):
+        """Jumlah, count dan rata-rata tiap metrik untuk sel yang lolos filter."""
+        cells = self.select(filters)
+        count = float(cells["count"].sum()) if cells is not None else 0.0
+        result = {"count": count}
+        for metric in ROLLUP_METRICS:
+            total = float(cells[f"sum:{metric}"].sum()) if cells is not None else 0.0
+            result[f"sum:{metric}"] = total
+            result[f"mean:{metric}"] = total / count if count else float("nan")
+        return result
+
+    def group_mean(self, filters, by, metric):
+        cells = self.select(filters)
+        if cells is None or cells.empty:
+            return pd.DataFrame({by: [], metric: []})
+        grouped = cells.groupby(level=by)[["count", f"sum:{metric}"]].sum()
+        grouped[metric] = grouped[f"sum:{metric}"] / grouped["count"]
+        return grouped[[metric]].reset_index()
+
+    def correlation(self, filters, metrics=CORRELATION_METRICS):
+        """Korelasi Pearson dari n, Σx, Σx², Σxy (setara DataFrame.corr() pada baris mentah)."""
+        cells = self.select(filters)
+        n = float(cells["count"].sum()) if cells is not None else 0.0
+        corr = pd.DataFrame(np.nan, index=metrics, columns=metrics)
+        if n < 2:
+            return corr
+        sums = {m: float(cells[f"sum:{m}"].sum()) for m in metrics}
+        variance = {m: float(cells[f"sq:{m}"].sum()) - sums[m] ** 2 / n for m in metrics}
+        for m in metrics:
+            corr.loc[m, m] = 1.0 if variance[m] > 0 else np.nan
+        for a, b in combinations(metrics, 2):
+            key = f"xp:{a}:{b}" if f"xp:{a}:{b}" in cells else f"xp:{b}:{a}"
+            covariance = float(cells[key].sum()) - sums[a] * sums[b] / n
+            denominator = np.sqrt(variance[a] * variance[b])
+            corr.loc[a, b] = corr.loc[b, a] = covariance / denominator if denominator > 0 else np.nan
+        return corr
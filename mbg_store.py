@@ -0,0 +1,350 @@
+# =============================================================================
+# JALU - Lapisan data MBG untuk Dashboard Analisis
+# Dataset Parquet terpartisi (hive: Provinsi=.../Jenjang_Pendidikan=...) dengan
+# filter yang didorong ke pemangkasan partisi dan proyeksi kolom. Halaman tabel
+# terurut memakai row id stabil (fragmen, baris) yang diurutkan sekali per
+# kombinasi filter; tiap halaman hanya membaca row group barisnya. Jika dataset
+# belum ada, data mock di memori dipakai dengan antarmuka yang sama.
+#
+# Penggunaan CLI:
+#   python mbg_store.py export mbg.csv data/mbg   # tulis CSV ke format partisi
+# =============================================================================
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Kolom partisi; filter multiselect dashboard memangkas direktori, bukan baris
+DIMENSIONS = ["Provinsi", "Jenjang_Pendidikan"]
+# Dimensi kategorikal yang diberi bitmap index di store memori
+INDEXED_DIMENSIONS = DIMENSIONS + ["Kabupaten_Kota"]
+
+
+class BitmapIndex:
+    """Kode kamus + satu bitmap (np.packbits) per nilai untuk satu dimensi kategorikal."""
+
+    def __init__(self, values):
+        codes, categories = pd.factorize(values, sort=False)
+        self.num_rows = len(codes)
+        self.categories = list(categories)
+        self.codes = codes.astype(np.int32)
+        self.bitmaps = {
+            category: np.packbits(self.codes == code)
+            for code, category in enumerate(self.categories)
+        }
+
+    def select(self, values):
+        """OR bitmap dari nilai terpilih; nilai yang tidak dikenal diabaikan."""
+        result = np.zeros((self.num_rows + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps.get(value)
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+
+class FrameStore:
+    """Store di memori di atas DataFrame (data mock / dataset kecil)."""
+
+    def __init__(self, frame, cache_entries=32):
+        self.frame = frame
+        self.columns = list(frame.columns)
+        hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        self.version = hashlib.sha256(hashed.tobytes()).hexdigest()[:16]
+        self.indexes = {
+            column: BitmapIndex(frame[column])
+            for column in INDEXED_DIMENSIONS if column in frame.columns
+        }
+        # Bitmap per (dimensi, pilihan) dan baris terpilih per kombinasi filter,
+        # dipakai ulang antar rerun dan antar sesi selama pilihan tidak berubah
+        self.cache_entries = cache_entries
+        self._dimension_cache = OrderedDict()
+        self._selection_cache = OrderedDict()
+        self._sort_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def dimension_values(self, column):
+        if column in self.indexes:
+            return list(self.indexes[column].categories)
+        return list(self.frame[column].unique())
+
+    def _cached(self, cache, key, compute):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = compute()
+        with self._lock:
+            cache[key] = value
+            while len(cache) > self.cache_entries:
+                cache.popitem(last=False)
+        return value
+
+    def _dimension_bitmap(self, column, values):
+        key = (column, frozenset(values))
+        if column in self.indexes:
+            return self._cached(self._dimension_cache, key, lambda: self.indexes[column].select(values))
+        return self._cached(
+            self._dimension_cache, key,
+            lambda: np.packbits(self.frame[column].isin(list(values)).to_numpy())
+        )
+
+    def select_rows(self, filters=None):
+        """Posisi baris yang lolos filter: AND dari bitmap tiap dimensi."""
+        filters = filters or {}
+        key = frozenset((column, frozenset(values)) for column, values in filters.items())
+
+        def compute():
+            selection = np.full((len(self.frame) + 7) // 8, 0xFF, dtype=np.uint8)
+            for column, values in filters.items():
+                selection &= self._dimension_bitmap(column, values)
+            return np.flatnonzero(np.unpackbits(selection, count=len(self.frame)))
+
+        return self._cached(self._selection_cache, key, compute)
+
+    def load(self, columns=None, filters=None):
+        frame = self.frame[columns] if columns is not None else self.frame
+        if not filters:
+            return frame
+        return frame.take(self.select_rows(filters))
+
+    @property
+    def numeric_columns(self):
+        return list(self.frame.select_dtypes("number").columns)
+
+    def count_rows(self, filters=None):
+        return len(self.select_rows(filters)) if filters else len(self.frame)
+
+    def _sorted_rows(self, filters, sort_by, ascending):
+        """Posisi baris terpilih, terurut stabil menurut `sort_by`; dihitung sekali per kombinasi."""
+        filters = filters or {}
+        key = (frozenset((column, frozenset(values)) for column, values in filters.items()), sort_by, ascending)
+
+        def compute():
+            rows = self.select_rows(filters) if filters else np.arange(len(self.frame))
+            keys = self.frame[sort_by].to_numpy()[rows].astype(np.float64)
+            # Posisi naik sebagai urutan awal: nilai kembar selalu urut posisi baris
+            return rows[np.lexsort((rows, keys if ascending else -keys))]
+
+        return self._cached(self._sort_cache, key, compute)
+
+    def fetch_page(self, filters=None, offset=0, limit=25, sort_by=None, ascending=True):
+        """Hanya baris pada jendela [offset, offset + limit) yang dimaterialisasi."""
+        if sort_by is not None:
+            rows = self._sorted_rows(filters, sort_by, ascending)
+        else:
+            rows = self.select_rows(filters) if filters else np.arange(len(self.frame))
+        return self.frame.take(rows[offset:offset + limit])
+
+    def iter_batches(self, columns, batch_rows=1_000_000):
+        for start in range(0, len(self.frame), batch_rows):
+            yield self.frame[columns].iloc[start:start + batch_rows]
+
+
+class ParquetStore:
+    """Store di atas dataset Parquet terpartisi hive."""
+
+    def __init__(self, root, cache_entries=4):
+        import pyarrow.dataset as ds
+        self.root = root
+        self.dataset = ds.dataset(root, format="parquet", partitioning="hive")
+        # Kolom partisi di depan, mengikuti urutan skema data mock
+        names = self.dataset.schema.names
+        self.columns = [c for c in DIMENSIONS if c in names] + [c for c in names if c not in DIMENSIONS]
+        # Urutan fragmen tetap (per path) untuk row id stabil: (nomor fragmen << 32) | baris dalam fragmen
+        self._fragments = sorted(self.dataset.get_fragments(), key=lambda fragment: fragment.path)
+        self._fragment_numbers = {fragment.path: number for number, fragment in enumerate(self._fragments)}
+        self.version = self._fingerprint()
+        # Row id terurut per (filter, kolom sort, arah); tiap entri 8 byte per baris terpilih
+        self.cache_entries = cache_entries
+        self._sort_cache = OrderedDict()
+        self._row_group_cache = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self):
+        digest = hashlib.sha256()
+        for path in sorted(self.dataset.files):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def dimension_values(self, column):
+        import pyarrow.dataset as ds
+        if column in DIMENSIONS:
+            # Nilai partisi dibaca dari path file, tanpa membaca isi data
+            values = []
+            for fragment in self.dataset.get_fragments():
+                value = ds.get_partition_keys(fragment.partition_expression).get(column)
+                if value is not None and value not in values:
+                    values.append(value)
+            return sorted(values)
+        return self.dataset.to_table(columns=[column]).column(column).unique().to_pylist()
+
+    def _filter_expression(self, filters):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        expression = None
+        for column, values in (filters or {}).items():
+            value_type = self.dataset.schema.field(column).type
+            condition = ds.field(column).isin(pa.array(list(values), type=value_type))
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def load(self, columns=None, filters=None):
+        table = self.dataset.to_table(columns=columns or self.columns, filter=self._filter_expression(filters))
+        return table.to_pandas()
+
+    @property
+    def numeric_columns(self):
+        import pyarrow.types as pat
+        return [f.name for f in self.dataset.schema if pat.is_integer(f.type) or pat.is_floating(f.type)]
+
+    def count_rows(self, filters=None):
+        return self.dataset.count_rows(filter=self._filter_expression(filters))
+
+    def _sorted_row_ids(self, filters, sort_by, ascending):
+        """Row id baris yang lolos filter, terurut stabil menurut `sort_by`; dihitung sekali per kombinasi."""
+        import pyarrow as pa
+        filters = filters or {}
+        key = (frozenset((column, frozenset(values)) for column, values in filters.items()), sort_by, ascending)
+        with self._lock:
+            if key in self._sort_cache:
+                self._sort_cache.move_to_end(key)
+                return self._sort_cache[key]
+
+        # Filter partisi memangkas fragmen; sisanya dievaluasi Arrow di dalam scan tiap fragmen
+        residual = {column: values for column, values in filters.items() if column not in DIMENSIONS}
+        residual_expression = self._filter_expression(residual)
+        columns = [sort_by] + [column for column in residual if column != sort_by]
+        keys, row_ids = [], []
+        for fragment in self.dataset.get_fragments(filter=self._filter_expression(filters)):
+            table = fragment.scanner(schema=self.dataset.schema, columns=columns).to_table()
+            rows = pa.array(np.arange(table.num_rows, dtype=np.int64))
+            if residual_expression is not None:
+                table = table.append_column("__row", rows).filter(residual_expression)
+                rows = table.column("__row")
+            keys.append(table.column(sort_by).to_numpy().astype(np.float64))
+            row_ids.append((self._fragment_numbers[fragment.path] << 32) | np.asarray(rows, dtype=np.int64))
+        keys = np.concatenate(keys) if keys else np.empty(0)
+        row_ids = np.concatenate(row_ids) if row_ids else np.empty(0, dtype=np.int64)
+        # Row id naik sebagai urutan awal: nilai kembar tetap urut path fragmen lalu posisi baris
+        order = np.lexsort((row_ids, keys if ascending else -keys))
+        value = row_ids[order]
+
+        with self._lock:
+            self._sort_cache[key] = value
+            while len(self._sort_cache) > self.cache_entries:
+                self._sort_cache.popitem(last=False)
+        return value
+
+    def _row_group_starts(self, number):
+        """Baris awal tiap row group fragmen (+ total baris), dari metadata footer Parquet."""
+        with self._lock:
+            starts = self._row_group_cache.get(number)
+        if starts is None:
+            fragment = self._fragments[number]
+            fragment.ensure_complete_metadata()
+            starts = np.concatenate([[0], np.cumsum([group.num_rows for group in fragment.row_groups])]).astype(np.int64)
+            with self._lock:
+                self._row_group_cache[number] = starts
+        return starts
+
+    def _take_rows(self, row_ids):
+        """Baris lengkap untuk `row_ids`, dalam urutan yang sama."""
+        import pyarrow as pa
+        if len(row_ids) == 0:
+            return pa.Table.from_batches([], schema=self.dataset.schema).select(self.columns).to_pandas()
+        fragments, rows = row_ids >> 32, row_ids & 0xFFFFFFFF
+        pieces, order = [], []
+        for number in np.unique(fragments):
+            selected = np.flatnonzero(fragments == number)
+            # Hanya row group yang memuat baris halaman ini yang dibaca
+            starts = self._row_group_starts(number)
+            groups = np.searchsorted(starts, rows[selected], side="right") - 1
+            needed = np.unique(groups)
+            needed_starts = np.concatenate([[0], np.cumsum(np.diff(starts)[needed])[:-1]])
+            local = needed_starts[np.searchsorted(needed, groups)] + rows[selected] - starts[groups]
+            fragment = self._fragments[number].subset(row_group_ids=needed.tolist())
+            scanner = fragment.scanner(schema=self.dataset.schema, columns=self.columns)
+            pieces.append(scanner.take(pa.array(local)))
+            order.append(selected)
+        table = pa.concat_tables(pieces).take(pa.array(np.argsort(np.concatenate(order))))
+        return table.to_pandas()
+
+    def fetch_page(self, filters=None, offset=0, limit=25, sort_by=None, ascending=True):
+        """Ambil satu halaman tanpa memuat seluruh hasil filter ke memori."""
+        import pyarrow as pa
+        expression = self._filter_expression(filters)
+        if sort_by is None:
+            # Offset/limit berurutan: lewati batch sampai offset, berhenti setelah limit baris
+            pieces, skipped, taken = [], 0, 0
+            for batch in self.dataset.to_batches(columns=self.columns, filter=expression):
+                if skipped + batch.num_rows <= offset:
+                    skipped += batch.num_rows
+                    continue
+                start = max(offset - skipped, 0)
+                piece = batch.slice(start, limit - taken)
+                pieces.append(piece)
+                skipped += start
+                taken += piece.num_rows
+                if taken >= limit:
+                    break
+            if not pieces:
+                return pa.Table.from_batches([], schema=self.dataset.schema).select(self.columns).to_pandas()
+            return pa.Table.from_batches(pieces).to_pandas()
+
+        # Dengan urutan: kolom sort dipindai sekali per (filter, kolom, arah) dan row id terurut
+        # di-cache; halaman berikutnya hanya mengambil `limit` baris lewat row id
+        window = self._sorted_row_ids(filters, sort_by, ascending)[offset:offset + limit]
+        return self._take_rows(window)
+
+    def iter_batches(self, columns, batch_rows=1_000_000):
+        """Baca dataset per batch agar memori tetap konstan berapa pun jumlah baris."""
+        for batch in self.dataset.to_batches(columns=columns, batch_size=batch_rows):
+            yield batch.to_pandas()
+
+
+def open_store(root=None, fallback=None):
+    """Buka dataset Parquet di `root` (default JALU_MBG_DATA); jika tidak ada, pakai `fallback()`."""
+    root = root or os.environ.get("JALU_MBG_DATA")
+    if root and os.path.isdir(root):
+        return ParquetStore(root)
+    return FrameStore(fallback())
+
+
+def write_partitioned(frame, root):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    ds.write_dataset(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        root,
+        format="parquet",
+        partitioning=DIMENSIONS,
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Utilitas dataset MBG")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="Tulis CSV ke dataset Parquet terpartisi")
+    p_export.add_argument("csv")
+    p_export.add_argument("root")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        frame = pd.read_csv(args.csv)
+        write_partitioned(frame, args.root)
+        print(f"{len(frame)} baris ditulis ke {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
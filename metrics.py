@@ -0,0 +1,182 @@
+# =============================================================================
+# JALU - Instrumentasi latensi per tahap
+# Span ringan (perf_counter) di sekitar tahap rerun: muat model, dekode,
+# inferensi, render, agregasi nutrisi, muat/filter data dan build chart. Tiap
+# tahap punya histogram bucket tetap (format Prometheus) plus jendela sampel
+# terakhir untuk p50/p95 di panel admin. Ekspor lewat endpoint HTTP lokal
+# /metrics dan/atau log JSON per baris.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_METRICS_PORT   port endpoint /metrics (kosong = tidak dijalankan)
+#   JALU_METRICS_HOST   alamat bind endpoint (default: 127.0.0.1)
+#   JALU_METRICS_LOG    path log JSON per span (kosong = tanpa log)
+# =============================================================================
+
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Batas atas bucket histogram dalam detik
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Bucket kumulatif ala Prometheus + `window` sampel terakhir untuk kuantil."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # elemen terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        return float(np.quantile(np.fromiter(self.recent, dtype=np.float64), q)) if self.recent else float("nan")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Histogram per tahap, penghitung hit/miss cache, dan sumber nilai yang dibaca saat ekspor."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024, log_path=None):
+        self.buckets = buckets
+        self.window = window
+        self.started_at = time.time()
+        self._histograms = {}
+        self._cache_counts = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._logger = None
+        if log_path:
+            self._logger = logging.getLogger(f"jalu.metrics.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(logging.FileHandler(log_path, encoding="utf-8"))
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets, self.window)
+            histogram.observe(seconds)
+        if self._logger is not None:
+            self._logger.info(json.dumps({"ts": time.time(), "stage": stage, "ms": round(seconds * 1000, 3)}))
+
+    @contextmanager
+    def span(self, stage):
+        """`with metrics.span("inference"): ...` mencatat durasi blok (juga jika blok melempar error)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def record_cache(self, cache, hit):
+        with self._lock:
+            counts = self._cache_counts.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def add_source(self, name, collect):
+        """`collect()` -> dict {label: angka}, dibaca saat ekspor (mis. statistik DetectionCache)."""
+        with self._lock:
+            self._sources[name] = collect
+
+    def stage_summary(self):
+        """Baris per tahap: jumlah sampel, p50/p95/maks (ms) dari jendela terakhir, rata-rata total."""
+        with self._lock:
+            rows = [
+                {
+                    "stage": stage,
+                    "count": h.count,
+                    "p50_ms": h.quantile(0.5) * 1000,
+                    "p95_ms": h.quantile(0.95) * 1000,
+                    "max_ms": max(h.recent) * 1000 if h.recent else float("nan"),
+                    "mean_ms": h.sum / h.count * 1000 if h.count else float("nan"),
+                }
+                for stage, h in sorted(self._histograms.items())
+            ]
+        return rows
+
+    def cache_summary(self):
+        with self._lock:
+            counts = {cache: tuple(c) for cache, c in self._cache_counts.items()}
+        return {
+            cache: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+            for cache, (hits, misses) in sorted(counts.items())
+        }
+
+    def prometheus_text(self):
+        """Seluruh metrik dalam format teks eksposisi Prometheus 0.0.4."""
+        lines = [
+            "# HELP jalu_stage_seconds Durasi tiap tahap pemrosesan JALU.",
+            "# TYPE jalu_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = [(stage, list(h.counts), h.sum, h.count) for stage, h in sorted(self._histograms.items())]
+            cache_counts = {cache: tuple(c) for cache, c in sorted(self._cache_counts.items())}
+            sources = dict(self._sources)
+        for stage, counts, total, count in histograms:
+            label = f"stage=\"{_escape(stage)}\""
+            cumulative = np.cumsum(counts).tolist()
+            for bound, value in zip(self.buckets, cumulative):
+                lines.append(f"jalu_stage_seconds_bucket{{{label},le=\"{bound:g}\"}} {value}")
+            lines.append(f"jalu_stage_seconds_bucket{{{label},le=\"+Inf\"}} {count}")
+            lines.append(f"jalu_stage_seconds_sum{{{label}}} {total:.9g}")
+            lines.append(f"jalu_stage_seconds_count{{{label}}} {count}")
+
+        lines += ["# HELP jalu_cache_requests_total Lookup cache per hasil.", "# TYPE jalu_cache_requests_total counter"]
+        for cache, (hits, misses) in cache_counts.items():
+            lines.append(f"jalu_cache_requests_total{{cache=\"{_escape(cache)}\",result=\"hit\"}} {hits}")
+            lines.append(f"jalu_cache_requests_total{{cache=\"{_escape(cache)}\",result=\"miss\"}} {misses}")
+
+        for name, collect in sources.items():
+            try:
+                values = collect()
+            except Exception:
+                continue  # sumber yang gagal tidak boleh menggagalkan scrape
+            lines.append(f"# TYPE jalu_{name} gauge")
+            for field, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"jalu_{name}{{field=\"{_escape(field)}\"}} {value:.9g}")
+        lines.append(f"jalu_uptime_seconds {time.time() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(registry, port, host="127.0.0.1"):
+    """Sajikan `GET /metrics` di thread daemon; port 0 = port bebas (lihat server.server_address)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # tidak mencetak satu baris per scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="jalu-metrics-http", daemon=True).start()
+    return server
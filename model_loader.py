@@ -0,0 +1,72 @@
+# =============================================================================
+# JALU - Pemuatan model di latar belakang
+# Model deteksi dibangun dan dipanaskan di thread terpisah, sehingga halaman
+# yang tidak membutuhkan model (Beranda, Dashboard) tampil tanpa menunggu.
+# Halaman Vision cukup menanyakan status loader dan rerun sampai model siap.
+# =============================================================================
+
+import threading
+import time
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class BackgroundLoader:
+    """Jalankan `factory()` (lalu `warmup(hasil)`) sekali di thread daemon."""
+
+    def __init__(self, factory, warmup=None, name="jalu-model-loader"):
+        self.factory = factory
+        self.warmup = warmup
+        self.name = name
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Mulai pemuatan; panggilan berikutnya tidak berpengaruh."""
+        with self._lock:
+            if self.state != PENDING:
+                return self
+            self.state = LOADING
+            self.started_at = time.perf_counter()
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            value = self.factory()
+            if self.warmup is not None:
+                self.warmup(value)
+            self.value = value
+            self.state = READY
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+        finally:
+            self.load_seconds = time.perf_counter() - self.started_at
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def elapsed(self):
+        """Lama pemuatan sejauh ini (atau total jika sudah selesai), dalam detik."""
+        if self.load_seconds is not None:
+            return self.load_seconds
+        if self.started_at is None:
+            return 0.0
+        return time.perf_counter() - self.started_at
+
+    def wait(self, timeout=None):
+        """Tunggu sampai selesai; kembalikan model atau None jika gagal/timeout."""
+        self._done.wait(timeout)
+        return self.value
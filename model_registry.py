@@ -0,0 +1,366 @@
+# =============================================================================
+# JALU - Registry model berversi
+# Artefak detektor dan model kalori disimpan per versi di direktori lokal
+# (<root>/<jenis>/<versi>/ + manifest.json berisi sha256 tiap file). Kanal
+# stable/canary/previous ada di channels.json yang ditulis atomik. Proses app
+# memantau kanal: versi baru dimuat dan dipanaskan di thread latar (checksum
+# dicek dulu), lalu ditukar atomik; selama itu versi lama tetap melayani.
+# Sebagian sesi bisa diarahkan ke canary, dan rollback cukup mengubah kanal.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_MODEL_REGISTRY   direktori registry (kosong = tanpa registry)
+#
+# Penggunaan CLI:
+#   python model_registry.py publish detector yolov8n.onnx --version v2
+#   python model_registry.py publish calorie food_nutrition_model.npy food_nutrition_model.json
+#   python model_registry.py canary detector v2 --fraction 0.1
+#   python model_registry.py promote detector v2
+#   python model_registry.py rollback detector
+#   python model_registry.py list
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from model_loader import FAILED, LOADING, READY, BackgroundLoader
+
+KINDS = ("detector", "calorie")
+CHANNELS_FILE = "channels.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Direktori versi artefak + kanal; semua penulisan lewat rename atomik."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _kind_dir(self, kind):
+        if kind not in KINDS:
+            raise ValueError(f"Jenis model '{kind}' tidak dikenal (pilih: {', '.join(KINDS)})")
+        return os.path.join(self.root, kind)
+
+    def versions(self, kind):
+        directory = self._kind_dir(kind)
+        if not os.path.isdir(directory):
+            return []
+        names = [n for n in os.listdir(directory) if os.path.exists(os.path.join(directory, n, MANIFEST_FILE))]
+        return sorted(names, key=lambda n: self.manifest(kind, n)["created"])
+
+    def manifest(self, kind, version):
+        with open(os.path.join(self._kind_dir(kind), version, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def publish(self, kind, files, version=None, entry=None, notes=""):
+        """Salin `files` ke versi baru; `entry` (default file pertama) adalah file yang dimuat."""
+        directory = self._kind_dir(kind)
+        version = version or time.strftime("v%Y%m%d-%H%M%S")
+        target = os.path.join(directory, version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Versi {kind}/{version} sudah ada")
+        os.makedirs(directory, exist_ok=True)
+
+        # Disalin ke direktori sementara lalu di-rename: versi setengah jadi tidak pernah terlihat
+        staging = tempfile.mkdtemp(dir=directory, prefix=".staging-")
+        try:
+            checksums = {}
+            for path in files:
+                name = os.path.basename(path)
+                shutil.copy2(path, os.path.join(staging, name))
+                checksums[name] = file_sha256(os.path.join(staging, name))
+            _write_json_atomic(os.path.join(staging, MANIFEST_FILE), {
+                "kind": kind,
+                "version": version,
+                "entry": os.path.basename(entry or files[0]),
+                "files": checksums,
+                "created": time.time(),
+                "notes": notes,
+            })
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return version
+
+    def verify(self, kind, version):
+        """Cek sha256 semua file versi; kembalikan path file entry atau lempar ValueError."""
+        manifest = self.manifest(kind, version)
+        directory = os.path.join(self._kind_dir(kind), version)
+        for name, expected in manifest["files"].items():
+            if file_sha256(os.path.join(directory, name)) != expected:
+                raise ValueError(f"Checksum {kind}/{version}/{name} tidak cocok dengan manifest")
+        return os.path.join(directory, manifest["entry"])
+
+    def channels(self, kind=None):
+        path = os.path.join(self.root, CHANNELS_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                channels = json.load(f)
+        except FileNotFoundError:
+            channels = {}
+        return channels.get(kind, {}) if kind else channels
+
+    def _update_channels(self, kind, update):
+        self._kind_dir(kind)
+        channels = self.channels()
+        update(channels.setdefault(kind, {}))
+        _write_json_atomic(os.path.join(self.root, CHANNELS_FILE), channels)
+        return channels[kind]
+
+    def _require(self, kind, version):
+        if version not in self.versions(kind):
+            raise LookupError(f"Versi {kind}/{version} tidak ada di registry")
+
+    def promote(self, kind, version):
+        """Jadikan `version` stable; stable lama disimpan sebagai previous untuk rollback."""
+        self._require(kind, version)
+        self.verify(kind, version)
+
+        def update(channel):
+            if channel.get("stable") not in (None, version):
+                channel["previous"] = channel["stable"]
+            channel["stable"] = version
+            if channel.get("canary") == version:
+                channel.pop("canary")
+                channel.pop("canary_fraction", None)
+        return self._update_channels(kind, update)
+
+    def set_canary(self, kind, version, fraction=0.1):
+        """Arahkan sekitar `fraction` sesi ke `version`; version None menghapus canary."""
+        if version is not None:
+            self._require(kind, version)
+            self.verify(kind, version)
+            if not 0.0 <= fraction <= 1.0:
+                raise ValueError("fraction harus di antara 0 dan 1")
+
+        def update(channel):
+            if version is None:
+                channel.pop("canary", None)
+                channel.pop("canary_fraction", None)
+            else:
+                channel["canary"] = version
+                channel["canary_fraction"] = fraction
+        return self._update_channels(kind, update)
+
+    def rollback(self, kind):
+        """Hapus canary; jika tidak ada canary, kembalikan stable ke versi previous."""
+        def update(channel):
+            if "canary" in channel:
+                channel.pop("canary")
+                channel.pop("canary_fraction", None)
+            elif channel.get("previous"):
+                channel["stable"], channel["previous"] = channel["previous"], channel["stable"]
+            else:
+                raise LookupError(f"Tidak ada canary atau versi previous untuk {kind}")
+        return self._update_channels(kind, update)
+
+
+class HotModel:
+    """Model dari registry yang ditukar tanpa downtime; antarmuka status sama dengan BackgroundLoader."""
+
+    def __init__(self, registry, kind, build, warmup=None, poll_seconds=5.0):
+        self.registry = registry
+        self.kind = kind
+        self.build = build
+        self.warmup = warmup
+        self.poll_seconds = poll_seconds
+        self.swaps = 0
+        self._active = {}   # kanal -> (versi, model) yang sedang melayani
+        self._loaders = {}  # versi -> BackgroundLoader
+        self._channels = {}
+        self._last_poll = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.refresh(force=True)
+        return self
+
+    def _loader(self, version):
+        loader = self._loaders.get(version)
+        if loader is None:
+            def factory():
+                return self.build(self.registry.verify(self.kind, version))
+            loader = BackgroundLoader(factory, warmup=self.warmup, name=f"jalu-registry-{self.kind}-{version}")
+            self._loaders[version] = loader.start()
+        return loader
+
+    def refresh(self, force=False):
+        """Baca kanal (paling sering tiap `poll_seconds`), mulai muat versi baru, tukar yang sudah siap."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_poll is not None and now - self._last_poll < self.poll_seconds:
+                self._swap_ready()
+                return
+            self._last_poll = now
+            self._channels = self.registry.channels(self.kind)
+            for channel in ("stable", "canary"):
+                version = self._channels.get(channel)
+                if version is None:
+                    self._active.pop(channel, None)
+                else:
+                    self._loader(version)
+            wanted = {self._channels.get("stable"), self._channels.get("canary")}
+            wanted |= {version for version, _ in self._active.values()}
+            for version in [v for v in self._loaders if v not in wanted]:
+                del self._loaders[version]
+            self._swap_ready()
+
+    def _swap_ready(self):
+        for channel in ("stable", "canary"):
+            version = self._channels.get(channel)
+            if version is None or self._active.get(channel, (None,))[0] == version:
+                continue
+            loader = self._loaders.get(version)
+            if loader is not None and loader.ready:
+                # Satu assignment: request yang sedang berjalan tetap memegang model lama
+                self._active[channel] = (version, loader.value)
+                self.swaps += 1
+
+    def select(self, session_key=None):
+        """Model untuk satu sesi: canary untuk sebagian sesi (deterministik per kunci), selain itu stable."""
+        self.refresh()
+        with self._lock:
+            canary = self._active.get("canary")
+            fraction = self._channels.get("canary_fraction", 0.0)
+            if canary is not None and session_key is not None:
+                if zlib.crc32(str(session_key).encode("utf-8")) % 10_000 < fraction * 10_000:
+                    return canary[1]
+            stable = self._active.get("stable")
+            return stable[1] if stable else None
+
+    def active_versions(self):
+        with self._lock:
+            return {channel: version for channel, (version, _) in self._active.items()}
+
+    def _stable_loader(self):
+        version = self._channels.get("stable")
+        return self._loaders.get(version) if version else None
+
+    @property
+    def value(self):
+        return self.select()
+
+    @property
+    def state(self):
+        self.refresh()
+        if "stable" in self._active:
+            return READY
+        loader = self._stable_loader()
+        return loader.state if loader is not None else FAILED
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    @property
+    def done(self):
+        return self.state in (READY, FAILED)
+
+    @property
+    def error(self):
+        loader = self._stable_loader()
+        if loader is None:
+            return LookupError(f"Registry belum punya versi stable untuk {self.kind}")
+        return loader.error
+
+    @property
+    def load_seconds(self):
+        loader = self._stable_loader()
+        return loader.load_seconds if loader is not None else None
+
+    def elapsed(self):
+        loader = self._stable_loader()
+        return loader.elapsed() if loader is not None else 0.0
+
+    def wait(self, timeout=None):
+        loader = self._stable_loader()
+        if loader is not None and loader.state == LOADING:
+            loader.wait(timeout)
+        return self.value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registry model berversi JALU")
+    parser.add_argument("--root", default=os.environ.get("JALU_MODEL_REGISTRY", "model_registry"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_publish = sub.add_parser("publish", help="Simpan artefak sebagai versi baru")
+    p_publish.add_argument("kind", choices=KINDS)
+    p_publish.add_argument("files", nargs="+", help="File artefak; file pertama dimuat kecuali --entry")
+    p_publish.add_argument("--version", default=None)
+    p_publish.add_argument("--entry", default=None)
+    p_publish.add_argument("--notes", default="")
+    p_publish.add_argument("--promote", action="store_true", help="Langsung jadikan stable")
+
+    p_promote = sub.add_parser("promote", help="Jadikan versi stable")
+    p_promote.add_argument("kind", choices=KINDS)
+    p_promote.add_argument("version")
+
+    p_canary = sub.add_parser("canary", help="Arahkan sebagian sesi ke versi canary")
+    p_canary.add_argument("kind", choices=KINDS)
+    p_canary.add_argument("version")
+    p_canary.add_argument("--fraction", type=float, default=0.1)
+
+    p_rollback = sub.add_parser("rollback", help="Hapus canary, atau kembali ke stable sebelumnya")
+    p_rollback.add_argument("kind", choices=KINDS)
+
+    p_verify = sub.add_parser("verify", help="Cek checksum satu versi")
+    p_verify.add_argument("kind", choices=KINDS)
+    p_verify.add_argument("version")
+
+    sub.add_parser("list", help="Tampilkan versi dan kanal")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == "publish":
+            version = registry.publish(args.kind, args.files, version=args.version, entry=args.entry, notes=args.notes)
+            print(f"Versi {args.kind}/{version} disimpan")
+            if args.promote:
+                print(registry.promote(args.kind, version))
+        elif args.command == "promote":
+            print(registry.promote(args.kind, args.version))
+        elif args.command == "canary":
+            print(registry.set_canary(args.kind, args.version, args.fraction))
+        elif args.command == "rollback":
+            print(registry.rollback(args.kind))
+        elif args.command == "verify":
+            print(registry.verify(args.kind, args.version))
+        elif args.command == "list":
+            for kind in KINDS:
+                channels = registry.channels(kind)
+                for version in registry.versions(kind):
+                    tags = [name for name in ("stable", "canary", "previous") if channels.get(name) == version]
+                    print(f"{kind}/{version}" + (f"  [{', '.join(tags)}]" if tags else ""))
+    except (LookupError, ValueError, FileExistsError) as e:
+        print(f"Gagal: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
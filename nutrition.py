@@ -0,0 +1,110 @@
+# =============================================================================
+# JALU - Agregasi nutrisi tervektorisasi
+# Tabel nutrisi diubah sekali menjadi matriks (id kelas x nutrien), sehingga
+# total nutrisi satu gambar atau satu batch cukup satu perkalian matriks.
+# =============================================================================
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+NUTRIENT_COLUMNS = ["Protein", "Carbs", "Fat", "Calories"]
+
+# Porsi standar dianggap menempati ~10% luas gambar (untuk pembobotan luas kotak)
+REFERENCE_AREA_FRACTION = 0.10
+
+WEIGHTING_MODES = (None, "confidence", "area")
+
+
+def default_nutrition_table():
+    """Tabel nutrisi bawaan (data mock) yang dipakai app dan CLI jika CSV tidak ada."""
+    data = {
+        "FoodType": ["Banana", "Apple", "Orange", "Broccoli", "Carrot", "Sandwich", "Pizza", "Cake", "Bowl", "Milk"],
+        "Quantity": ["1 medium", "1 medium", "1 medium", "100g", "100g", "1 serving", "1 slice", "1 slice", "1 bowl", "1 bottle"],
+        "Protein": [1.3, 0.5, 1.2, 2.8, 0.9, 12.0, 11.0, 3.0, 5.0, 8.0],
+        "Carbs": [27.0, 25.0, 15.0, 7.0, 10.0, 30.0, 36.0, 50.0, 20.0, 12.0],
+        "Fat": [0.3, 0.3, 0.2, 0.4, 0.2, 10.0, 12.0, 15.0, 2.0, 5.0],
+        "Calories": [105, 95, 62, 34, 41, 250, 285, 350, 150, 120]
+    }
+    return pd.DataFrame(data)
+
+
+class NutrientMatrix:
+    """Indeks id kelas YOLO -> nilai nutrien; kelas non-makanan bernilai nol dan ditandai `is_food=False`."""
+
+    def __init__(self, values, food_names, labels):
+        self.values = values
+        self.food_names = food_names
+        self.labels = labels
+        self.is_food = np.array([name is not None for name in food_names], dtype=bool)
+
+    @property
+    def num_classes(self):
+        return len(self.food_names)
+
+    def select_food(self, detections):
+        """Buang kotak non-makanan sebelum digambar atau dijumlahkan."""
+        return detections.subset(self.is_food[detections.classes])
+
+
+def table_fingerprint(nutrition_data):
+    """Hash isi tabel nutrisi; berubah jika ada baris/nilai yang berubah."""
+    hashed = pd.util.hash_pandas_object(nutrition_data, index=False).to_numpy()
+    digest = hashlib.sha256(hashed.tobytes())
+    digest.update(",".join(nutrition_data.columns).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def build_nutrient_matrix(nutrition_data, class_names):
+    """Petakan `class_names` ({id: nama}) ke baris tabel nutrisi berdasarkan nama (case-insensitive)."""
+    rows = {name.lower(): i for i, name in enumerate(nutrition_data["FoodType"])}
+    table = nutrition_data[NUTRIENT_COLUMNS].to_numpy(dtype=np.float64)
+
+    num_classes = max(class_names) + 1 if class_names else 0
+    values = np.zeros((num_classes, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+    food_names = [None] * num_classes
+    labels = ["object"] * num_classes
+    for cls_id, name in class_names.items():
+        labels[cls_id] = str(name)
+        row = rows.get(str(name).lower())
+        if row is not None:
+            values[cls_id] = table[row]
+            food_names[cls_id] = nutrition_data["FoodType"].iat[row]
+    return NutrientMatrix(values, food_names, labels)
+
+
+def portion_weights(detections, weighting=None):
+    """Bobot porsi per kotak: 1 per item, skor confidence, atau luas kotak relatif porsi standar."""
+    if weighting is None:
+        return np.ones(len(detections), dtype=np.float64)
+    if weighting == "confidence":
+        return detections.scores.astype(np.float64)
+    if weighting == "area":
+        boxes = detections.boxes.astype(np.float64)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        width, height = detections.image_size
+        return areas / (width * height * REFERENCE_AREA_FRACTION)
+    raise ValueError(f"Mode pembobotan tidak dikenal: {weighting}")
+
+
+def aggregate_batch(matrix, detections_list, weighting=None):
+    """Total nutrien untuk banyak gambar sekaligus, hasil berbentuk (jumlah gambar, 4)."""
+    counts = np.zeros((len(detections_list), matrix.num_classes), dtype=np.float64)
+    if detections_list:
+        image_idx = np.concatenate([np.full(len(d), i) for i, d in enumerate(detections_list)]).astype(np.int64)
+        classes = np.concatenate([d.classes for d in detections_list]).astype(np.int64)
+        weights = np.concatenate([portion_weights(d, weighting) for d in detections_list])
+        np.add.at(counts, (image_idx, classes), weights)
+    return counts @ matrix.values
+
+
+def summarize(matrix, detections_list, weighting=None):
+    """Ringkasan per gambar dalam format dict yang dipakai halaman Vision."""
+    totals = aggregate_batch(matrix, detections_list, weighting)
+    summaries = []
+    for row, detections in zip(totals, detections_list):
+        summary = dict(zip(NUTRIENT_COLUMNS, row.tolist()))
+        summary["Items"] = [matrix.food_names[c] for c in detections.classes.tolist() if matrix.is_food[c]]
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,62 @@
+# =============================================================================
+# JALU - Praproses gambar unggahan
+# Foto ponsel (~12 MP) tidak pernah didekode penuh: JPEG dibaca dengan draft
+# (skala DCT 1/2, 1/4, 1/8) yang masih cukup untuk tampilan dan input model, lalu
+# diperkecil sekali ke ukuran tampilan dan ke ukuran input model. Model
+# menerima array kecil itu apa adanya (letterbox tinggal padding), kotak
+# dikembalikan ke koordinat gambar asli untuk cache dan diskalakan ke
+# thumbnail untuk digambar.
+#
+# Konfigurasi lewat environment variable:
+#   JALU_DISPLAY_SIZE   sisi terpanjang thumbnail hasil deteksi (default: 1024)
+# =============================================================================
+
+import io
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+DISPLAY_SIZE = int(os.environ.get("JALU_DISPLAY_SIZE", "1024"))
+
+
+def fit_within(image, size):
+    """Perkecil (tanpa memperbesar) agar sisi terpanjang <= size; gambar yang sudah muat dikembalikan apa adanya."""
+    width, height = image.size
+    scale = size / max(width, height)
+    if scale >= 1.0:
+        return image
+    new_size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+    return image.resize(new_size, Image.BILINEAR, reducing_gap=2.0)
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """Satu unggahan setelah praproses: array input model, thumbnail tampilan, dan ukuran asli."""
+    array: np.ndarray     # RGB uint8, sisi terpanjang <= ukuran input model
+    display: Image.Image  # thumbnail RGB untuk digambar
+    original_size: tuple  # (lebar, tinggi) file asli
+
+    def to_original(self, detections):
+        return detections.rescaled(self.original_size)
+
+    def to_display(self, detections):
+        return detections.rescaled(self.display.size)
+
+
+def prepare_image(data, model_size=640, display_size=DISPLAY_SIZE):
+    """Dekode bytes gambar langsung ke resolusi yang dibutuhkan tampilan dan model."""
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    # Skala DCT terkecil yang sisi terpanjangnya masih >= thumbnail dan input model (hanya JPEG;
+    # format lain didekode penuh lalu diperkecil)
+    scale = max(model_size, display_size) / max(original_size)
+    image.draft("RGB", (int(original_size[0] * scale), int(original_size[1] * scale)))
+    display = fit_within(image.convert("RGB"), display_size)
+    model_image = fit_within(display, model_size)
+    return PreparedImage(
+        array=np.asarray(model_image),
+        display=display,
+        original_size=original_size,
+    )
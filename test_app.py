@@ -208,6 +208,1491 @@ def test_data_loading():
         print(f"❌ Data loading error: {e}")
         return False
 
+def test_detection_cache():
+    """Test LRU eviction, disk tier and hit/miss counters of the detection cache"""
+    print("🗃️ Testing detection cache...")
+
+    try:
+        import tempfile
+        import numpy as np
+        from detection import Detections, DetectionCache
+
+        det = Detections(
+            boxes=np.array([[10, 20, 110, 220]], dtype=np.float32),
+            scores=np.array([0.9], dtype=np.float32),
+            classes=np.array([46], dtype=np.int32),
+            image_size=(640, 480),
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DetectionCache(max_entries=1, disk_dir=tmp)
+            key_a = DetectionCache.make_key(b"image-a", "yolov8n")
+            key_b = DetectionCache.make_key(b"image-b", "yolov8n")
+            if key_a == DetectionCache.make_key(b"image-a", "yolov8s"):
+                print("❌ Cache key ignores model identity")
+                return False
+
+            cache.put(key_a, det)
+            cache.put(key_b, det)  # evicts key_a from memory
+            if len(cache._entries) != 1:
+                print("❌ LRU tier is not bounded")
+                return False
+
+            restored = cache.get(key_a)  # served from disk
+            if restored is None or not np.array_equal(restored.boxes, det.boxes):
+                print("❌ Disk tier did not restore detections")
+                return False
+            if restored.image_size != (640, 480):
+                print("❌ Image size not restored")
+                return False
+
+            cache.get(DetectionCache.make_key(b"image-c", "yolov8n"))
+            stats = cache.stats()
+            if (stats["hits"], stats["disk_hits"], stats["misses"]) != (1, 1, 1):
+                print(f"❌ Unexpected cache stats: {stats}")
+                return False
+
+        print("✅ Detection cache works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Detection cache error: {e}")
+        return False
+
+def test_batch_detection():
+    """Test that batch detection skips cache hits, chunks model calls and keeps input order"""
+    print("📚 Testing batch detection...")
+
+    try:
+        import math
+        import numpy as np
+        from detection import DetectionCache, Detections, detect_batch
+
+        class StubImage:
+            def __init__(self, width):
+                self.array = np.zeros((4, width, 3), dtype=np.uint8)
+
+            def to_original(self, result):
+                return result
+
+        class StubModel:
+            def __init__(self):
+                self.calls = []
+
+            def predict(self, arrays):
+                self.calls.append([a.shape[1] for a in arrays])
+                return [Detections.empty((a.shape[1], a.shape[0])) for a in arrays]
+
+        n, batch_size = 11, 4
+        images = [StubImage(10 + i) for i in range(n)]
+        keys = [DetectionCache.make_key(bytes([i]), "stub") for i in range(n)]
+        cache = DetectionCache(max_entries=64)
+        cached = {1, 6}
+        for i in cached:
+            cache.put(keys[i], Detections.empty((1000 + i, 1)))
+
+        model = StubModel()
+        detections = detect_batch(model, images, keys, cache, batch_size=batch_size)
+        uncached = [10 + i for i in range(n) if i not in cached]
+        if len(model.calls) != math.ceil(len(uncached) / batch_size) or max(map(len, model.calls)) > batch_size:
+            print(f"❌ Unexpected model calls: {model.calls}")
+            return False
+        if sum(model.calls, []) != uncached:
+            print("❌ Cache hits were sent to the model")
+            return False
+        expected = [1000 + i if i in cached else 10 + i for i in range(n)]
+        if [d.image_size[0] for d in detections] != expected:
+            print("❌ Detections were not returned in input order")
+            return False
+
+        detect_batch(model, images, keys, cache, batch_size=batch_size)
+        if len(model.calls) != math.ceil(len(uncached) / batch_size):
+            print("❌ Second pass should be served entirely from the cache")
+            return False
+
+        print("✅ Batch detection works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Batch detection error: {e}")
+        return False
+
+def test_inference_backend():
+    """Test letterbox geometry, class-aware NMS, ONNX postprocessing and the parity report"""
+    print("🧠 Testing inference backend helpers...")
+
+    try:
+        import numpy as np
+        from detection import Detections
+        from inference_backend import OnnxBackend, letterbox, non_max_suppression, parity_check
+
+        image = np.full((200, 300, 3), 200, dtype=np.uint8)
+        canvas, scale, (left, top) = letterbox(image, 640)
+        if canvas.shape != (640, 640, 3) or abs(scale - 640 / 300) > 1e-9 or (left, top) != (0, 106):
+            print(f"❌ Unexpected letterbox geometry: {canvas.shape}, {scale}, {(left, top)}")
+            return False
+        if canvas[top - 1, 320, 0] != 114 or canvas[top, 320, 0] != 200 or canvas[top + 427, 320, 0] != 114:
+            print("❌ Letterbox padding is misplaced")
+            return False
+        point = np.array([150.0, 100.0])
+        mapped = point * scale + (left, top)
+        if not np.allclose((mapped - (left, top)) / scale, point) or not np.allclose(mapped, (320, 106 + 640 / 3)):
+            print("❌ Letterbox coordinates do not round-trip")
+            return False
+
+        boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [0, 0, 100, 100], [300, 300, 350, 350]], dtype=np.float32)
+        scores = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+        keep = non_max_suppression(boxes, scores, np.array([0, 0, 1, 0]), iou_threshold=0.5)
+        if keep.tolist() != [0, 2, 3]:
+            print(f"❌ NMS kept {keep.tolist()}, expected same-class overlap suppressed only")
+            return False
+
+        # Postprocess ONNX tanpa sesi: output (4 + kelas, anchor) dalam ruang letterbox
+        backend = object.__new__(OnnxBackend)
+        backend.conf, backend.iou = 0.25, 0.7
+        output = np.zeros((6, 3), dtype=np.float32)
+        output[:4, 0] = [320, 106 + 640 / 3, 64, 64]  # kotak 30x30 di tengah gambar asli
+        output[:4, 1] = [322, 108 + 640 / 3, 64, 64]  # duplikat, ditekan NMS
+        output[4:, 0], output[4:, 1], output[4:, 2] = [0.1, 0.9], [0.1, 0.8], [0.1, 0.1]
+        det = backend._postprocess(output, image.shape, scale, left, top)
+        if len(det) != 1 or det.classes.tolist() != [1] or det.image_size != (300, 200):
+            print("❌ ONNX postprocessing did not filter and suppress detections")
+            return False
+        if not np.allclose(det.boxes[0], [135, 85, 165, 115], atol=0.01):
+            print(f"❌ ONNX boxes not mapped back to the original image: {det.boxes[0]}")
+            return False
+
+        class Fixed:
+            def __init__(self, boxes, scores, classes):
+                self.detections = Detections(
+                    boxes=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                    scores=np.array(scores, dtype=np.float32),
+                    classes=np.array(classes, dtype=np.int32),
+                    image_size=(300, 200),
+                )
+
+            def predict(self, images):
+                return [self.detections for _ in images]
+
+        reference = Fixed([[10, 10, 60, 60], [100, 100, 150, 150]], [0.9, 0.8], [0, 1])
+        close = Fixed([[11, 10, 61, 60], [100, 101, 150, 151]], [0.88, 0.82], [0, 1])
+        shifted = Fixed([[40, 40, 90, 90], [100, 100, 150, 150]], [0.9, 0.8], [0, 1])
+        rescored = Fixed([[10, 10, 60, 60], [100, 100, 150, 150]], [0.6, 0.8], [0, 1])
+        relabelled = Fixed([[10, 10, 60, 60], [100, 100, 150, 150]], [0.9, 0.8], [0, 2])
+        images = [image, image]
+        if not parity_check(reference, close, images)["passed"]:
+            print("❌ Parity check rejected detections within tolerance")
+            return False
+        for name, candidate in [("shifted boxes", shifted), ("score drift", rescored), ("class change", relabelled)]:
+            report = parity_check(reference, candidate, images)
+            if report["passed"]:
+                print(f"❌ Parity check passed despite {name}: {report}")
+                return False
+        if parity_check(reference, shifted, images)["matched"] != 2:
+            print("❌ Parity report miscounted matched boxes")
+            return False
+
+        print("✅ Inference backend helpers work correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Inference backend error: {e}")
+        return False
+
+def test_nutrient_aggregation():
+    """Test vectorized nutrient aggregation against a per-label table scan"""
+    print("🥗 Testing nutrient aggregation...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from detection import Detections
+        from nutrition import build_nutrient_matrix, aggregate_batch, summarize
+
+        nutrition_data = pd.DataFrame({
+            "FoodType": ["Banana", "Apple", "Pizza"],
+            "Protein": [1.3, 0.5, 11.0],
+            "Carbs": [27.0, 25.0, 36.0],
+            "Fat": [0.3, 0.3, 12.0],
+            "Calories": [105, 95, 285]
+        })
+        class_names = {0: "person", 1: "banana", 2: "apple", 3: "pizza"}
+        matrix = build_nutrient_matrix(nutrition_data, class_names)
+
+        def make(classes, boxes=None):
+            classes = np.array(classes, dtype=np.int32)
+            if boxes is None:
+                boxes = np.tile([0, 0, 64, 48], (len(classes), 1))
+            return Detections(
+                boxes=np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+                scores=np.full(len(classes), 0.5, dtype=np.float32),
+                classes=classes,
+                image_size=(640, 480),
+            )
+
+        batch = [make([1, 1, 3, 0]), make([]), make([2])]
+        summaries = summarize(matrix, batch)
+        if abs(summaries[0]["Calories"] - (105 * 2 + 285)) > 1e-9 or summaries[0]["Items"] != ["Banana", "Banana", "Pizza"]:
+            print(f"❌ Wrong single-image summary: {summaries[0]}")
+            return False
+        if summaries[1]["Calories"] != 0 or summaries[2]["Protein"] != 0.5:
+            print("❌ Wrong batch summaries")
+            return False
+
+        halved = aggregate_batch(matrix, batch, weighting="confidence")
+        if not np.allclose(halved, aggregate_batch(matrix, batch) * 0.5):
+            print("❌ Confidence weighting is not applied")
+            return False
+
+        # Satu kotak seluas 10% gambar = satu porsi standar
+        full_portion = make([2], boxes=[[0, 0, 64, 480]])
+        if not np.allclose(aggregate_batch(matrix, [full_portion], weighting="area"), aggregate_batch(matrix, [full_portion])):
+            print("❌ Area weighting does not match reference portion")
+            return False
+
+        print("✅ Nutrient aggregation works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Nutrient aggregation error: {e}")
+        return False
+
+def test_nutrition_index():
+    """Test non-food filtering and table fingerprint of the class-id nutrition index"""
+    print("🗂️ Testing nutrition index...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from detection import Detections
+        from nutrition import build_nutrient_matrix, table_fingerprint
+
+        nutrition_data = pd.DataFrame({
+            "FoodType": ["Banana", "Pizza"],
+            "Protein": [1.3, 11.0],
+            "Carbs": [27.0, 36.0],
+            "Fat": [0.3, 12.0],
+            "Calories": [105, 285]
+        })
+        index = build_nutrient_matrix(nutrition_data, {0: "person", 1: "banana", 2: "pizza"})
+        detections = Detections(
+            boxes=np.zeros((3, 4), dtype=np.float32),
+            scores=np.array([0.9, 0.8, 0.7], dtype=np.float32),
+            classes=np.array([0, 2, 1], dtype=np.int32),
+            image_size=(640, 480),
+        )
+        food = index.select_food(detections)
+        if food.classes.tolist() != [2, 1] or not np.allclose(food.scores, [0.8, 0.7]):
+            print("❌ Non-food boxes were not removed")
+            return False
+        if [index.labels[c] for c in food.classes] != ["pizza", "banana"]:
+            print("❌ Wrong class labels in index")
+            return False
+
+        changed = nutrition_data.copy()
+        changed.loc[0, "Calories"] = 110
+        if table_fingerprint(nutrition_data) == table_fingerprint(changed):
+            print("❌ Fingerprint does not change with table contents")
+            return False
+
+        print("✅ Nutrition index works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Nutrition index error: {e}")
+        return False
+
+def test_mbg_store():
+    """Test that the partitioned Parquet store filters and projects like the in-memory store"""
+    print("🗄️ Testing MBG data store...")
+
+    try:
+        import tempfile
+        import pandas as pd
+        from mbg_store import FrameStore, ParquetStore, write_partitioned
+
+        frame = pd.DataFrame({
+            "Provinsi": ["DKI Jakarta", "Banten", "Banten", "Jawa Barat"],
+            "Jenjang_Pendidikan": ["SD", "SD", "SMP", "SMA"],
+            "Jumlah_Siswa_Penerima": [100, 200, 300, 400],
+            "Tingkat_Kepuasan": [80.0, 85.0, 90.0, 95.0]
+        })
+        filters = {"Provinsi": ["Banten", "Jawa Barat"], "Jenjang_Pendidikan": ["SD", "SMA"]}
+        columns = ["Provinsi", "Jumlah_Siswa_Penerima"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_partitioned(frame, tmp)
+            parquet = ParquetStore(tmp)
+            memory = FrameStore(frame)
+
+            if parquet.dimension_values("Provinsi") != ["Banten", "DKI Jakarta", "Jawa Barat"]:
+                print("❌ Partition values not read from dataset layout")
+                return False
+
+            expected = memory.load(columns, filters).sort_values("Jumlah_Siswa_Penerima").reset_index(drop=True)
+            actual = parquet.load(columns, filters).sort_values("Jumlah_Siswa_Penerima").reset_index(drop=True)
+            if list(actual.columns) != columns or not expected.equals(actual):
+                print("❌ Parquet store result differs from in-memory store")
+                return False
+
+            if len(parquet.load(filters={"Provinsi": []})) != 0:
+                print("❌ Empty selection should return no rows")
+                return False
+
+        print("✅ MBG data store works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ MBG data store error: {e}")
+        return False
+
+def test_mbg_rollup():
+    """Test that rollup totals, group means and correlations match raw-row pandas results"""
+    print("🧮 Testing MBG rollups...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from mbg_store import FrameStore
+        from mbg_rollup import build_rollup, CORRELATION_METRICS
+
+        rng = np.random.default_rng(7)
+        n = 300
+        frame = pd.DataFrame({
+            "Provinsi": rng.choice(["DKI Jakarta", "Banten", "Jawa Barat"], n),
+            "Jenjang_Pendidikan": rng.choice(["SD", "SMP", "SMA"], n),
+            "Jumlah_Siswa_Penerima": rng.integers(50000, 200000, n),
+            "Tingkat_Kepuasan": rng.uniform(70, 95, n),
+            "Penurunan_Stunting": rng.uniform(5, 15, n),
+            "Indeks_Keberhasilan": rng.uniform(75, 98, n),
+            "Anggaran_Terserap": rng.uniform(80, 100, n)
+        })
+        filters = {"Provinsi": ["Banten", "Jawa Barat"], "Jenjang_Pendidikan": ["SD", "SMA"]}
+        subset = frame[frame["Provinsi"].isin(filters["Provinsi"]) & frame["Jenjang_Pendidikan"].isin(filters["Jenjang_Pendidikan"])]
+
+        store = FrameStore(frame)
+        rollup = build_rollup(store)
+        totals = rollup.totals(filters)
+        if totals["sum:Jumlah_Siswa_Penerima"] != subset["Jumlah_Siswa_Penerima"].sum():
+            print("❌ Rollup sum differs from raw rows")
+            return False
+        if not np.isclose(totals["mean:Tingkat_Kepuasan"], subset["Tingkat_Kepuasan"].mean()):
+            print("❌ Rollup mean differs from raw rows")
+            return False
+
+        pie = rollup.group_mean(filters, "Provinsi", "Anggaran_Terserap")
+        expected_pie = subset.groupby("Provinsi")["Anggaran_Terserap"].mean()
+        if not np.allclose(pie.set_index("Provinsi")["Anggaran_Terserap"], expected_pie):
+            print("❌ Rollup group means differ from groupby")
+            return False
+
+        if not np.allclose(rollup.correlation(filters), subset[CORRELATION_METRICS].corr()):
+            print("❌ Rollup correlation differs from DataFrame.corr()")
+            return False
+
+        print("✅ MBG rollups work correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ MBG rollup error: {e}")
+        return False
+
+def test_bitmap_filter():
+    """Test bitmap-index filtering and selection reuse in the in-memory store"""
+    print("🧩 Testing bitmap filters...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from mbg_store import FrameStore
+
+        rng = np.random.default_rng(3)
+        n = 1001  # bukan kelipatan 8, menguji padding bitmap
+        frame = pd.DataFrame({
+            "Provinsi": rng.choice(["DKI Jakarta", "Banten", "Jawa Barat"], n),
+            "Jenjang_Pendidikan": rng.choice(["SD", "SMP", "SMA"], n),
+            "Tingkat_Kepuasan": rng.uniform(70, 95, n)
+        })
+        store = FrameStore(frame)
+        filters = {"Provinsi": ["Banten", "Jawa Barat"], "Jenjang_Pendidikan": ["SMP"]}
+        expected = np.flatnonzero(
+            (frame["Provinsi"].isin(filters["Provinsi"]) & frame["Jenjang_Pendidikan"].isin(filters["Jenjang_Pendidikan"])).to_numpy()
+        )
+
+        rows = store.select_rows(filters)
+        if not np.array_equal(rows, expected):
+            print("❌ Bitmap selection differs from isin mask")
+            return False
+        if store.select_rows(dict(filters)) is not rows:
+            print("❌ Selection is not reused for unchanged filters")
+            return False
+        if len(store.select_rows({"Provinsi": []})) != 0:
+            print("❌ Empty selection should match no rows")
+            return False
+
+        print("✅ Bitmap filters work correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Bitmap filter error: {e}")
+        return False
+
+def test_chart_downsampling():
+    """Test LTTB and scatter binning keep charts within the point budget"""
+    print("📉 Testing chart downsampling...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        import dashboard_charts as charts
+
+        x = np.arange(1000)
+        y = np.sin(x / 50.0)
+        keep = charts.lttb(x, y, 100)
+        if len(keep) != 100 or keep[0] != 0 or keep[-1] != 999 or not np.all(np.diff(keep) > 0):
+            print("❌ LTTB did not return ordered indices with both endpoints")
+            return False
+        if y[keep].max() < 0.99 or y[keep].min() > -0.99:
+            print("❌ LTTB dropped the series peaks")
+            return False
+
+        rng = np.random.default_rng(5)
+        n = 20000
+        frame = pd.DataFrame({
+            "Provinsi": rng.choice(["DKI Jakarta", "Banten"], n),
+            "Jenjang_Pendidikan": rng.choice(["SD", "SMP"], n),
+            "Jumlah_Siswa_Penerima": rng.integers(50000, 200000, n),
+            "Tingkat_Kepuasan": rng.uniform(70, 95, n),
+            "Indeks_Keberhasilan": rng.uniform(75, 98, n)
+        })
+        scatter = charts.scatter_figure(frame, max_points=500)
+        if sum(len(trace.x) for trace in scatter.data) > 500:
+            print("❌ Scatter exceeds the point budget")
+            return False
+        line = charts.line_figure(frame, max_points=500)
+        if sum(len(trace.x) for trace in line.data) > 500:
+            print("❌ Line chart exceeds the point budget")
+            return False
+
+        # Multiselect dikosongkan: semua chart tetap terbentuk tanpa trace data
+        empty = frame.iloc[0:0]
+        if len(charts.box_figure(charts.box_quartiles(empty)).data) != 0:
+            print("❌ Box plot of an empty selection should have no traces")
+            return False
+        charts.bar_figure(empty)
+        charts.scatter_figure(empty, max_points=500)
+        charts.line_figure(empty, max_points=500)
+
+        print("✅ Chart downsampling works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Chart downsampling error: {e}")
+        return False
+
+def test_table_paging():
+    """Test server-side paging with sorting against a fully materialized sort"""
+    print("📋 Testing table paging...")
+
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from mbg_store import FrameStore, ParquetStore, write_partitioned
+
+        rng = np.random.default_rng(11)
+        n = 500
+        frame = pd.DataFrame({
+            "Provinsi": rng.choice(["DKI Jakarta", "Banten", "Jawa Barat"], n),
+            "Jenjang_Pendidikan": rng.choice(["SD", "SMP", "SMA"], n),
+            "Kabupaten_Kota": rng.choice(["Kota A", "Kab. B"], n),
+            "Tingkat_Kepuasan": rng.uniform(70, 95, n),
+            "Skor": rng.integers(0, 3, n),
+            "Id": np.arange(n)
+        })
+        filters = {"Provinsi": ["Banten", "Jawa Barat"]}
+        subset = frame[frame["Provinsi"].isin(filters["Provinsi"])]
+        # Filter kolom non-partisi dievaluasi di dalam scan, bukan lewat pemangkasan direktori
+        mixed = {"Jenjang_Pendidikan": ["SD", "SMA"], "Kabupaten_Kota": ["Kota A"]}
+        mixed_subset = frame[frame["Jenjang_Pendidikan"].isin(mixed["Jenjang_Pendidikan"]) & (frame["Kabupaten_Kota"] == "Kota A")]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_partitioned(frame, tmp)
+            for store in (FrameStore(frame), ParquetStore(tmp)):
+                if store.count_rows(filters) != len(subset):
+                    print("❌ Row count differs from filter result")
+                    return False
+                for ascending in (True, False):
+                    page = store.fetch_page(filters, offset=40, limit=20, sort_by="Tingkat_Kepuasan", ascending=ascending)
+                    expected = subset["Tingkat_Kepuasan"].sort_values(ascending=ascending).iloc[40:60].to_numpy()
+                    if not np.allclose(page["Tingkat_Kepuasan"].to_numpy(), expected):
+                        print(f"❌ Sorted page differs ({type(store).__name__}, ascending={ascending})")
+                        return False
+                page = store.fetch_page(mixed, offset=10, limit=15, sort_by="Tingkat_Kepuasan", ascending=False)
+                expected = mixed_subset.sort_values("Tingkat_Kepuasan", ascending=False).iloc[10:25]
+                if not (np.allclose(page["Tingkat_Kepuasan"], expected["Tingkat_Kepuasan"])
+                        and list(page["Provinsi"]) == list(expected["Provinsi"])):
+                    print(f"❌ Sorted page with a row-level filter differs ({type(store).__name__})")
+                    return False
+                unsorted = store.fetch_page(filters, offset=len(subset) - 5, limit=20)
+                if len(unsorted) != 5 or not set(unsorted["Provinsi"]) <= set(filters["Provinsi"]):
+                    print(f"❌ Last page is wrong ({type(store).__name__})")
+                    return False
+                # Urutan disimpan per (filter, kolom, arah): halaman lain tidak memindai ulang dataset
+                cached = len(store._sort_cache)
+                store.fetch_page(filters, offset=0, limit=20, sort_by="Tingkat_Kepuasan", ascending=True)
+                if cached != 3 or len(store._sort_cache) != 3:
+                    print(f"❌ Sorted order was not reused across pages ({type(store).__name__})")
+                    return False
+                # Kunci yang banyak kembar: gabungan semua halaman memuat tiap baris tepat sekali
+                for ascending in (True, False):
+                    ids = np.concatenate([
+                        store.fetch_page(filters, offset=offset, limit=7, sort_by="Skor", ascending=ascending)["Id"].to_numpy()
+                        for offset in range(0, len(subset), 7)
+                    ])
+                    if sorted(ids) != sorted(subset["Id"]):
+                        print(f"❌ Pages over tied keys overlap or skip rows ({type(store).__name__})")
+                        return False
+
+        print("✅ Table paging works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Table paging error: {e}")
+        return False
+
+def test_background_loader():
+    """Test that the model loader runs in the background and reports its state"""
+    print("⏳ Testing background model loader...")
+
+    try:
+        import threading
+        from model_loader import BackgroundLoader
+
+        release = threading.Event()
+        warmed = []
+
+        def factory():
+            release.wait(5)
+            return "model"
+
+        loader = BackgroundLoader(factory, warmup=warmed.append).start()
+        if loader.state != "loading" or loader.ready:
+            print("❌ Loader should still be loading")
+            return False
+        release.set()
+        if loader.wait(5) != "model" or not loader.ready or warmed != ["model"]:
+            print("❌ Loader did not finish with a warmed model")
+            return False
+
+        def broken():
+            raise FileNotFoundError("missing")
+
+        failed = BackgroundLoader(broken).start()
+        if failed.wait(5) is not None or failed.state != "failed" or not isinstance(failed.error, FileNotFoundError):
+            print("❌ Loader failure was not reported")
+            return False
+
+        print("✅ Background loader works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Background loader error: {e}")
+        return False
+
+def test_inference_server():
+    """Test that the shared inference server coalesces requests from several clients"""
+    print("🛰️ Testing shared inference server...")
+
+    try:
+        import os
+        import tempfile
+        import threading
+        import time
+        import numpy as np
+        from detection import Detections
+        from inference_server import InferenceServer, RemoteBackend
+
+        class FakeBackend:
+            kind = "fake"
+            identity = "fake:model:1"
+            names = {0: "apple"}
+
+            def __init__(self):
+                self.batch_sizes = []
+
+            def predict(self, images):
+                self.batch_sizes.append(len(images))
+                return [
+                    Detections(
+                        boxes=np.array([[0, 0, image.shape[1], image.shape[0]]], dtype=np.float32),
+                        scores=np.array([0.9], dtype=np.float32),
+                        classes=np.array([0], dtype=np.int32),
+                        image_size=(image.shape[1], image.shape[0])
+                    )
+                    for image in images
+                ]
+
+        backend = FakeBackend()
+        with tempfile.TemporaryDirectory() as tmp:
+            address = os.path.join(tmp, "inference.sock")
+            server = InferenceServer(backend, address, authkey=b"test", max_batch=8, max_wait=0.05).start()
+            try:
+                clients = [RemoteBackend(address, authkey=b"test") for _ in range(3)]
+                futures = [
+                    client.submit([np.zeros((10 + i, 20, 3), dtype=np.uint8)])
+                    for i, client in enumerate(clients)
+                ]
+                results = [future.result(timeout=10) for future in futures]
+                for client in clients:
+                    client.close()
+            finally:
+                server.close()
+
+        if clients[0].identity != backend.identity or clients[0].names != backend.names:
+            print("❌ Client does not expose the server model identity")
+            return False
+        if [r[0].image_size for r in results] != [(20, 10), (20, 11), (20, 12)]:
+            print("❌ Results were routed to the wrong request")
+            return False
+        if max(backend.batch_sizes) < 2:
+            print("❌ Requests were not coalesced into a micro-batch")
+            return False
+
+        image = np.zeros((8, 8, 3), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp:
+            address = os.path.join(tmp, "inference.sock")
+            server = InferenceServer(backend, address, authkey=b"test").start()
+            client = RemoteBackend(address, authkey=b"test", timeout=0.2)
+            try:
+                client.predict([image])
+                # Server restart: klien yang di-cache harus menyambung ulang sendiri
+                server.close()
+                time.sleep(0.2)
+                server = InferenceServer(backend, address, authkey=b"test").start()
+                if len(client.predict([image])) != 1:
+                    print("❌ Client did not reconnect after a server restart")
+                    return False
+
+                slow = threading.Event()
+                backend.predict, fast_predict = (lambda images: slow.wait(5) and fast_predict(images)), backend.predict
+                try:
+                    client.predict([image])
+                    print("❌ Slow prediction did not time out")
+                    return False
+                except TimeoutError:
+                    pass
+                finally:
+                    slow.set()
+                if client._futures:
+                    print("❌ Timed-out request was left in the pending table")
+                    return False
+            finally:
+                client.close()
+                server.close()
+
+            # Tanpa kunci eksplisit: TCP non-loopback ditolak, loopback memakai rahasia acak 0600
+            saved_key = os.environ.pop("JALU_INFERENCE_AUTHKEY", None)
+            os.environ["JALU_INFERENCE_KEYFILE"] = os.path.join(tmp, "keys", "inference.key")
+            try:
+                try:
+                    InferenceServer(backend, "0.0.0.0:7071")
+                    print("❌ Server accepted a public address without an explicit key")
+                    return False
+                except ValueError:
+                    pass
+                first = InferenceServer(backend, "127.0.0.1:7071").authkey
+                second = InferenceServer(backend, "127.0.0.1:7071").authkey
+                mode = os.stat(os.environ["JALU_INFERENCE_KEYFILE"]).st_mode & 0o777
+                if first != second or len(first) < 32 or first == b"jalu-inference" or mode != 0o600:
+                    print("❌ Generated key is not a private, stable random secret")
+                    return False
+            finally:
+                os.environ.pop("JALU_INFERENCE_KEYFILE")
+                if saved_key is not None:
+                    os.environ["JALU_INFERENCE_AUTHKEY"] = saved_key
+
+        print("✅ Shared inference server works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Inference server error: {e}")
+        return False
+
+def test_detection_jobs():
+    """Test background detection jobs: progress, results and cancellation"""
+    print("🧵 Testing detection jobs...")
+
+    try:
+        import threading
+        from detection_jobs import JobManager
+
+        manager = JobManager(max_workers=1)
+        gate = threading.Event()
+
+        def slow_task(job):
+            for _ in range(job.total):
+                gate.wait(5)
+                job.advance(1)
+            return "hasil"
+
+        running = manager.submit(slow_task, key="a", total=3)
+        queued = manager.submit(slow_task, key="b", total=3)
+        manager.cancel(queued.id)
+        if queued.status != "cancelled":
+            print("❌ Queued job was not cancelled immediately")
+            return False
+
+        gate.set()
+        running.wait(5)
+        if running.status != "done" or running.result != "hasil" or running.progress != 1.0:
+            print("❌ Job did not complete with its result")
+            return False
+        if manager.get(running.id) is not running:
+            print("❌ Job could not be looked up by id")
+            return False
+
+        gate.clear()
+        interrupted = manager.submit(slow_task, total=3)
+        interrupted.cancel()
+        gate.set()
+        interrupted.wait(5)
+        if interrupted.status != "cancelled" or interrupted.completed > 1:
+            print("❌ Running job did not stop at the next checkpoint")
+            return False
+
+        print("✅ Detection jobs work correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Detection jobs error: {e}")
+        return False
+
+def test_image_preprocessing():
+    """Test reduced-size decoding and box rescaling between model, original and display sizes"""
+    print("🖼️ Testing image preprocessing...")
+
+    try:
+        import io
+        import numpy as np
+        from detection import Detections
+        from preprocess import prepare_image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (4000, 3000), color=(200, 120, 40)).save(buffer, format="JPEG")
+        prepared = prepare_image(buffer.getvalue(), model_size=640, display_size=1024)
+
+        if prepared.original_size != (4000, 3000) or max(prepared.array.shape[:2]) != 640:
+            print("❌ Model input was not downscaled to the model size")
+            return False
+        # Draft 1/4 (1000 px) lebih kecil dari thumbnail; decode harus berhenti di 1/2
+        if max(prepared.display.size) != 1024 or prepared.array.dtype != np.uint8:
+            print(f"❌ Display thumbnail should be exactly 1024 px, got {prepared.display.size}")
+            return False
+
+        height, width = prepared.array.shape[:2]
+        model_space = Detections(
+            boxes=np.array([[0, 0, width / 2, height / 2]], dtype=np.float32),
+            scores=np.array([0.8], dtype=np.float32),
+            classes=np.array([1], dtype=np.int32),
+            image_size=(width, height)
+        )
+        original = prepared.to_original(model_space)
+        display = prepared.to_display(original)
+        if not np.allclose(original.boxes, [[0, 0, 2000, 1500]], atol=1):
+            print("❌ Boxes were not rescaled to the original image")
+            return False
+        if display.image_size != prepared.display.size or not np.allclose(display.boxes[0, 2:], np.array(prepared.display.size) / 2, atol=1):
+            print("❌ Boxes were not rescaled to the display thumbnail")
+            return False
+
+        print("✅ Image preprocessing works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Image preprocessing error: {e}")
+        return False
+
+def test_box_rendering():
+    """Test vectorized box outlines, confidence filtering and single-pass rendering"""
+    print("🟥 Testing box rendering...")
+
+    try:
+        import numpy as np
+        from detection import Detections, outline_mask, render_detections
+
+        mask = outline_mask(np.array([[10, 10, 20, 20]]), (40, 30), width=2)
+        if not (mask[10, 10:21].all() and mask[15, 10:12].all() and not mask[15, 12:19].any() and mask.sum() == 72):
+            print("❌ Outline mask is wrong")
+            return False
+
+        detections = Detections(
+            boxes=np.array([[5, 15, 25, 28], [30, 12, 38, 20]], dtype=np.float32),
+            scores=np.array([0.9, 0.3], dtype=np.float32),
+            classes=np.array([0, 1], dtype=np.int32),
+            image_size=(40, 30)
+        )
+        image, names = render_detections(Image.new("RGB", (40, 30)), detections, ["apple", "cake"], min_score=0.5)
+        pixels = np.asarray(image)
+        if names != ["apple"] or tuple(pixels[28, 10]) != (255, 0, 0) or pixels[16:20, 31:37].any():
+            print("❌ Low-confidence box was drawn or kept")
+            return False
+
+        print("✅ Box rendering works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Box rendering error: {e}")
+        return False
+
+def test_video_tracking():
+    """Test that tracked items are counted once per tray and trays split on gaps"""
+    print("🎞️ Testing video tracking...")
+
+    try:
+        import numpy as np
+        import pandas as pd
+        from detection import Detections
+        from nutrition import build_nutrient_matrix
+        from video_stream import FrameSkipper, StreamAnalyzer
+
+        nutrition_data = pd.DataFrame({
+            "FoodType": ["Apple", "Pizza"],
+            "Protein": [0.5, 11.0],
+            "Carbs": [25.0, 36.0],
+            "Fat": [0.3, 12.0],
+            "Calories": [95, 285]
+        })
+        matrix = build_nutrient_matrix(nutrition_data, {0: "apple", 1: "pizza", 2: "person"})
+
+        class ScriptedModel:
+            """Frame berisi daftar (x, kelas); kotak bergeser sedikit antar frame."""
+            def predict(self, frames):
+                items = frames[0]
+                return [Detections(
+                    boxes=np.array([[x, 10, x + 40, 50] for x, _ in items], dtype=np.float32).reshape(-1, 4),
+                    scores=np.full(len(items), 0.9, dtype=np.float32),
+                    classes=np.array([c for _, c in items], dtype=np.int32),
+                    image_size=(320, 240)
+                )]
+
+        tray_one = [[(10 + i, 0), (100 + i, 1), (200, 2)] for i in range(6)]
+        tray_two = [[(50 + 2 * i, 1)] for i in range(6)]
+        script = tray_one + [[]] * 5 + tray_two
+        frames = [(i, i / 5.0, items) for i, items in enumerate(script)]
+
+        analyzer = StreamAnalyzer(ScriptedModel(), matrix, gap_seconds=0.6)
+        trays = list(analyzer.process(frames))
+        if len(trays) != 2:
+            print(f"❌ Expected 2 trays, got {len(trays)}")
+            return False
+        if sorted(trays[0]["Items"]) != ["Apple", "Pizza"] or trays[0]["Calories"] != 380:
+            print("❌ Items in the first tray were not counted exactly once")
+            return False
+        if trays[1]["Items"] != ["Pizza"] or analyzer.stats["frames_processed"] != len(frames):
+            print("❌ Second tray or frame stats are wrong")
+            return False
+
+        capped = StreamAnalyzer(ScriptedModel(), matrix, gap_seconds=0.6, max_seconds=1.0)
+        if len(list(capped.process(frames))) != 1 or capped.stats["frames_processed"] != 5:
+            print("❌ max_seconds did not stop the stream")
+            return False
+
+        skipper = FrameSkipper(source_fps=30, speed=1.0, max_stride=8)
+        skipper.record(0.1)
+        if skipper.stride != 3:
+            print("❌ Frame skipping did not adapt to processing time")
+            return False
+
+        print("✅ Video tracking works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Video tracking error: {e}")
+        return False
+
+def test_training_pipeline():
+    """Test chunked loading, learned encodings and metrics of the training pipeline"""
+    print("🏋️ Testing training pipeline...")
+
+    try:
+        import os
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from train_model import encode, load_training_data, train
+
+        rng = np.random.default_rng(5)
+        n = 120
+        frame = pd.DataFrame({
+            "FoodType": rng.choice(["Rice", "Egg", "Tempe"], n),
+            "Quantity": 100,
+            "Protein": rng.uniform(0, 30, n).round(1),
+            "Carbs": rng.uniform(0, 80, n).round(1),
+            "Fat": rng.uniform(0, 20, n).round(1)
+        })
+        frame["Calories"] = 4 * frame["Protein"] + 4 * frame["Carbs"] + 9 * frame["Fat"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "nutrition.csv")
+            frame.to_csv(path, index=False)
+            loaded = load_training_data(path, chunksize=25)
+
+        if len(loaded) != n or loaded["Protein"].dtype != np.float32:
+            print("❌ Chunked loading lost rows or dtypes")
+            return False
+
+        model, encodings, metrics = train(loaded, n_estimators=20, n_jobs=2, seed=1)
+        if encodings["FoodType"] != ["Egg", "Rice", "Tempe"]:
+            print("❌ Category encodings were not learned from the data")
+            return False
+        unknown = encode(pd.DataFrame({"FoodType": ["Sate"], "Quantity": [100], "Protein": [1], "Carbs": [1], "Fat": [1]}), encodings)
+        if unknown["FoodType"].iloc[0] != -1:
+            print("❌ Unknown categories should encode to -1")
+            return False
+        if not (metrics["mae"] < 60 and metrics["train_seconds"] > 0 and metrics["rows"] == n):
+            print(f"❌ Unexpected training metrics: {metrics}")
+            return False
+
+        print("✅ Training pipeline works correctly")
+        return True
+
+    except Exception as e:
+        print(f"❌ Training pipeline error: {e}")
+        return False
+
+def test_calorie_model():
+    """Test compact forest export, mmap loading and batched calorie filling"""
+    print("🔥 Testing calorie model...")
+
+    try:
+        import os
+        import tempfile
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from calorie_model import CompactForest, export_compact, fill_missing_calories, load_calorie_model
+        from train_model import FEATURES, encode, train
+
+        rng = np.random.default_rng(7)
+        n = 150
+        frame = pd.DataFrame({
+            "FoodType": rng.choice(["Rice", "Egg", "Tempe"], n),
+            "Quantity": 100.0,
+            "Protein": rng.uniform(0, 30, n).round(1),
+            "Carbs": rng.uniform(0, 80, n).round(1),
+            "Fat": rng.uniform(0, 20, n).round(1)
+        })
+        frame["Calories"] = 4 * frame["Protein"] + 4 * frame["Carbs"] + 9 * frame["Fat"]
+        model, encodings, _ = train(frame, n_estimators=15, n_jobs=1, seed=3)
+
+        table = pd.DataFrame({
+            "FoodType": ["Rice", "Egg", "Sate"],
+            "Quantity": ["100g", "100", "1 tusuk"],
+            "Protein": [2.7, 13.0, 20.0],
+            "Carbs": [79.0, 1.1, 5.0],
+            "Fat": [0.3, 11.0, 10.0],
+            "Calories": [130.0, None, None]
+        })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pkl_path = os.path.join(tmp, "food_nutrition_model.pkl")
+            joblib.dump(model, pkl_path)
+            joblib.dump(FEATURES, os.path.join(tmp, "food_feature_columns.pkl"))
+            joblib.dump(encodings, os.path.join(tmp, "food_category_encodings.pkl"))
+            pickled = load_calorie_model(pkl_path)
+
+            export_compact(model, os.path.join(tmp, "food_nutrition_model.npy"), FEATURES, encodings)
+            compact = load_calorie_model(pkl_path)
+            if not isinstance(compact.model, CompactForest) or not isinstance(compact.model.nodes, np.memmap):
+                print("❌ Compact model should be preferred and memory-mapped")
+                return False
+
+            X = encode(frame, encodings)
+            if not np.allclose(compact.model.predict(X.to_numpy()), model.predict(X)):
+                print("❌ Compact forest predictions differ from scikit-learn")
+                return False
+
+            filled = fill_missing_calories(table, compact)
+            expected = pickled.predict(table.iloc[1:])
+
+            # Baris latih dengan Quantity/numerik kosong: encoding latih dan prediksi harus identik
+            sparse = frame.assign(Quantity=np.where(np.arange(n) % 3 == 0, np.nan, 100.0),
+                                  Fat=frame["Fat"].mask(np.arange(n) % 5 == 0))
+            sparse_model, sparse_encodings, _ = train(sparse, n_estimators=10, n_jobs=1, seed=3)
+            X_train = encode(sparse, sparse_encodings)
+            export_compact(sparse_model, os.path.join(tmp, "sparse.npy"), FEATURES, sparse_encodings)
+            served = load_calorie_model(os.path.join(tmp, "sparse.npy"))
+            if X_train.isna().any().any() or not X_train.equals(served.encode(sparse)):
+                print("❌ Training and serving encode features differently")
+                return False
+            if not np.allclose(served.predict(sparse), sparse_model.predict(X_train)):
+                print("❌ Served predictions drift from the trained model on rows with missing values")
+                return False
+
+        if filled["Calories"].isna().any() or filled["Calories"].iloc[0] != 130.0:
+            print("❌ Only missing calories should be filled")
+            return False
+        if not np.allclose(filled["Calories"].iloc[1:], expected):
+            print("❌ Compact and pickled models disagree on filled calories")
+            return False
+        stats = compact.stats()
+        if stats["calls"] != 1 or stats["predictions"] != 2:
+            print(f"❌ Missing rows should be predicted in one batch: {stats}")
+            return False
+        if load_calorie_model(os.path.join(tmp, "missing.pkl")) is not None:
+            print("❌ Missing model file should return None")
+            return False
+
+        print(f"✅ Calorie model working ({stats['us_per_item']:.0f} µs/item)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Calorie model error: {e}")
+        return False
+
+
+def test_model_registry():
+    """Test versioned publish, checksums, hot swap, canary and rollback"""
+    print("🗂️ Testing model registry...")
+
+    try:
+        import os
+        import tempfile
+        from model_registry import HotModel, ModelRegistry
+
+        def build(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(os.path.join(tmp, "registry"))
+            for version in ("v1", "v2"):
+                path = os.path.join(tmp, "weights.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"model-{version}")
+                registry.publish("detector", [path], version=version)
+            registry.promote("detector", "v1")
+
+            hot = HotModel(registry, "detector", build, poll_seconds=0.0).start()
+            if hot.wait(5) != "model-v1" or not hot.ready:
+                print("❌ Stable version was not loaded")
+                return False
+
+            # Canary untuk semua sesi, lalu promote: versi lama melayani sampai versi baru siap
+            registry.set_canary("detector", "v2", fraction=1.0)
+            hot.refresh()
+            hot._loaders["v2"].wait(5)
+            if hot.select("session-a") != "model-v2" or hot.value != "model-v1":
+                print("❌ Canary sessions should get v2 while stable stays on v1")
+                return False
+            registry.promote("detector", "v2")
+            if hot.value != "model-v2" or registry.channels("detector")["previous"] != "v1":
+                print("❌ Promoted version was not swapped in")
+                return False
+            registry.rollback("detector")
+            hot.refresh()
+            hot._loaders["v1"].wait(5)
+            if hot.value != "model-v1" or hot.active_versions() != {"stable": "v1"}:
+                print("❌ Rollback did not restore the previous version")
+                return False
+
+            with open(os.path.join(registry.root, "detector", "v2", "weights.txt"), "a", encoding="utf-8") as f:
+                f.write("corrupt")
+            try:
+                registry.verify("detector", "v2")
+                print("❌ Corrupted artefact passed checksum verification")
+                return False
+            except ValueError:
+                pass
+
+        print("✅ Model registry working")
+        return True
+
+    except Exception as e:
+        print(f"❌ Model registry error: {e}")
+        return False
+
+
+def test_detection_history():
+    """Test batched history writes and incremental daily/weekly rollups"""
+    print("🗂️ Testing detection history...")
+
+    try:
+        import datetime as dt
+        import os
+        import sqlite3
+        import tempfile
+        import time
+        from detection_history import HistoryStore
+
+        monday = time.mktime(dt.date(2025, 3, 3).timetuple()) + 12 * 3600
+        summary = {"Items": ["Rice", "Egg"], "Protein": 10.0, "Carbs": 40.0, "Fat": 5.0, "Calories": 245.0}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.db")
+            store = HistoryStore(path, batch_size=16, flush_interval=0.05)
+            for i in range(40):
+                # 4 hari (Senin-Kamis) x 2 sekolah, lalu satu hari di minggu berikutnya
+                day = (i // 2) % 4 if i < 36 else 7
+                store.record(f"SD {i % 2}", summary, timestamp=monday + day * 86400)
+            store.flush()
+
+            daily = store.rollup("day")
+            weekly = store.rollup("week", schools=["SD 0"])
+            recent = store.recent(5, school="SD 1")
+            stats = store.stats()
+            store.close()
+
+            with sqlite3.connect(path) as conn:
+                mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                raw = conn.execute("SELECT COUNT(*), SUM(Calories) FROM analyses").fetchone()
+                plan = " ".join(row[-1] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT * FROM analyses WHERE school = ? AND day = ?", ("SD 0", "2025-03-03")
+                ))
+
+        if mode != "wal" or "idx_analyses_school_day" not in plan:
+            print(f"❌ Expected WAL mode and the school/day index ({mode}, {plan})")
+            return False
+        if raw != (40, 40 * 245.0) or stats["written"] != 40 or stats["batches"] > 40 // 2:
+            print(f"❌ History rows were not written in batches: {raw}, {stats}")
+            return False
+        if daily["analyses"].sum() != 40 or daily["Calories"].sum() != raw[1] or len(daily) != 10:
+            print("❌ Daily rollup does not match raw history")
+            return False
+        if weekly["period"].tolist() != ["2025-03-03", "2025-03-10"] or weekly["analyses"].tolist() != [18, 2]:
+            print(f"❌ Unexpected weekly rollup: {weekly.to_dict('records')}")
+            return False
+        if len(recent) != 5 or set(recent["school"]) != {"SD 1"} or recent["items"].iloc[0] != "Rice, Egg":
+            print("❌ Recent history query returned unexpected rows")
+            return False
+
+        print(f"✅ Detection history working ({stats['batches']} batches)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Detection history error: {e}")
+        return False
+
+
+def test_benchmark_suite():
+    """Test benchmark runner output and regression comparison"""
+    print("⏱️ Testing benchmark suite...")
+
+    try:
+        from benchmark import compare, run
+
+        report = run(["dashboard"], sizes=[15], budget=0.01, log=lambda line: None)
+        names = {r["name"] for r in report["results"]}
+        if not {"dashboard.filter", "dashboard.rollup", "dashboard.figures"} <= names:
+            print(f"❌ Missing dashboard benchmarks: {sorted(names)}")
+            return False
+        if any(r["size"] != 15 or r["runs"] < 3 or r["median_ms"] <= 0 for r in report["results"]):
+            print("❌ Benchmark results are incomplete")
+            return False
+
+        baseline = {"results": [
+            {"name": "a", "size": 1, "median_ms": 10.0},
+            {"name": "b", "size": 1, "median_ms": 10.0},
+            {"name": "c", "size": 1, "median_ms": 0.01},
+        ]}
+        current = {"results": [
+            {"name": "a", "size": 1, "median_ms": 14.0},
+            {"name": "b", "size": 1, "median_ms": 6.0},
+            {"name": "c", "size": 1, "median_ms": 0.03},
+            {"name": "d", "size": 1, "median_ms": 1.0},
+        ]}
+        status = {row["name"]: row["status"] for row in compare(current, baseline, threshold=0.25)}
+        # c tiga kali lebih lambat tetapi selisihnya di bawah noise timer; d tidak punya pembanding
+        if status != {"a": "regression", "b": "improvement", "c": "ok"}:
+            print(f"❌ Unexpected comparison: {status}")
+            return False
+
+        print(f"✅ Benchmark suite working ({len(report['results'])} cases)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Benchmark suite error: {e}")
+        return False
+
+
+def test_stage_metrics():
+    """Test span histograms, quantiles and the Prometheus endpoint"""
+    print("📈 Testing stage metrics...")
+
+    try:
+        import urllib.request
+        from metrics import MetricsRegistry, start_http_server
+
+        metrics = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+        for ms in range(1, 101):
+            metrics.observe("inference", ms / 1000)
+        with metrics.span("draw"):
+            pass
+        try:
+            with metrics.span("decode"):
+                raise ValueError("gambar rusak")
+        except ValueError:
+            pass
+        metrics.record_cache("figure", hit=True)
+        metrics.record_cache("figure", hit=False)
+        metrics.add_source("detection_cache", lambda: {"hits": 3, "hit_rate": 0.75})
+
+        stages = {row["stage"]: row for row in metrics.stage_summary()}
+        if set(stages) != {"inference", "draw", "decode"} or stages["decode"]["count"] != 1:
+            print("❌ Spans were not recorded (including failing blocks)")
+            return False
+        if not (49 <= stages["inference"]["p50_ms"] <= 52 and 94 <= stages["inference"]["p95_ms"] <= 96):
+            print(f"❌ Unexpected quantiles: {stages['inference']}")
+            return False
+        if metrics.cache_summary()["figure"]["hit_rate"] != 0.5:
+            print("❌ Cache hit rate is wrong")
+            return False
+
+        server = start_http_server(metrics, 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        expected = [
+            'jalu_stage_seconds_bucket{stage="inference",le="0.01"} 10',
+            'jalu_stage_seconds_bucket{stage="inference",le="0.1"} 100',
+            'jalu_stage_seconds_count{stage="inference"} 100',
+            'jalu_cache_requests_total{cache="figure",result="miss"} 1',
+            'jalu_detection_cache{field="hit_rate"} 0.75',
+        ]
+        missing = [line for line in expected if line not in body]
+        if missing:
+            print(f"❌ Missing lines in /metrics: {missing}")
+            return False
+
+        print("✅ Stage metrics working")
+        return True
+
+    except Exception as e:
+        print(f"❌ Stage metrics error: {e}")
+        return False
+
+
+def test_mbg_generator():
+    """Test seeded synthetic MBG data and streamed Parquet output"""
+    print("🏭 Testing MBG generator...")
+
+    try:
+        import tempfile
+        from mbg_generator import BLOCK_ROWS, COLUMNS, DISTRICTS, LEVELS, PROVINCES, generate, generate_grid, write_parquet
+        from mbg_store import open_store
+
+        rows = BLOCK_ROWS + 5_000
+        frame = generate(rows, seed=7)
+        if list(frame.columns) != COLUMNS or len(COLUMNS) != 24 or len(frame) != rows:
+            print(f"❌ Unexpected schema: {list(frame.columns)}")
+            return False
+        if not frame.equals(generate(rows, seed=7)) or frame.equals(generate(rows, seed=8)):
+            print("❌ Output is not determined by the seed")
+            return False
+        # Blok kedua dibangkitkan terpisah (seperti oleh worker lain) harus identik
+        tail = generate(5_000, seed=7, first_block=1)
+        if not tail.equals(frame.iloc[BLOCK_ROWS:].reset_index(drop=True)):
+            print("❌ Rows depend on how the work was split")
+            return False
+        empty = generate(0, seed=7)
+        if len(empty) != 0 or not empty.dtypes.equals(frame.dtypes):
+            print("❌ Zero rows should give an empty frame with the same schema")
+            return False
+        if not (frame["Jumlah_Siswa_Penerima"].between(50_000, 200_000).all()
+                and frame["Tingkat_Kepuasan"].between(70, 95).all()
+                and frame.loc[frame["Jenjang_Pendidikan"] == "SMA", "Jumlah_Sekolah"].max() <= 60):
+            print("❌ Values are out of range")
+            return False
+        if frame["Provinsi"].nunique() != len(PROVINCES) or frame["Kabupaten_Kota"].nunique() < 0.9 * len(DISTRICTS):
+            print("❌ Province/district cardinality is too low")
+            return False
+
+        grid = generate_grid(seed=7)
+        pairs = set(zip(grid["Provinsi"], grid["Jenjang_Pendidikan"]))
+        if len(grid) != len(PROVINCES) * len(LEVELS) or len(pairs) != len(grid) or list(grid.columns) != COLUMNS:
+            print("❌ Default grid does not cover every province and level once")
+            return False
+        if not grid.equals(generate_grid(seed=7)) or not all(d.split(" ", 1)[1].startswith(p) for p, d in zip(grid["Provinsi"], grid["Kabupaten_Kota"])):
+            print("❌ Grid is not seeded or districts do not match provinces")
+            return False
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_parquet(tmp, rows, seed=7, chunk_rows=BLOCK_ROWS)
+            store = open_store(tmp)
+            if store.count_rows() != rows or set(store.columns) != set(COLUMNS):
+                print("❌ Parquet dataset does not match the generated rows")
+                return False
+            jabar = store.load(columns=["Biaya_Per_Siswa"], filters={"Provinsi": ["Jawa Barat"]})
+            expected = frame.loc[frame["Provinsi"] == "Jawa Barat", "Biaya_Per_Siswa"]
+            if abs(jabar["Biaya_Per_Siswa"].sum() - expected.sum()) > 1e-6 * expected.sum():
+                print("❌ Partition contents differ from the generated rows")
+                return False
+
+        print(f"✅ MBG generator working ({rows:,} rows, {len(DISTRICTS)} districts)")
+        return True
+
+    except Exception as e:
+        print(f"❌ MBG generator error: {e}")
+        return False
+
+
+def test_batch_analysis():
+    """Test headless directory analysis, per-folder totals and resume"""
+    print("🗂️ Testing batch image analysis...")
+
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from analyze_images import BatchAnalyzer, analyze_directory, journal_path, summary_path
+        from detection import Detections
+        from nutrition import default_nutrition_table
+
+        class FakeBackend:
+            identity = "fake:model:1"
+            names = {0: "person", 1: "apple", 2: "pizza"}
+
+            def __init__(self):
+                self.batch_sizes = []
+
+            def predict(self, images):
+                self.batch_sizes.append(len(images))
+                return [
+                    Detections(
+                        boxes=np.array([[0, 0, 10, 10], [5, 5, 20, 20], [1, 1, 8, 8]], dtype=np.float32),
+                        scores=np.array([0.9, 0.8, 0.1], dtype=np.float32),
+                        classes=np.array([0, 1, 2], dtype=np.int32),
+                        image_size=(image.shape[1], image.shape[0]),
+                    )
+                    for image in images
+                ]
+
+        backend = FakeBackend()
+        analyzer = BatchAnalyzer(backend, default_nutrition_table(), min_confidence=0.25)
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "foto")
+            for folder, count in (("sekolah_a", 3), ("sekolah_b", 2)):
+                os.makedirs(os.path.join(root, folder))
+                for i in range(count):
+                    Image.new("RGB", (64, 48), "white").save(os.path.join(root, folder, f"{i}.jpg"))
+            with open(os.path.join(root, "sekolah_b", "rusak.jpg"), "wb") as f:
+                f.write(b"bukan gambar")
+            output = os.path.join(tmp, "hasil.csv")
+
+            results, summary = analyze_directory(root, output, batch_size=4, analyzer=analyzer, log=lambda line: None)
+            if backend.batch_sizes != [4, 1]:
+                print(f"❌ Model was not called once per batch: {backend.batch_sizes}")
+                return False
+            ok = results[results["status"] == "ok"]
+            # Hanya apple yang dihitung: person bukan makanan, pizza di bawah ambang confidence
+            if len(ok) != 5 or (ok["items"] != "Apple").any() or (ok["Calories"] != 95).any():
+                print(f"❌ Unexpected per-image results: {results[['path', 'status', 'items']].values.tolist()}")
+                return False
+            totals = summary.set_index("folder")
+            if totals.loc["sekolah_b", "failed"] != 1 or totals.loc["(semua)", "Calories"] != 5 * 95:
+                print(f"❌ Unexpected folder totals: {summary.to_dict('records')}")
+                return False
+            if len(pd.read_csv(summary_path(output))) != 3:
+                print("❌ Summary file was not written")
+                return False
+
+            # Resume: baris jurnal terpotong diabaikan, hanya gambar gagal yang dianalisis ulang
+            with open(journal_path(output), "a", encoding="utf-8") as f:
+                f.write('{"path": "sekolah_a/0.jpg", "sta')
+            backend.batch_sizes.clear()
+            results, _ = analyze_directory(root, output, batch_size=4, analyzer=analyzer, log=lambda line: None)
+            if backend.batch_sizes != [] or len(results) != 6:
+                print(f"❌ Resume re-ran finished images: {backend.batch_sizes}")
+                return False
+
+            # Model berganti: semua gambar dianalisis ulang walau file tidak berubah
+            backend.identity = "fake:model:2"
+            results, _ = analyze_directory(root, output, batch_size=4, analyzer=analyzer, log=lambda line: None)
+            if backend.batch_sizes != [4, 1] or set(results["model"]) != {"fake:model:2"}:
+                print(f"❌ Model change did not invalidate the journal: {backend.batch_sizes}")
+                return False
+
+            # File yang hilang setelah listing hanya menggagalkan dirinya sendiri
+            records = analyzer.analyze(root, ["sekolah_a/0.jpg", "sekolah_a/hilang.jpg"])
+            if [r["status"] for r in records] != ["ok", "error"] or "FileNotFoundError" not in records[1]["error"]:
+                print(f"❌ Vanished file failed the whole batch: {records}")
+                return False
+
+            # Semua gambar gagal: hasil tetap berupa CSV berisi baris error
+            broken = os.path.join(tmp, "rusak")
+            os.makedirs(broken)
+            for i in range(2):
+                with open(os.path.join(broken, f"{i}.jpg"), "wb") as f:
+                    f.write(b"bukan gambar")
+            failed_output = os.path.join(tmp, "gagal.csv")
+            analyze_directory(broken, failed_output, batch_size=4, analyzer=analyzer, log=lambda line: None)
+            written = pd.read_csv(failed_output)
+            if len(written) != 2 or set(written["status"]) != {"error"} or (written["item_count"] != 0).any():
+                print(f"❌ All-failed folder did not produce error rows: {written.to_dict('records')}")
+                return False
+
+        print("✅ Batch image analysis working")
+        return True
+
+    except Exception as e:
+        print(f"❌ Batch image analysis error: {e}")
+        return False
+
+
+def test_load_test_harness():
+    """Test concurrent AppTest sessions and the capacity summary"""
+    print("👥 Testing load-test harness...")
+
+    try:
+        from load_test import capacity, run
+
+        report = run([1, 2], duration=2.0, mix=("home", "dashboard"), think=0.0, log=lambda line: None)
+        for level in report["levels"]:
+            if level["errors"] or level["reruns"] == 0 or level["p99_ms"] < level["p50_ms"]:
+                print(f"❌ Level {level['concurrency']} failed: {level['error_samples']}")
+                return False
+            if level["scenarios"]["dashboard"]["reruns"] == 0 or level["peak_rss_mb"] <= 0:
+                print("❌ Dashboard sessions or RSS were not measured")
+                return False
+
+        levels = [
+            {"concurrency": 1, "errors": 0, "p99_ms": 300.0},
+            {"concurrency": 4, "errors": 0, "p99_ms": 900.0},
+            {"concurrency": 8, "errors": 0, "p99_ms": 2500.0},
+            {"concurrency": 16, "errors": 3, "p99_ms": 1500.0},
+        ]
+        if capacity(levels, slo_ms=2000.0) != 4:
+            print("❌ Capacity ignores the SLO or errors")
+            return False
+
+        # Tanpa modul resource (Windows): import tetap jalan, RSS dilaporkan kosong
+        import builtins
+        from unittest import mock
+        import load_test
+        real_import = builtins.__import__
+
+        def no_resource(name, *args, **kwargs):
+            if name == "resource":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        with mock.patch("builtins.open", side_effect=OSError), mock.patch("builtins.__import__", no_resource):
+            rss = load_test.current_rss()
+        if rss is not None:
+            print("❌ current_rss should report None without /proc and resource")
+            return False
+
+        print(f"✅ Load-test harness working (capacity {report['capacity']} sessions)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Load-test harness error: {e}")
+        return False
+
+
 def run_all_tests():
     """Run all tests and report results"""
     print("🚀 Starting JALU App Testing Suite")
@@ -219,7 +1704,32 @@ def run_all_tests():
         ("Navigation Pages", test_navigation_pages),
         ("Metric Cards", test_metric_cards),
         ("Dependencies", test_dependencies),
-        ("Data Loading", test_data_loading)
+        ("Data Loading", test_data_loading),
+        ("Detection Cache", test_detection_cache),
+        ("Batch Detection", test_batch_detection),
+        ("Inference Backend", test_inference_backend),
+        ("Nutrient Aggregation", test_nutrient_aggregation),
+        ("Nutrition Index", test_nutrition_index),
+        ("MBG Data Store", test_mbg_store),
+        ("MBG Rollups", test_mbg_rollup),
+        ("Bitmap Filters", test_bitmap_filter),
+        ("Chart Downsampling", test_chart_downsampling),
+        ("Table Paging", test_table_paging),
+        ("Background Loader", test_background_loader),
+        ("Inference Server", test_inference_server),
+        ("Detection Jobs", test_detection_jobs),
+        ("Image Preprocessing", test_image_preprocessing),
+        ("Box Rendering", test_box_rendering),
+        ("Video Tracking", test_video_tracking),
+        ("Training Pipeline", test_training_pipeline),
+        ("Calorie Model", test_calorie_model),
+        ("Model Registry", test_model_registry),
+        ("Detection History", test_detection_history),
+        ("Benchmark Suite", test_benchmark_suite),
+        ("Stage Metrics", test_stage_metrics),
+        ("MBG Generator", test_mbg_generator),
+        ("Batch Analysis", test_batch_analysis),
+        ("Load Test Harness", test_load_test_harness)
     ]
 
     passed = 0
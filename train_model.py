@@ -1,41 +1,185 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error
-import joblib
-
-# Load the dataset
-df = pd.read_csv('food_nutrition_data.csv')
-
-# Select features
-features = ['FoodType', 'Quantity', 'Protein', 'Carbs', 'Fat']
-target = 'Calories'
-
-# Encode categorical features
-food_type_mapping = {
-    'Rice': 0, 'Chicken': 1, 'Broccoli': 2, 'Banana': 3, 'Egg': 4,
-    'Fish': 5, 'Carrot': 6, 'Milk': 7, 'Apple': 8, 'Spinach': 9
-}
-df['FoodType'] = df['FoodType'].map(food_type_mapping)
-
-# Prepare X and y
-X = df[features]
-y = df[target]
-
-# Split the data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Train the model
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Evaluate
-y_pred = model.predict(X_test)
-mae = mean_absolute_error(y_test, y_pred)
-print(f'Mean Absolute Error: {mae}')
-
-# Save the model and feature columns
-joblib.dump(model, 'food_nutrition_model.pkl')
-joblib.dump(features, 'food_feature_columns.pkl')
-
-print('Model and feature columns saved successfully.')
+# =============================================================================
+# JALU - Pelatihan model estimasi kalori
+# CSV komposisi pangan dibaca per chunk (hanya kolom fitur, numerik float32),
+# kategori FoodType dipelajari dari data, fitur di-encode dengan fungsi yang
+# sama dengan saat prediksi (calorie_model.encode_features), RandomForest
+# dilatih di semua core dan pencarian hyperparameter opsional berjalan paralel
+# di beberapa proses. Model disimpan (pickle + format ringkas untuk calorie_model.py)
+# bersama metrik waktu, memori dan MAE (JSON).
+#
+# Penggunaan CLI:
+#   python train_model.py                                   # default seperti sebelumnya
+#   python train_model.py --data komposisi_nasional.csv --search 20 --n-jobs -1
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import RandomizedSearchCV, train_test_split
+
+from calorie_model import encode_features
+
+FEATURES = ["FoodType", "Quantity", "Protein", "Carbs", "Fat"]
+TARGET = "Calories"
+CATEGORICAL = ["FoodType"]
+
+# Ruang pencarian RandomizedSearchCV (--search N)
+SEARCH_SPACE = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [None, 8, 16, 32],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": [1.0, "sqrt", 0.5],
+}
+
+
+def peak_memory_mb():
+    """Puncak RSS proses ini (MB); None jika modul resource tidak tersedia (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_training_data(path, chunksize=100_000):
+    """Baca CSV per chunk: kolom yang dipakai saja, numerik float32, kategori sebagai string.
+
+    Chunk membatasi memori parser dan kolom sementara; tabel hasil (6 kolom terpilih) tetap
+    seluruhnya di memori karena forest dilatih dari semua baris.
+    """
+    numeric = [c for c in FEATURES + [TARGET] if c not in CATEGORICAL]
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=FEATURES + [TARGET], chunksize=chunksize,
+                             dtype={c: "string" for c in CATEGORICAL}):
+        for column in numeric:
+            chunk[column] = pd.to_numeric(chunk[column], errors="coerce").astype(np.float32)
+        chunks.append(chunk.dropna(subset=[TARGET]))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def learn_encodings(frame):
+    """Kategori terurut per kolom kategorikal, dipelajari dari data (bukan mapping tetap)."""
+    return {column: sorted(frame[column].dropna().unique().tolist()) for column in CATEGORICAL}
+
+
+def encode(frame, encodings):
+    """Fitur latih dengan kebijakan pengisian yang sama seperti saat prediksi (kategori tak dikenal: -1)."""
+    return encode_features(frame, FEATURES, encodings)
+
+
+def train(frame, n_estimators=100, n_jobs=-1, search=0, cv=3, test_size=0.2, seed=42):
+    """Latih model; kembalikan (model, encodings, metrik)."""
+    encodings = learn_encodings(frame)
+    X = encode(frame, encodings)
+    y = frame[TARGET].to_numpy(dtype=np.float32)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+
+    started = time.perf_counter()
+    if search:
+        # Paralel antar proses di level kandidat x fold; tiap forest satu core agar tidak oversubscribe
+        searcher = RandomizedSearchCV(
+            RandomForestRegressor(random_state=seed, n_jobs=1),
+            SEARCH_SPACE,
+            n_iter=search,
+            cv=min(cv, len(X_train)),
+            scoring="neg_mean_absolute_error",
+            n_jobs=n_jobs,
+            random_state=seed,
+        )
+        searcher.fit(X_train, y_train)
+        model = searcher.best_estimator_
+        model.set_params(n_jobs=n_jobs)
+        params = searcher.best_params_
+    else:
+        model = RandomForestRegressor(n_estimators=n_estimators, random_state=seed, n_jobs=n_jobs)
+        model.fit(X_train, y_train)
+        params = {"n_estimators": n_estimators}
+    train_seconds = time.perf_counter() - started
+
+    y_pred = model.predict(X_test)
+    metrics = {
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "train_seconds": train_seconds,
+        "rows": len(frame),
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "params": params,
+        "search_iterations": search,
+        "n_jobs": n_jobs,
+        "seed": seed,
+    }
+    return model, encodings, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latih model estimasi kalori JALU")
+    parser.add_argument("--data", default="food_nutrition_data.csv")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Baris per chunk saat membaca CSV")
+    parser.add_argument("--model-output", default="food_nutrition_model.pkl")
+    parser.add_argument("--features-output", default="food_feature_columns.pkl")
+    parser.add_argument("--encodings-output", default="food_category_encodings.pkl")
+    parser.add_argument("--metrics-output", default="food_nutrition_metrics.json")
+    parser.add_argument("--compact-output", default="food_nutrition_model.npy",
+                        help="Format ringkas (node .npy + metadata .json) untuk dimuat dengan mmap; kosongkan untuk melewati")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Jumlah core/proses (-1 = semua)")
+    parser.add_argument("--search", type=int, default=0, help="Jumlah kandidat RandomizedSearchCV (0 = tanpa pencarian)")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    frame = load_training_data(args.data, chunksize=args.chunksize)
+    load_seconds = time.perf_counter() - started
+
+    model, encodings, metrics = train(
+        frame, n_estimators=args.n_estimators, n_jobs=args.n_jobs, search=args.search,
+        cv=args.cv, test_size=args.test_size, seed=args.seed,
+    )
+    metrics.update(
+        load_seconds=load_seconds,
+        total_seconds=time.perf_counter() - started,
+        peak_memory_mb=peak_memory_mb(),
+        data=os.path.basename(args.data),
+        data_sha256=file_sha256(args.data),
+        features=FEATURES,
+    )
+
+    # Model tanpa kompresi agar bisa dimuat dengan mmap_mode
+    joblib.dump(model, args.model_output)
+    joblib.dump(FEATURES, args.features_output)
+    joblib.dump(encodings, args.encodings_output)
+    if args.compact_output:
+        from calorie_model import export_compact
+        export_compact(model, args.compact_output, FEATURES, encodings)
+    with open(args.metrics_output, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"Mean Absolute Error: {metrics['mae']:.3f}")
+    print(f"{metrics['rows']} baris, latih {metrics['train_seconds']:.2f} dtk, total {metrics['total_seconds']:.2f} dtk"
+          + (f", puncak memori {metrics['peak_memory_mb']:.0f} MB" if metrics["peak_memory_mb"] else ""))
+    print(f"Model disimpan ke {args.model_output}, metrik ke {args.metrics_output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# =============================================================================
+# JALU - Analisis video / webcam jalur penyajian
+# Frame dibaca lewat generator (memori konstan berapa pun panjang video),
+# sebagian frame dilewati secara adaptif agar pemrosesan mengikuti laju video,
+# deteksi dilacak antar frame (IoU tracker) sehingga tiap item dihitung sekali,
+# dan total nutrisi dikeluarkan per nampan: nampan selesai saat tidak ada item
+# terlihat selama `gap_seconds`. `max_seconds` membatasi durasi yang dianalisis
+# (wajib untuk webcam/perangkat, yang tidak punya akhir sendiri).
+#
+# Penggunaan CLI:
+#   python video_stream.py rekaman.mp4 --model yolov8n.onnx
+#   python video_stream.py 0 --max-seconds 300   # webcam / perangkat video 0
+# =============================================================================
+
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from nutrition import NUTRIENT_COLUMNS
+
+# Frame diperkecil ke sisi terpanjang ini sebelum inferensi (ukuran input model)
+FRAME_SIZE = 640
+
+
+def open_capture(source):
+    """`source` berupa path file video atau nomor perangkat ("0", 0)."""
+    try:
+        import cv2
+    except ImportError as e:
+        raise ImportError("Mode video membutuhkan paket opencv-python (pip install opencv-python)") from e
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise FileNotFoundError(f"Sumber video '{source}' tidak dapat dibuka")
+    return capture
+
+
+class FrameSkipper:
+    """Stride adaptif: proses 1 dari `stride` frame agar waktu proses per frame mengikuti laju video."""
+
+    def __init__(self, source_fps, speed=1.0, max_stride=8, smoothing=0.2):
+        self.source_fps = source_fps or 30.0
+        self.speed = speed
+        self.max_stride = max_stride
+        self.smoothing = smoothing
+        self.stride = 1
+        self.seconds_per_frame = None
+
+    def record(self, seconds):
+        """Catat lama pemrosesan satu frame, lalu hitung ulang stride (EMA)."""
+        if self.seconds_per_frame is None:
+            self.seconds_per_frame = seconds
+        else:
+            self.seconds_per_frame += self.smoothing * (seconds - self.seconds_per_frame)
+        if self.speed is None:
+            return  # mode offline: semua frame diproses
+        needed = self.seconds_per_frame * self.source_fps * self.speed
+        self.stride = int(min(max(math.ceil(needed), 1), self.max_stride))
+
+
+def iter_frames(capture, skipper=None, frame_size=FRAME_SIZE):
+    """Generator (indeks, detik, frame RGB kecil); frame yang dilewati hanya di-grab, tidak didekode."""
+    import cv2
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    index = -1
+    next_index = 0
+    while True:
+        index += 1
+        if index < next_index:
+            if not capture.grab():
+                return
+            continue
+        ok, frame = capture.read()
+        if not ok:
+            return
+        height, width = frame.shape[:2]
+        scale = frame_size / max(height, width)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        yield index, index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        next_index = index + (skipper.stride if skipper is not None else 1)
+
+
+class IoUTracker:
+    """Tracker greedy berbasis IoU per kelas; track dikonfirmasi setelah `min_hits` kemunculan."""
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.classes = np.zeros(0, dtype=np.int32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.missed = np.zeros(0, dtype=np.int32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self._next_id = 0
+
+    def update(self, detections):
+        """Perbarui track dengan deteksi satu frame; kembalikan id kelas track yang baru dikonfirmasi."""
+        from inference_backend import box_iou
+        boxes, classes = detections.boxes, detections.classes
+        matched_track = np.full(len(boxes), -1, dtype=np.int64)
+        if len(boxes) and len(self.ids):
+            iou = box_iou(boxes, self.boxes)
+            iou[classes[:, None] != self.classes[None, :]] = 0.0
+            # Pasangkan dari IoU terbesar; tiap deteksi/track paling banyak satu pasangan
+            for flat in np.argsort(-iou, axis=None):
+                d, t = divmod(int(flat), len(self.ids))
+                if iou[d, t] < self.iou_threshold:
+                    break
+                if matched_track[d] < 0 and t not in matched_track:
+                    matched_track[d] = t
+
+        seen = np.zeros(len(self.ids), dtype=bool)
+        matched = matched_track >= 0
+        tracks = matched_track[matched]
+        seen[tracks] = True
+        self.boxes[tracks] = boxes[matched]
+        self.hits[tracks] += 1
+        self.missed[~seen] += 1
+        self.missed[seen] = 0
+        confirmed = classes[matched][self.hits[tracks] == self.min_hits]
+
+        new = ~matched
+        count = int(new.sum())
+        self.boxes = np.concatenate([self.boxes, boxes[new]])
+        self.classes = np.concatenate([self.classes, classes[new]])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int32)])
+        self.missed = np.concatenate([self.missed, np.zeros(count, dtype=np.int32)])
+        self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + count)])
+        self._next_id += count
+        if self.min_hits <= 1:
+            confirmed = np.concatenate([confirmed, classes[new]])
+
+        keep = self.missed <= self.max_missed
+        self.boxes, self.classes = self.boxes[keep], self.classes[keep]
+        self.hits, self.missed, self.ids = self.hits[keep], self.missed[keep], self.ids[keep]
+        return confirmed
+
+    @property
+    def active(self):
+        """Jumlah track terkonfirmasi yang terlihat di frame terakhir."""
+        return int(((self.hits >= self.min_hits) & (self.missed == 0)).sum())
+
+
+class StreamAnalyzer:
+    """Gabungkan frame -> deteksi -> tracker -> total nutrisi per nampan; `stats` berisi laju fps."""
+
+    def __init__(self, model, matrix, min_confidence=0.25, gap_seconds=1.0, speed=1.0,
+                 max_stride=8, tracker=None, max_seconds=None):
+        self.model = model
+        self.matrix = matrix
+        self.min_confidence = min_confidence
+        self.gap_seconds = gap_seconds
+        self.max_seconds = max_seconds
+        self.speed = speed
+        self.max_stride = max_stride
+        self.tracker = tracker or IoUTracker()
+        self.stats = {"frames_read": 0, "frames_processed": 0, "trays": 0, "seconds": 0.0, "fps": 0.0, "stride": 1}
+        self._tray = None
+
+    def _open_tray(self, seconds):
+        self.stats["trays"] += 1
+        self._tray = {
+            "Nampan": self.stats["trays"],
+            "Mulai": seconds,
+            "Selesai": seconds,
+            "counts": np.zeros(self.matrix.num_classes),
+            "Items": [],
+        }
+
+    def _close_tray(self):
+        tray, self._tray = self._tray, None
+        totals = tray.pop("counts") @ self.matrix.values
+        tray.update(zip(NUTRIENT_COLUMNS, totals.tolist()))
+        return tray
+
+    def run(self, source, on_frame=None):
+        """Generator dict per nampan yang selesai dari file video / perangkat `source`."""
+        import cv2
+        capture = open_capture(source)
+        skipper = FrameSkipper(capture.get(cv2.CAP_PROP_FPS), self.speed, self.max_stride)
+        try:
+            yield from self.process(iter_frames(capture, skipper), skipper, on_frame)
+        finally:
+            capture.release()
+
+    def process(self, frames, skipper=None, on_frame=None):
+        """Proses iterable (indeks, detik, frame RGB); `on_frame(indeks)` dipanggil tiap frame diproses."""
+        started = time.perf_counter()
+        last_seen = None
+        for index, seconds, frame in frames:
+            if self.max_seconds is not None and seconds >= self.max_seconds:
+                break
+            t0 = time.perf_counter()
+            detections = self.model.predict([frame])[0]
+            detections = self.matrix.select_food(detections.subset(detections.scores >= self.min_confidence))
+            confirmed = self.tracker.update(detections)
+            if skipper is not None:
+                skipper.record(time.perf_counter() - t0)
+
+            if len(confirmed):
+                if self._tray is None:
+                    self._open_tray(seconds)
+                np.add.at(self._tray["counts"], confirmed, 1.0)
+                self._tray["Items"].extend(self.matrix.food_names[c] for c in confirmed.tolist())
+            if self.tracker.active:
+                last_seen = seconds
+                if self._tray is not None:
+                    self._tray["Selesai"] = seconds
+            # Celah tanpa item cukup lama: nampan dianggap sudah lewat
+            if self._tray is not None and seconds - last_seen >= self.gap_seconds:
+                yield self._close_tray()
+
+            elapsed = time.perf_counter() - started
+            processed = self.stats["frames_processed"] + 1
+            self.stats.update(
+                frames_read=index + 1,
+                frames_processed=processed,
+                seconds=elapsed,
+                fps=processed / elapsed if elapsed > 0 else 0.0,
+                stride=skipper.stride if skipper is not None else 1,
+            )
+            if on_frame is not None:
+                on_frame(index)
+        if self._tray is not None:
+            yield self._close_tray()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisis nutrisi per nampan dari video / webcam")
+    parser.add_argument("source", help="Path file video atau nomor perangkat (mis. 0)")
+    parser.add_argument("--model", default=None, help="Path model (default JALU_MODEL_PATH)")
+    parser.add_argument("--confidence", type=float, default=0.25)
+    parser.add_argument("--gap", type=float, default=1.0, help="Detik tanpa item sebelum nampan ditutup")
+    parser.add_argument("--offline", action="store_true", help="Proses semua frame, tanpa frame skipping")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Berhenti setelah sekian detik video")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from inference_backend import load_backend
+    from nutrition import build_nutrient_matrix, default_nutrition_table
+
+    model = load_backend(args.model)
+    matrix = build_nutrient_matrix(default_nutrition_table(), model.names)
+    analyzer = StreamAnalyzer(model, matrix, min_confidence=args.confidence, gap_seconds=args.gap,
+                              speed=None if args.offline else 1.0, max_seconds=args.max_seconds)
+    trays = []
+    for tray in analyzer.run(args.source):
+        trays.append(tray)
+        items = ", ".join(f"{name} x{count}" for name, count in Counter(tray["Items"]).items())
+        print(f"Nampan {tray['Nampan']} ({tray['Mulai']:.1f}-{tray['Selesai']:.1f} dtk): "
+              f"{tray['Calories']:.0f} kcal, {items}")
+    stats = analyzer.stats
+    print(f"{stats['frames_processed']}/{stats['frames_read']} frame diproses dalam {stats['seconds']:.1f} dtk "
+          f"({stats['fps']:.1f} fps, stride terakhir {stats['stride']})")
+    if trays:
+        print(pd.DataFrame(trays).drop(columns=["Items"]).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())